@@ -1,13 +1,33 @@
 import numpy as np
-import pandas as pd
-import pickle
+import contextlib
+import csv
+import io
 import datetime as dt
-from flask import Flask, request, render_template, redirect, url_for, session, g, flash, jsonify
+import hmac
+import time
+import sqlite3
+from flask import (Flask, Response, request, render_template, redirect, url_for, session, g, flash, jsonify,
+                   has_request_context)
 from flask_mail import Mail, Message
 import os
 # --- NEW IMPORTS ---
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.engine import Engine
+from password_hashing import PasswordHasher, HashingBusy
+from mail_outbox import MailOutbox
+from feature_pipeline import finalize_prices
+from inference_scheduler import InferenceScheduler, SchedulerClosed
+from prediction_cache import PredictionCache
+from model_bundle import ModelManager
+from model_artifact import is_artifact
+from service_metrics import MetricsRegistry
+from market_analytics import MarketAnalytics
+from page_delivery import ENCODINGS, PageCache, ResponseCompressor, StaticAssets
+from audit_log import AuditLog
+from drift_monitor import DriftMonitor
+import dataset_store
+import what_if
 
 # --- Initialize App ---
 app = Flask(__name__, template_folder='templates', static_folder='static')
@@ -15,20 +35,71 @@ app = Flask(__name__, template_folder='templates', static_folder='static')
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'a_very_strong_random_default_key_!@#$') 
 
 # --- NEW: Database Configuration ---
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db' # This creates a users.db file
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///users.db') # This creates a users.db file
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Reuse a bounded set of connections instead of opening one per request
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 8)),
+    'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 8)),
+    'pool_timeout': 10,
+    'connect_args': {'timeout': 15},  # wait on a locked database instead of failing at once
+}
 db = SQLAlchemy(app)
 
+@event.listens_for(Engine, 'connect')
+def configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets readers (every login) proceed while a signup writes; NORMAL sync is safe under WAL
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA busy_timeout=15000')
+        cursor.close()
+
+# --- Password Hashing ---
+# Hashes are deliberately slow (~150 ms of CPU); a bounded pool keeps a login burst from
+# taking every core away from predictions. PASSWORD_HASH_WORKERS=0 hashes inline.
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))),
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64)),
+)
+
 # --- FLASK-MAIL CONFIGURATION ---
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', '1') == '1'
 app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'your_email@gmail.com')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', 'your_google_app_password')
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'your_email@gmail.com')
 
 mail = Mail(app)
 
+# --- Outbound Mail Queue ---
+# /contact only writes to a local SQLite outbox; a background sender delivers over one SMTP
+# connection per drain and retries failures with backoff (MAIL_OUTBOX_SENDER=0: enqueue only)
+class _OutboxSMTP:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def send(self, message):
+        msg = Message(message['subject'], sender=message['sender'], recipients=message['recipients'])
+        msg.body = message['body']
+        self.connection.send(msg)
+
+@contextlib.contextmanager
+def _smtp_connection():
+    with app.app_context(), mail.connect() as connection:
+        yield _OutboxSMTP(connection)
+
+# Lives next to users.db in the instance folder
+os.makedirs(app.instance_path, exist_ok=True)
+mail_outbox = MailOutbox(os.environ.get('MAIL_OUTBOX_PATH', os.path.join(app.instance_path, 'mail_outbox.db')),
+                         _smtp_connection,
+                         batch_size=int(os.environ.get('MAIL_OUTBOX_BATCH_SIZE', 50)),
+                         max_attempts=int(os.environ.get('MAIL_OUTBOX_MAX_ATTEMPTS', 8)),
+                         backoff_base=float(os.environ.get('MAIL_OUTBOX_BACKOFF', 5.0)))
+MAIL_OUTBOX_SENDER = os.environ.get('MAIL_OUTBOX_SENDER', '1') == '1'
+
 # --- NEW: User Database Model ---
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -36,110 +107,292 @@ class User(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
 
+# Built once: SQLAlchemy caches the compiled SQL and sqlite3 keeps the prepared statement per connection
+USER_BY_EMAIL = select(User).where(User.email == bindparam('email'))
+
+def _find_user(email):
+    return db.session.execute(USER_BY_EMAIL, {'email': email}).scalar_one_or_none()
+
 # --- Model Loading & Constants ---
-model = None
-model_mappings = None
-model_columns = None
-brand_to_model_map = {}
+# Prefer the versioned artifact directory; fall back to the legacy pickle
+MODEL_PATH = os.environ.get('MODEL_PATH') or ('car_model' if is_artifact('car_model') else 'car_model.pkl')
+MODEL_HOLDOUT_PATH = os.environ.get('MODEL_HOLDOUT_PATH', 'model_holdout.csv')
 CURRENT_YEAR = dt.datetime.now().year
 
+# How unseen categories are encoded: 'zero' (legacy), 'missing' or 'error'
+UNKNOWN_CATEGORY_POLICY = os.environ.get('UNKNOWN_CATEGORY_POLICY', 'zero')
+
+# The active model, encoders and columns live in one immutable bundle that is swapped atomically
+model_manager = ModelManager(
+    MODEL_PATH,
+    unknown_policy=UNKNOWN_CATEGORY_POLICY,
+    holdout_path=MODEL_HOLDOUT_PATH,
+    max_holdout_mae=float(os.environ['MODEL_MAX_HOLDOUT_MAE']) if os.environ.get('MODEL_MAX_HOLDOUT_MAE') else None,
+    max_mae_increase=float(os.environ.get('MODEL_MAX_MAE_INCREASE', 0.25)),
+    # Keep sklearn (and the pandas it drags in) out of the serving process when loading an artifact
+    lean_imports=os.environ.get('LEAN_SERVING_IMPORTS', '1') == '1',
+    # XGBoost threads per prediction; serve.py pins this per worker so workers don't oversubscribe cores
+    nthread=int(os.environ['MODEL_NTHREAD']) if os.environ.get('MODEL_NTHREAD') else None,
+    # 'xgboost', 'numpy' (compiled NumPy trees) or 'auto' (compiled trees up to MODEL_ENGINE_MAX_ROWS rows)
+    engine=os.environ.get('MODEL_ENGINE', 'xgboost'),
+    engine_max_rows=int(os.environ.get('MODEL_ENGINE_MAX_ROWS', 32)),
+)
+
 try:
     # Load the trained model
-    with open("car_model.pkl", 'rb') as f:
-        loaded = pickle.load(f)
-        if isinstance(loaded, dict) and 'model' in loaded:
-            model = loaded['model']
-            model_mappings = loaded.get('mappings', {})
-            model_columns = loaded.get('columns', [])
-            print("--- Model, Mappings, and Columns loaded successfully ---")
-        else:
-            print("--- WARNING: Old model format loaded. ---")
-            
-    # Load the dataset to build the brand-to-model map for the frontend
-    df_data = pd.read_csv('enhanced_car_dataset.csv')
-    brand_to_model_map = df_data.groupby('Brand')['Car_Name'].unique().apply(list).to_dict()
-    print(brand_to_model_map)
-    print("--- Brand-to-Model map created successfully ---")
+    bundle = model_manager.load_initial()
+    print(f"--- Model, Mappings, and Columns loaded successfully (version {bundle.version}) ---")
+    # The brand-to-model map for the frontend ships with the model (precomputed at training time)
+    print(f"--- Brand-to-Model map loaded: {len(bundle.catalogue)} brands ---")
     
 except FileNotFoundError as e:
     print(f"--- FATAL ERROR: Missing file {e.filename}. Please run generate_data.py and car_price_prediction.py ---")
 except Exception as e:
     print(f"--- FATAL ERROR: Could not load model or data. {e} ---")
 
+# Pick up retrained artifacts without a restart (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))
+# Every /admin/* route needs this in an X-Admin-Token header; without one configured they all answer 404
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or os.environ.get('MODEL_ADMIN_TOKEN')
+
+
+# --- Market Analytics ---
+# Aggregates behind /analysis: restored from a small JSON cache at boot (no dataset parsing),
+# then kept current in the background as the dataset grows (columnar copy preferred, see dataset_store.py)
+ANALYTICS_REFRESH_INTERVAL = float(os.environ.get('ANALYTICS_REFRESH_INTERVAL', 60))
+market_analytics = MarketAnalytics(os.environ.get('ANALYTICS_DATASET_PATH') or dataset_store.find_dataset(),
+                                   os.environ.get('ANALYTICS_CACHE_PATH', 'analytics_cache.json'))
+market_analytics.load_cache()
+
+# --- Page Delivery ---
+# Home and predict pages are rendered once per (model version, year) and kept precompressed;
+# other text responses are compressed on the way out (RESPONSE_COMPRESSION=0 sends everything as is);
+# static URLs carry a content hash (?v=) and are cached for STATIC_MAX_AGE seconds (0: always revalidate)
+_encodings = ENCODINGS if os.environ.get('RESPONSE_COMPRESSION', '1') == '1' else ()
+page_cache = PageCache(max_entries=int(os.environ.get('PAGE_CACHE_SIZE', 32)), encodings=_encodings)
+response_compressor = ResponseCompressor(min_bytes=int(os.environ.get('COMPRESS_MIN_BYTES', 1024)),
+                                         encodings=_encodings)
+static_assets = StaticAssets(app.static_folder, max_age=int(os.environ.get('STATIC_MAX_AGE', 365 * 24 * 3600)),
+                             encodings=_encodings)
+app.url_defaults(static_assets.url_defaults)
+app.view_functions['static'] = lambda filename: static_assets.send(filename, request, app.response_class,
+                                                                   app.send_static_file)
+
+# --- Prediction Audit Log ---
+# Every quote (inputs, encoded features, model version, price, latency) goes to an in-memory buffer;
+# a background writer appends it in gzip batches to rotating segments (AUDIT_LOG=0 turns it off)
+audit_log = AuditLog(
+    os.environ.get('AUDIT_LOG_DIR', os.path.join(app.instance_path, 'audit_log')),
+    batch_size=int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 256)),
+    flush_interval=float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0)),
+    max_buffered=int(os.environ.get('AUDIT_LOG_MAX_BUFFERED', 100000)),
+    max_file_bytes=int(float(os.environ.get('AUDIT_LOG_MAX_FILE_MB', 64)) * 1024 * 1024),
+    max_files=int(os.environ.get('AUDIT_LOG_MAX_FILES', 100)),
+    enabled=os.environ.get('AUDIT_LOG', '1') == '1',
+)
+
+# --- Input Drift Monitor ---
+# Constant-memory sketches of every feature priced, scored against the model's training reference on
+# /admin/drift; workers publish snapshots to DRIFT_DIR so the report covers all of them (DRIFT_MONITOR=0 turns it off)
+drift_monitor = DriftMonitor(
+    os.environ.get('DRIFT_DIR', os.path.join(app.instance_path, 'drift')),
+    publish_interval=float(os.environ.get('DRIFT_PUBLISH_INTERVAL', 10)),
+    window_seconds=float(os.environ.get('DRIFT_WINDOW_HOURS', 24)) * 3600,
+    min_samples=int(os.environ.get('DRIFT_MIN_SAMPLES', 100)),
+    enabled=os.environ.get('DRIFT_MONITOR', '1') == '1',
+)
+drift_monitor.check_reference(model_manager.current())
+
+# --- Service Metrics ---
+# Prometheus-format histograms and counters served on /metrics (METRICS_ENABLED=0 turns all updates into no-ops);
+# with METRICS_DIR (serve.py sets it) every worker publishes there and /metrics reports the sum of all workers
+metrics = MetricsRegistry(
+    enabled=os.environ.get('METRICS_ENABLED', '1') == '1',
+    directory=os.environ.get('METRICS_DIR') or None,
+    publish_interval=float(os.environ.get('METRICS_PUBLISH_INTERVAL', 10)),
+)
+STAGE_SECONDS = metrics.histogram('car_price_stage_seconds', 'Time spent in each prediction stage.', ['stage'])
+REQUEST_SECONDS = metrics.histogram('car_price_request_seconds', 'End-to-end request latency.', ['endpoint', 'status'])
+PREDICTIONS = metrics.counter('car_price_predictions_total', 'Prices returned, by source (model or cache).', ['source'])
+UNKNOWN_CATEGORIES = metrics.counter('car_price_unknown_category_total',
+                                     'Unseen category values encoded with the unknown-category policy.', ['column'])
+ERRORS = metrics.counter('car_price_errors_total', 'Prediction errors by type.', ['type'])
+IN_FLIGHT = metrics.gauge('car_price_requests_in_flight', 'Requests currently being handled.')
+
+
+# Registered before require_login so redirected requests are counted too
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    IN_FLIGHT.inc()
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    started = g.pop('request_started', None)
+    if started is not None:
+        IN_FLIGHT.dec()
+        REQUEST_SECONDS.observe(time.perf_counter() - started, request.endpoint or 'unmatched',
+                                g.pop('response_status', 500))
+
+# Upper bound on rows accepted by /api/predict_batch in one request
+MAX_BATCH_ROWS = int(os.environ.get('MAX_BATCH_ROWS', 10000))
+# Upper bound on grid points scored by one /api/what_if request
+MAX_WHAT_IF_POINTS = int(os.environ.get('MAX_WHAT_IF_POINTS', 5000))
+
+# --- Prediction Cache ---
+# LRU/TTL cache of final prices keyed on the encoded feature vector (Car_Age included)
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+    max_bytes=int(os.environ.get('PREDICTION_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+)
+
+# --- Request Coalescing ---
+# Concurrent single predictions are queued and flushed as one model.predict call
+# once PREDICT_BATCH_MAX_SIZE rows are waiting or the oldest waited PREDICT_BATCH_MAX_WAIT_MS;
+# a request with nothing queued behind it is predicted at once.
+PREDICT_BATCHING = os.environ.get('PREDICT_BATCHING', '1') == '1'
+# Longest a request waits for its coalesced prediction before failing
+PREDICT_BATCH_TIMEOUT_S = float(os.environ.get('PREDICT_BATCH_TIMEOUT_S', 5.0))
+inference_scheduler = None  # created by start_background_services()
+
+
+def _score_matrix(matrix, bundle):
+    """Runs one model.predict over the whole matrix and applies the price clamp/rounding."""
+    if len(matrix) == 0:
+        return []
+    return finalize_prices(bundle.predict(matrix))
+
 
 # --- Reusable Prediction Helper Function (FIXED) ---
-def _predict_price(form_data, prefix=''):
+def _audit(form_data, prefix, bundle, vector, price, source, started, error=None, unknowns=None):
+    """Queues the quote (or the failed attempt) on the audit log; serialization happens off the request path."""
+    inputs = form_data
+    if prefix and hasattr(form_data, 'items'):
+        inputs = {k[len(prefix):]: v for k, v in form_data.items() if k.startswith(prefix)}
+    audit_log.record(request.endpoint if has_request_context() else None, bundle.version if bundle else None,
+                     inputs, vector, price, source, round((time.perf_counter() - started) * 1000.0, 3),
+                     error, unknowns or None)
+
+def _predict_price(form_data, prefix='', bundle=None):
+    started = time.perf_counter()
+    vector = None
     try:
-        # This function now expects a dictionary-like object (request.form or request.json)
-        year = int(form_data.get(prefix + 'Year'))
-        present_price = float(form_data.get(prefix + 'Present_Price(Lakhs)'))
-        kms_driven = int(form_data.get(prefix + 'Kms_Driven'))
-        owner = int(form_data.get(prefix + 'Owner'))
-        
-        # --- FIX: These variables are now used ---
-        fuel_type = form_data.get(prefix + 'Fuel_Type')
-        seller_type = form_data.get(prefix + 'Seller_Type')
-        transmission = form_data.get(prefix + 'Transmission')
-        car_name = form_data.get(prefix + 'Car_Name')
-        city = form_data.get(prefix + 'City')
-        condition = form_data.get(prefix + 'Condition')
-        # --- End Fix ---
-
-        mileage = float(form_data.get(prefix + 'Mileage(km/l)'))
-        engine_power = int(form_data.get(prefix + 'Engine_Power(cc)'))
-        maintenance = int(form_data.get(prefix + 'Maintenance_Cost(₹/yr)'))
-        insurance = int(form_data.get(prefix + 'Insurance_Age(yrs)'))
-        accidents = int(form_data.get(prefix + 'Accidents'))
-        
-        car_age = CURRENT_YEAR - year
+        # This function expects a dictionary-like object (request.form or request.json).
+        # Callers that report the model version pass in the bundle they captured.
+        bundle = bundle or model_manager.current()
+        if bundle is None:
+            ERRORS.inc('model_not_loaded')
+            _audit(form_data, prefix, None, None, None, None, started, 'Model not loaded.')
+            return None, None
 
-        if model is None or not model_mappings or not model_columns:
-            print("Model not loaded or incomplete.")
+        # Categorical lookups and feature assembly are one pass over the compiled pipeline
+        with STAGE_SECONDS.time('encode'):
+            vector, errors, unknowns = bundle.pipeline.encode_row(form_data, prefix, CURRENT_YEAR)
+        # Unknown categories and invalid inputs are kept in the audit log with the request
+        for col_name, value in unknowns:
+            UNKNOWN_CATEGORIES.inc(col_name)
+        drift_monitor.observe(bundle, vector, unknowns, errors)
+        if errors:
+            ERRORS.inc('invalid_input')
+            _audit(form_data, prefix, bundle, None, None, None, started, '; '.join(errors), unknowns)
             return None, None
 
-        # Create a dictionary to hold all feature values
-        features = {}
-        
-        # --- Handle Numeric Features ---
-        features['Present_Price(Lakhs)'] = present_price
-        features['Kms_Driven'] = kms_driven
-        features['Owner'] = owner
-        features['Car_Age'] = car_age
-        features['Mileage(km/l)'] = mileage
-        features['Engine_Power(cc)'] = engine_power
-        features['Maintenance_Cost(₹/yr)'] = maintenance
-        features['Insurance_Age(yrs)'] = insurance
-        features['Accidents'] = accidents
-
-        # --- FIX: Handle All Encoded Features ---
-        # This loop now correctly processes all string-based features
-        for col_name in ['Car_Name', 'City', 'Condition', 'Fuel_Type', 'Seller_Type', 'Transmission']:
-            encoder = model_mappings.get(col_name)
-            form_value = form_data.get(prefix + col_name) # Get value from form
-            if encoder:
+        present_price = float(form_data.get(prefix + 'Present_Price(Lakhs)'))
+
+        cache_key = None
+        if prediction_cache.enabled:
+            cache_key = prediction_cache.make_key(vector)
+            cached = prediction_cache.get(cache_key, bundle.version)
+            if cached is not None:
+                PREDICTIONS.inc('cache')
+                _audit(form_data, prefix, bundle, vector, cached, 'cache', started, unknowns=unknowns)
+                return cached, present_price
+
+        # With coalescing on this includes the wait for the batch to fill
+        with STAGE_SECONDS.time('predict'):
+            output = None
+            if inference_scheduler is not None:
                 try:
-                    # Use encoder.transform which expects a list
-                    features[col_name] = encoder.transform([form_value])[0]
-                except ValueError: 
-                    # Handle unseen labels (e.g., a new city) by mapping to 0
-                    print(f"Warning: Unknown category '{form_value}' for column '{col_name}'. Using 0.")
-                    features[col_name] = 0 
-            else:
-                print(f"Warning: No encoder found for column '{col_name}'.")
-
-        # Create the final feature list in the exact order the model was trained on
-        final_features = [features.get(col, 0) for col in model_columns]
-        data_array = [np.array(final_features)]
-
-        prediction = model.predict(data_array)
-        output = round(max(0, float(prediction[0])), 2) # Cast to float
-        
+                    output = finalize_prices([inference_scheduler.predict(vector, bundle, PREDICT_BATCH_TIMEOUT_S)])[0]
+                except SchedulerClosed:
+                    pass  # shutting down (or the worker died): score this row directly
+            if output is None:
+                output = _score_matrix(vector.reshape(1, -1), bundle)[0]
+        PREDICTIONS.inc('model')
+
+        if cache_key is not None:
+            prediction_cache.put(cache_key, output, bundle.version)
+
+        _audit(form_data, prefix, bundle, vector, output, 'model', started, unknowns=unknowns)
         return output, present_price
 
     except Exception as e:
-        print(f"Error in _predict_price (prefix={prefix}): {e}")
+        ERRORS.inc(type(e).__name__)
+        _audit(form_data, prefix, bundle, vector, None, None, started, f"{type(e).__name__}: {e}")
         return None, None
 
+
+def _predict_batch(rows, bundle):
+    """
+    Scores many rows with a single model.predict call. Returns one result dict
+    per input row, so a bad row never fails the rest of the batch.
+    """
+    started = time.perf_counter()
+    results = [{'row': i} for i in range(len(rows))]
+    dict_rows = []
+    for i, row in enumerate(rows):
+        if isinstance(row, dict):
+            dict_rows.append(row)
+        else:
+            dict_rows.append({})
+            results[i]['error'] = 'Row must be a JSON object.'
+
+    with STAGE_SECONDS.time('batch_encode'):
+        matrix, valid, errors, unknowns = bundle.pipeline.encode_rows(dict_rows, current_year=CURRENT_YEAR)
+    for i, result in enumerate(results):
+        if 'error' in result:
+            valid[i] = False
+        elif i in errors:
+            result['error'] = '; '.join(errors[i])
+        elif i in unknowns:
+            result['warnings'] = [f"Unknown category '{value}' for column '{col_name}'."
+                                  for col_name, value in unknowns[i]]
+    for row_unknowns in unknowns.values():
+        for col_name, _ in row_unknowns:
+            UNKNOWN_CATEGORIES.inc(col_name)
+    drift_monitor.observe_many(bundle, matrix, errors, unknowns)
+
+    valid_idx = np.flatnonzero(valid)
+    with STAGE_SECONDS.time('batch_predict'):
+        prices = _score_matrix(matrix[valid_idx], bundle)
+    PREDICTIONS.inc('model', amount=len(valid_idx))
+    quoted = [None] * len(rows)
+    for i, price in zip(valid_idx, prices):
+        results[i]['predicted_price'] = quoted[i] = price
+
+    # One audit entry for the whole batch: every row gets the batch latency
+    audit_log.record_many(request.endpoint if has_request_context() else None, bundle.version, rows, matrix,
+                          quoted, 'model', round((time.perf_counter() - started) * 1000.0, 3),
+                          {i: result['error'] for i, result in enumerate(results) if 'error' in result},
+                          {i: found for i, found in unknowns.items() if isinstance(rows[i], dict)})
+    return results, len(valid_idx)
+
+
+def _read_batch_rows():
+    """Reads batch rows from a JSON array ({'rows': [...]} also accepted) or a CSV body/upload."""
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype in ('text/csv', 'application/csv'):
+        text = upload.read().decode('utf-8-sig') if upload is not None else request.get_data(as_text=True)
+        return list(csv.DictReader(io.StringIO(text)))
+
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('rows')
+    if not isinstance(payload, list):
+        raise ValueError('Expected a JSON array of rows or a CSV body.')
+    return payload
+
 # --- Login & Session Management ---
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -150,9 +403,14 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
-        user = User.query.filter_by(email=email).first()
+        user = _find_user(email)
+        try:
+            password_ok = user is not None and password_hasher.check(user.password_hash, password)
+        except HashingBusy as e:
+            flash(str(e), 'error')
+            return render_template('login.html'), 503
         
-        if user and check_password_hash(user.password_hash, password):
+        if password_ok:
             session['user_email'] = user.email
             session['user_name'] = user.name
             flash('Logged in successfully!', 'success')
@@ -172,12 +430,16 @@ def signup():
     email = request.form['email']
     password = request.form['password']
     
-    existing_user = User.query.filter_by(email=email).first()
+    existing_user = _find_user(email)
     if existing_user:
         flash('Email already exists. Please login.', 'error')
         return redirect(url_for('login'))
         
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = password_hasher.hash(password)
+    except HashingBusy as e:
+        flash(str(e), 'error')
+        return redirect(url_for('login'))
     new_user = User(name=name, email=email, password_hash=hashed_password)
     
     db.session.add(new_user)
@@ -195,66 +457,198 @@ def logout():
     flash('You have been logged out.', 'success')
     return redirect(url_for('login'))
 
+# Admin routes authenticate with the token instead of a user session (and fail closed without one)
+@app.before_request
+def require_admin_token():
+    if not request.path.startswith('/admin/'):
+        return None
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Not found.'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'success': False, 'error': 'Invalid admin token.'}), 403
+    return None
+
 @app.before_request
 def require_login():
-    exempt_routes = ['login', 'signup', 'static']
-    if request.endpoint not in exempt_routes and 'user_email' not in session:
+    exempt_routes = ['login', 'signup', 'static', 'metrics']
+    if request.endpoint not in exempt_routes and not request.path.startswith('/admin/') and 'user_email' not in session:
         return redirect(url_for('login'))
     
     g.user = session.get('user_name')
 
 
 # --- Main App Routes ---
+def _send_page(name, render):
+    """
+    A page that only varies by model version, year and static assets (its ?v=
+    URLs): served from page_cache, revalidated with 304s.
+    """
+    bundle = model_manager.current()
+    if not page_cache.enabled:
+        return render(bundle)
+    key = (name, bundle.version if bundle else None, CURRENT_YEAR, static_assets.version())
+    page = page_cache.get(key, lambda: render(bundle))
+    response = page.respond(request, app.response_class, 'text/html')
+    # Behind the login: browsers may keep it, shared caches may not; always revalidate (a 304 is tiny)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/')
 @app.route('/home')
 def home():
-    return render_template('home.html')
+    return _send_page('home', lambda bundle: render_template('home.html'))
+
+# The form options that index.html needs
+FORM_OPTIONS = {
+    'Year': {'min': 2000, 'max': CURRENT_YEAR},
+    'Kms_Driven': {'min': 0},
+    'Present_Price(Lakhs)': {'min': 0.1, 'step': 0.01},
+    'Owner': {'min': 0, 'max': 5},
+    'Mileage(km/l)': {'min': 5, 'max': 40, 'step': 0.1},
+    'Engine_Power(cc)': {'min': 600, 'max': 5000, 'step': 1},
+    'Maintenance_Cost(₹/yr)': {'min': 0, 'step': 100},
+    'Insurance_Age(yrs)': {'min': 0, 'max': 15},
+    'Accidents': {'min': 0, 'max': 10}
+}
 
 # --- ** THE FIX for UndefinedError ** ---
 @app.route('/predict_page')
 def predict_page():
     # This route serves the HTML and MUST pass the variables
     # that index.html expects.
-    
-    # Define the form options that index.html needs
-    form_options = {
-        'Year': {'min': 2000, 'max': CURRENT_YEAR},
-        'Kms_Driven': {'min': 0},
-        'Present_Price(Lakhs)': {'min': 0.1, 'step': 0.01},
-        'Owner': {'min': 0, 'max': 5},
-        'Mileage(km/l)': {'min': 5, 'max': 40, 'step': 0.1},
-        'Engine_Power(cc)': {'min': 600, 'max': 5000, 'step': 1},
-        'Maintenance_Cost(₹/yr)': {'min': 0, 'step': 100},
-        'Insurance_Age(yrs)': {'min': 0, 'max': 15},
-        'Accidents': {'min': 0, 'max': 10}
-    }
-    
-    return render_template('index.html', 
-                           brand_map=brand_to_model_map, 
-                           form_options=form_options, 
-                           current_year=CURRENT_YEAR)
+    def render(bundle):
+        return render_template('index.html',
+                               brand_map=bundle.catalogue if bundle else {},
+                               form_options=FORM_OPTIONS,
+                               current_year=CURRENT_YEAR)
+
+    return _send_page('predict', render)
 
 
 @app.route('/api/predict', methods=['POST'])
 def api_predict():
     try:
-        form_data = request.json # Get data from fetch
-        prediction, showroom_price = _predict_price(form_data) # Use helper
+        with STAGE_SECONDS.time('parse'):
+            form_data = request.json # Get data from fetch
+        bundle = model_manager.current()
+        prediction, showroom_price = _predict_price(form_data, bundle=bundle) # Use helper
         
         if prediction is not None:
-            return jsonify({
-                'success': True,
-                'predicted_price': prediction,
-                'showroom_price': showroom_price,
-                'details': form_data # Send details back
-            })
+            g.model_version = bundle.version
+            with STAGE_SECONDS.time('serialize'):
+                response = jsonify({
+                    'success': True,
+                    'predicted_price': prediction,
+                    'showroom_price': showroom_price,
+                    'model_version': bundle.version,
+                    'details': form_data # Send details back
+                })
+            return response
         else:
             return jsonify({'success': False, 'error': 'Invalid data received by server.'}), 400
 
     except Exception as e:
+        ERRORS.inc(type(e).__name__)
         print(f"API Prediction Error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/predict_batch', methods=['POST'])
+def api_predict_batch():
+    try:
+        bundle = model_manager.current()
+        if bundle is None:
+            return jsonify({'success': False, 'error': 'Model not loaded.'}), 503
+
+        try:
+            rows = _read_batch_rows()
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        if len(rows) > MAX_BATCH_ROWS:
+            return jsonify({'success': False,
+                            'error': f'Batch too large: {len(rows)} rows (max {MAX_BATCH_ROWS}).'}), 413
+
+        results, scored = _predict_batch(rows, bundle)
+        g.model_version = bundle.version
+        return jsonify({
+            'success': True,
+            'model_version': bundle.version,
+            'count': len(rows),
+            'scored': scored,
+            'failed': len(rows) - scored,
+            'results': results
+        })
+
+    except Exception as e:
+        ERRORS.inc(type(e).__name__)
+        print(f"API Batch Prediction Error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/what_if', methods=['POST'])
+def api_what_if():
+    """
+    Projects one car (same fields as /api/predict) over a grid of years ahead,
+    extra kms, extra owners and extra accidents, scored in one predict call.
+    An optional "grid" object overrides the offsets per axis.
+    """
+    try:
+        bundle = model_manager.current()
+        if bundle is None:
+            return jsonify({'success': False, 'error': 'Model not loaded.'}), 503
+
+        form_data = request.get_json(silent=True)
+        if not isinstance(form_data, dict):
+            return jsonify({'success': False, 'error': 'Expected a JSON object with the car details.'}), 400
+        try:
+            axes = what_if.parse_axes(form_data.get('grid'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if what_if.grid_size(axes) > MAX_WHAT_IF_POINTS:
+            return jsonify({'success': False, 'error': f'Grid too large: {what_if.grid_size(axes)} points '
+                                                       f'(max {MAX_WHAT_IF_POINTS}).'}), 413
+
+        with STAGE_SECONDS.time('encode'):
+            vector, errors, unknowns = bundle.pipeline.encode_row(form_data, current_year=CURRENT_YEAR)
+        for col_name, _ in unknowns:
+            UNKNOWN_CATEGORIES.inc(col_name)
+        if errors:
+            ERRORS.inc('invalid_input')
+            return jsonify({'success': False, 'error': '; '.join(errors)}), 400
+
+        matrix = what_if.expand_grid(vector, bundle.columns, axes)
+        with STAGE_SECONDS.time('what_if_predict'):
+            prices = _score_matrix(matrix, bundle)
+        PREDICTIONS.inc('model', amount=len(prices))
+        base_price, curves, deltas, points = what_if.summarize(prices, axes)
+
+        g.model_version = bundle.version
+        return jsonify({
+            'success': True,
+            'model_version': bundle.version,
+            'base_price': base_price,
+            'axes': axes,
+            'curves': curves,
+            'deltas': deltas,
+            'points': points,
+            'warnings': [f"Unknown category '{value}' for column '{col_name}'." for col_name, value in unknowns]
+        })
+
+    except Exception as e:
+        ERRORS.inc(type(e).__name__)
+        print(f"API What-If Error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/scheduler_stats')
+def api_scheduler_stats():
+    if inference_scheduler is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(inference_scheduler.stats(), enabled=True))
+
+@app.route('/api/cache_stats')
+def api_cache_stats():
+    return jsonify(prediction_cache.stats())
+
 @app.route('/compare', methods=['GET', 'POST'])
 def compare():
     price_a, price_b = None, None
@@ -262,9 +656,13 @@ def compare():
     
     if request.method == 'POST':
         form_data = request.form
+        # Both cars are priced by the same bundle, even if a reload lands in between
+        bundle = model_manager.current()
         # Note: The compare.html form needs to be updated to match the new feature names
-        price_a, _ = _predict_price(form_data, 'a_')
-        price_b, _ = _predict_price(form_data, 'b_')
+        price_a, _ = _predict_price(form_data, 'a_', bundle)
+        price_b, _ = _predict_price(form_data, 'b_', bundle)
+        if bundle is not None:
+            g.model_version = bundle.version
         
         if price_a is None or price_b is None:
             flash('Error: Could not make comparison. Please check all inputs.', 'error')
@@ -277,10 +675,68 @@ def compare():
                            price_a=price_a, 
                            price_b=price_b)
 
+# --- Model Administration ---
+@app.route('/admin/model_status')
+def admin_model_status():
+    return jsonify(model_manager.status())
+
+@app.route('/admin/reload_model', methods=['POST'])
+def admin_reload_model():
+    started = model_manager.reload_async()
+    return jsonify({'success': True, 'started': started, 'status': model_manager.status()}), 202
+
+@app.route('/admin/mail_outbox')
+def admin_mail_outbox():
+    return jsonify(mail_outbox.status())
+
+@app.route('/admin/audit_log')
+def admin_audit_log():
+    return jsonify(audit_log.status())
+
+@app.route('/admin/drift')
+def admin_drift():
+    return jsonify(drift_monitor.report(model_manager.current()))
+
+@app.after_request
+def add_model_version_header(response):
+    # Every prediction response reports the model version that priced it
+    version = g.get('model_version')
+    if version:
+        response.headers['X-Model-Version'] = version
+    g.response_status = response.status_code
+    return response
+
+# Text responses the page cache didn't already encode (JSON APIs, other pages, /metrics)
+@app.after_request
+def compress_response(response):
+    return response_compressor.compress(response, request)
+
+# --- Metrics (Prometheus scrape target, no login) ---
+@app.route('/metrics', endpoint='metrics')
+def metrics_endpoint():
+    if not metrics.enabled:
+        return Response('Metrics are disabled (METRICS_ENABLED=0).\n', status=404, mimetype='text/plain')
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/analysis')
 def analysis():
     return render_template('analysis.html')
 
+@app.route('/api/analysis')
+def api_analysis():
+    # Serve the current snapshot right away; new rows are folded in on a background thread
+    market_analytics.refresh_async(ANALYTICS_REFRESH_INTERVAL)
+    snapshot = market_analytics.snapshot()
+    if snapshot is None:
+        return jsonify({'success': False, 'error': 'Market analytics are still being computed.',
+                        'status': market_analytics.status()}), 503
+
+    response = app.response_class(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    response.last_modified = dt.datetime.fromtimestamp(snapshot.last_modified, dt.timezone.utc)
+    response.cache_control.no_cache = True  # always revalidate; a 304 costs next to nothing
+    return response.make_conditional(request)
+
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
@@ -292,20 +748,16 @@ def contact():
             
             admin_subject = f"New Contact Form: {subject} (from {name})"
             admin_body = f"Message from: {name} ({email})\n\n{message_body}"
-            msg_admin = Message(admin_subject, sender=app.config['MAIL_USERNAME'], recipients=[ADMIN_EMAIL])
-            msg_admin.body = admin_body
-            mail.send(msg_admin)
+            mail_outbox.enqueue(admin_subject, app.config['MAIL_USERNAME'], [ADMIN_EMAIL], admin_body)
             
             user_subject = "We've received your message!"
             user_body = f"Hello {name},\n\nThank you for contacting us. We will get back to you shortly."
-            msg_user = Message(user_subject, sender=app.config['MAIL_USERNAME'], recipients=[email])
-            msg_user.body = user_body
-            mail.send(msg_user)
+            mail_outbox.enqueue(user_subject, app.config['MAIL_USERNAME'], [email], user_body)
 
             flash('Message sent successfully! Please check your email for a confirmation.', 'success')
         
         except Exception as e:
-            print(f"ERROR SENDING EMAIL: {e}")
+            print(f"ERROR QUEUEING EMAIL: {e}")
             flash('Error sending message. Please check server logs and configuration.', 'error')
         
         return redirect(url_for('contact'))
@@ -313,6 +765,39 @@ def contact():
     return render_template('contact.html')
 
 
+# --- Background Services ---
+# Threads don't survive fork(), so everything that runs one starts here: at import for the
+# dev server, or per worker after the fork when serve.py preloads the app (START_BACKGROUND_SERVICES=0)
+def start_background_services(mail_sender=None):
+    global inference_scheduler
+    if PREDICT_BATCHING and inference_scheduler is None:
+        inference_scheduler = InferenceScheduler(
+            lambda matrix, bundle: bundle.predict(matrix),
+            max_batch_size=int(os.environ.get('PREDICT_BATCH_MAX_SIZE', 64)),
+            max_wait_ms=float(os.environ.get('PREDICT_BATCH_MAX_WAIT_MS', 2.0)),
+        )
+    model_manager.watch(MODEL_WATCH_INTERVAL)
+    audit_log.start()
+    drift_monitor.start()
+    metrics.start()
+    if MAIL_OUTBOX_SENDER if mail_sender is None else mail_sender:
+        mail_outbox.start()
+
+def stop_background_services():
+    model_manager.stop()
+    mail_outbox.stop()
+    audit_log.stop()
+    drift_monitor.stop()
+    metrics.stop()
+    market_analytics.stop()
+    password_hasher.shutdown()
+    if inference_scheduler is not None:
+        inference_scheduler.close()
+
+if os.environ.get('START_BACKGROUND_SERVICES', '1') == '1':
+    start_background_services()
+
+
 if __name__ == '__main__':
     # Create the database tables before running the app
     with app.app_context():
@@ -0,0 +1,382 @@
+"""
+Audit log of every price quoted: inputs, encoded features, model version,
+output and latency, for disputes and for retraining.
+
+Request threads call record() (or record_many() for a whole batch request),
+which only appends a tuple to an in-memory buffer: no serialization, no
+locks, no disk I/O on the request path. A background writer wakes every
+flush_interval seconds (or as soon as batch_size records are waiting),
+turns the batch into columns and appends them to the current segment as one
+gzipped JSON line (the feature matrix as base64 little-endian float64), so
+every flushed batch is readable even if the process dies later. Segments are
+plain data: reading one never runs code, whoever wrote it, and zcat | jq
+reads them too.
+
+Segments are audit-<start time>-<pid>.jsonl.gz (one writer per process, so
+prefork workers never share a file). A segment is closed once it reaches
+max_file_bytes and a new one started; beyond max_files the oldest closed
+segments are deleted. Pickled segments (*.pkl.gz) from older versions are
+neither read nor pruned.
+
+Memory is bounded: when max_buffered records are waiting (the disk can't
+keep up), new records are dropped and counted rather than blocking requests.
+Records of a batch that fails to write are counted as lost.
+
+read_audit_log() / iter_audit_log() stream the segments back as DataFrames.
+"""
+import atexit
+import base64
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from worker_processes import lower_thread_priority, pid_alive
+
+SEGMENT_PATTERN = 'audit-*.jsonl.gz'
+# Tuple layout of a buffered record, and the columns of a written batch
+FIELDS = ('ts', 'endpoint', 'model_version', 'inputs', 'features', 'price', 'source', 'latency_ms', 'error',
+          'unknown')
+_MANY = object()  # first item of a buffered record_many() entry
+_PLAIN_TYPES = (dict, list, str, int, float, bool, type(None))
+# Anything JSON has no type for (a NumPy integer, a date) is written as its str(); request payloads
+# cannot be circular, so the (costly) check is skipped
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str, check_circular=False)
+
+
+class AuditLog:
+    def __init__(self, directory, batch_size=256, flush_interval=1.0, max_buffered=100000,
+                 max_file_bytes=64 * 1024 * 1024, max_files=100, compresslevel=1, enabled=True):
+        self.directory = directory
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.max_buffered = int(max_buffered)
+        self.max_file_bytes = int(max_file_bytes)
+        self.max_files = int(max_files)
+        self.compresslevel = int(compresslevel)
+        self.enabled = enabled
+
+        self._buffer = deque()
+        self._extra_rows = 0  # buffered rows beyond one per entry (record_many entries)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # dropped and _extra_rows
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._path = None
+
+        self.dropped = 0
+        self.lost = 0
+        self.written = 0
+        self.batches = 0
+        self.bytes_written = 0
+        self.segments = 0
+        self.last_error = None
+
+    # --- Producer side (request threads) ---
+    def record(self, endpoint, model_version, inputs, features, price, source, latency_ms, error=None,
+               unknown=None):
+        """
+        Queues one quote. `inputs` is the dict-like payload as received and
+        `features` the encoded vector (or None); both are only read by the
+        writer, so callers must not mutate them afterwards.
+        """
+        if not self.enabled:
+            return
+        if len(self._buffer) + self._extra_rows >= self.max_buffered:
+            with self._lock:
+                self.dropped += 1
+            return
+        # deque.append is atomic: no lock needed between request threads and the writer
+        self._buffer.append((time.time(), endpoint, model_version, inputs, features, price, source, latency_ms,
+                             error, unknown))
+        if len(self._buffer) == self.batch_size:
+            self._wake.set()
+
+    def record_many(self, endpoint, model_version, inputs, features, prices, source, latency_ms, errors=None,
+                    unknowns=None):
+        """
+        Queues the rows of one batch request as a single entry: `inputs` and
+        `prices` are per-row lists (price None for a row that wasn't priced),
+        `features` the encoded matrix, `errors` and `unknowns` map a row index
+        to its error message / unknown categories.
+        """
+        n = len(inputs)
+        if not self.enabled or not n:
+            return
+        with self._lock:
+            if len(self._buffer) + self._extra_rows + n > self.max_buffered:
+                self.dropped += n
+                return
+            self._extra_rows += n - 1
+        self._buffer.append((_MANY, time.time(), endpoint, model_version, inputs, features, prices, source,
+                             latency_ms, errors or {}, unknowns or {}))
+        self._wake.set()
+
+    def status(self):
+        return {
+            'enabled': self.enabled,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'segment': self._path,
+            'buffered': len(self._buffer) + self._extra_rows,
+            'written': self.written,
+            'dropped': self.dropped,
+            'lost': self.lost,
+            'batches': self.batches,
+            'bytes_written': self.bytes_written,
+            'bytes_per_record': round(self.bytes_written / self.written, 1) if self.written else None,
+            'segments_started': self.segments,
+            'last_error': self.last_error,
+        }
+
+    # --- Writer side ---
+    def start(self):
+        if self._thread is not None or not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)  # a clean exit still writes what is buffered
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+        with self._flush_lock:
+            self._close_segment()
+
+    def flush(self):
+        """Writes everything buffered so far; returns the number of records written."""
+        with self._flush_lock:
+            written = 0
+            while self._buffer:
+                rows = []
+                while self._buffer and len(rows) < self.batch_size:
+                    rows += self._rows(self._buffer.popleft())
+                # A batch request can bring many more rows than batch_size: keep every write short
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    try:
+                        self._write(batch)
+                        written += len(batch)
+                    except Exception as e:
+                        self.lost += len(batch)
+                        self.last_error = f"{type(e).__name__}: {e}"
+                        print(f"--- Audit log error: {self.last_error} ({len(batch)} records lost) ---")
+                        self._close_segment()  # start afresh on the next batch
+                    time.sleep(0)  # encoding holds the GIL: let waiting request threads run between batches
+            return written
+
+    # --- Internals ---
+    def _run(self):
+        lower_thread_priority()  # idle CPU only: falls behind (up to max_buffered) while requests saturate it
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _rows(self, entry):
+        """A buffered entry as a list of FIELDS tuples."""
+        if entry[0] is not _MANY:
+            return [entry]
+        _, ts, endpoint, version, inputs, features, prices, source, latency_ms, errors, unknowns = entry
+        with self._lock:
+            self._extra_rows -= len(inputs) - 1
+        return [(ts, endpoint, version, row, None if price is None else features[i], price,
+                 None if price is None else source, latency_ms, errors.get(i), unknowns.get(i))
+                for i, (row, price) in enumerate(zip(inputs, prices))]
+
+    def _write(self, rows):
+        ts, endpoint, version, inputs, features, price, source, latency_ms, error, unknown = zip(*rows)
+        widths = np.array([0 if f is None else len(f) for f in features], dtype=np.int16)
+        if widths.min() == widths.max() > 0:
+            matrix = np.stack(features).astype('<f8', copy=False)
+        else:
+            matrix = np.full((len(rows), int(widths.max())), np.nan, dtype='<f8')
+            for i, vector in enumerate(features):
+                if vector is not None:
+                    matrix[i, :len(vector)] = vector
+        columns = {
+            'ts': list(ts),
+            'endpoint': list(endpoint),
+            'model_version': list(version),
+            'inputs': _input_columns(inputs),
+            # One little-endian float64 block, row-major: exact (NaN included) and far cheaper than decimal text
+            'features': base64.b64encode(matrix.tobytes()).decode('ascii'),
+            'feature_count': widths.tolist(),
+            'price': [None if p is None else float(p) for p in price],
+            'source': list(source),
+            'latency_ms': [float(x) for x in latency_ms],
+            'error': list(error),
+            'unknown': list(unknown),
+        }
+        data = gzip.compress((_ENCODER.encode(columns) + '\n').encode('utf-8'), compresslevel=self.compresslevel,
+                             mtime=0)
+
+        if self._file is None or self._file.tell() >= self.max_file_bytes:
+            self._open_segment()
+        self._file.write(data)
+        self._file.flush()
+        self.written += len(rows)
+        self.batches += 1
+        self.bytes_written += len(data)
+
+    def _open_segment(self):
+        self._close_segment()
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now)) + f'.{int(now % 1 * 1e6):06d}'
+        self._path = os.path.join(self.directory, f'audit-{stamp}-{os.getpid()}.jsonl.gz')
+        self._file = open(self._path, 'ab')
+        self.segments += 1
+        self._prune()
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _prune(self):
+        """Deletes the oldest segments beyond max_files, never one another live process is still writing."""
+        if self.max_files <= 0:
+            return
+        segments = sorted(glob.glob(os.path.join(self.directory, SEGMENT_PATTERN)))
+        open_segments = {self._path}
+        newest_by_pid = {}
+        for path in segments:
+            newest_by_pid[_segment_pid(path)] = path
+        for pid, path in newest_by_pid.items():
+            if pid != os.getpid() and pid_alive(pid):
+                open_segments.add(path)
+        closed = [path for path in segments if path not in open_segments]
+        for path in closed[:max(0, len(segments) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _input_columns(inputs):
+    """
+    The batch's payloads as {'columns': [...], 'rows': [[...], ...]} when they
+    are all dicts with the same keys (the usual case, and half the encoding
+    time of repeating every key), else as a list.
+    """
+    # request.form and friends become plain dicts; JSON payloads already are
+    inputs = [x if isinstance(x, _PLAIN_TYPES) else dict(x.items()) if hasattr(x, 'items') else str(x)
+              for x in inputs]
+    first = inputs[0]
+    if not isinstance(first, dict) or not all(isinstance(x, dict) and x.keys() == first.keys() for x in inputs):
+        return inputs
+    columns = list(first)
+    return {'columns': columns, 'rows': [[x[col] for col in columns] for x in inputs]}
+
+
+def _segment_pid(path):
+    try:
+        return int(os.path.basename(path).rsplit('-', 1)[1].split('.', 1)[0])
+    except (IndexError, ValueError):
+        return None
+
+
+# -----------------------------
+# READING
+# -----------------------------
+def _read_segment(path):
+    """Yields the column batches of one segment; a batch cut short by a crash ends it quietly."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                batch = json.loads(line)
+                widths = np.array(batch['feature_count'], dtype=np.int16)
+                features = np.frombuffer(base64.b64decode(batch['features']), dtype='<f8').copy()
+                if isinstance(batch['inputs'], dict):
+                    columns = batch['inputs']['columns']
+                    batch['inputs'] = [dict(zip(columns, row)) for row in batch['inputs']['rows']]
+                batch.update({
+                    'ts': np.array(batch['ts'], dtype=np.float64),
+                    'features': features.reshape(len(widths), int(widths.max()) if len(widths) else 0),
+                    'feature_count': widths,
+                    'price': np.array(batch['price'], dtype=np.float64),  # None (not priced) -> NaN
+                    'latency_ms': np.array(batch['latency_ms'], dtype=np.float64),
+                })
+                yield batch
+        except (EOFError, OSError, ValueError):
+            return
+
+
+def _frame(batches):
+    import pandas as pd
+
+    def column(name):
+        values = [batch[name] for batch in batches]
+        if isinstance(values[0], np.ndarray):
+            return np.concatenate(values)
+        return [value for chunk in values for value in chunk]
+
+    df = pd.DataFrame({
+        'ts': pd.to_datetime(column('ts'), unit='s', utc=True),
+        'endpoint': column('endpoint'),
+        'model_version': column('model_version'),
+        'price': column('price'),
+        'source': column('source'),
+        'latency_ms': column('latency_ms'),
+        'error': column('error'),
+        'unknown': column('unknown'),
+        'features': [row[:width] if width else None for batch in batches
+                     for row, width in zip(batch['features'], batch['feature_count'])],
+    })
+    inputs = pd.DataFrame([r if isinstance(r, dict) else {} for r in column('inputs')], index=df.index)
+    return pd.concat([df, inputs.drop(columns=[c for c in inputs.columns if c in df.columns])], axis=1)
+
+
+def iter_audit_log(directory, since=None, chunk_size=100000):
+    """
+    Yields DataFrames of about chunk_size records, oldest segment first. The
+    inputs become columns (as the client sent them: the dataset's column
+    names), next to ts (UTC), endpoint, model_version, price (NaN if not
+    priced), source, latency_ms, error, unknown and features (the encoded
+    vector). `since` (epoch seconds, or anything pd.Timestamp accepts; naive
+    means UTC) skips older records.
+    """
+    import pandas as pd
+
+    if since is not None and not isinstance(since, (int, float)):
+        since = pd.Timestamp(since)
+        since = (since if since.tzinfo else since.tz_localize('UTC')).timestamp()
+
+    batches, pending = [], 0
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN))):
+        for batch in _read_segment(path):
+            if since is not None:
+                keep = np.flatnonzero(batch['ts'] >= since)
+                if not len(keep):
+                    continue
+                if len(keep) < len(batch['ts']):
+                    batch = {name: values[keep] if isinstance(values, np.ndarray) else [values[i] for i in keep]
+                             for name, values in batch.items()}
+            batches.append(batch)
+            pending += len(batch['ts'])
+            if pending >= chunk_size:
+                yield _frame(batches)
+                batches, pending = [], 0
+    if batches:
+        yield _frame(batches)
+
+
+def read_audit_log(directory, since=None):
+    import pandas as pd
+
+    chunks = list(iter_audit_log(directory, since))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(FIELDS))
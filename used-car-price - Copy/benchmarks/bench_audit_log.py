@@ -0,0 +1,143 @@
+"""
+Request-path cost of the prediction audit log (audit_log.py).
+
+What a request pays is one record() call (or one record_many() call per
+batch request): both are timed in a tight loop, best of --rounds runs with
+the buffer flushed (untimed) between runs, and those µs decide the exit
+code. The writer's own cost per record (JSON lines + gzip, off the request
+path but on the same CPUs) is reported separately, with the bytes per record
+on disk and the time to read the log back as a DataFrame.
+
+For context it also runs _predict_price and /api/predict (Flask test client)
+in alternating blocks with the audit log switched on and off, with its
+background writer running. On a shared machine that difference is mostly
+noise, so it is reported but never gated on. Prediction cache and request
+coalescing are off so every call does the full model path.
+
+Exits with code 1 if record() costs more than --max-record-us or a
+--batch-rows record_many() more than --max-record-many-us.
+
+    python benchmarks/bench_audit_log.py [--calls 2000] [--rounds 5] [--max-record-us 3] [--max-record-many-us 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000, help='calls per block')
+    parser.add_argument('--rounds', type=int, default=5, help='on/off block pairs, and timing runs per primitive')
+    parser.add_argument('--batch-rows', type=int, default=128, help='rows per record_many() call')
+    parser.add_argument('--max-record-us', type=float, default=3.0, help='budget for one record() call')
+    parser.add_argument('--max-record-many-us', type=float, default=20.0,
+                        help='budget for one record_many() call of --batch-rows rows')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['AUDIT_LOG_DIR'] = tmp
+        from audit_log import read_audit_log
+        from run_benchmarks import _load_app, _sample_rows
+
+        app = _load_app()
+        audit_log = app.audit_log
+        audit_log.start()
+        bundle = app.model_manager.current()
+        rows = _sample_rows(args.calls)
+        client = app.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_email'] = 'bench@example.com'
+
+        def run_direct():
+            for row in rows:
+                app._predict_price(row, bundle=bundle)
+
+        def run_http():
+            for row in rows:
+                client.post('/api/predict', json=row)
+
+        results = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for label, run in (('_predict_price', run_direct), ('POST /api/predict', run_http)):
+                run()  # warm-up
+                timings = {True: [], False: []}
+                for _ in range(args.rounds):
+                    for enabled in (False, True):
+                        audit_log.enabled = enabled
+                        t0 = time.perf_counter()
+                        run()
+                        timings[enabled].append((time.perf_counter() - t0) / len(rows) * 1e6)
+                        audit_log.flush()
+                results[label] = (statistics.median(timings[False]), statistics.median(timings[True]))
+        audit_log.enabled = True
+        audit_log.stop()  # the writer's cost is timed in this thread, without a background flush to wait on
+
+        # Cost of queuing one record (what a request pays): best of several runs, flushed in between
+        vectors = [bundle.pipeline.encode_row(row, current_year=app.CURRENT_YEAR)[0] for row in rows]
+        calls = 20000  # stays under max_buffered: nothing is dropped
+        record_us = float('inf')
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            for i in range(calls):
+                audit_log.record('bench', bundle.version, rows[i % len(rows)], vectors[i % len(rows)], 4.2,
+                                 'model', 1.0)
+            record_us = min(record_us, (time.perf_counter() - t0) / calls * 1e6)
+            audit_log.flush()
+
+        batch = rows[:args.batch_rows]
+        matrix, _, _, _ = bundle.pipeline.encode_rows(batch, current_year=app.CURRENT_YEAR)
+        prices = [4.2] * len(batch)
+        batches = 200
+        record_many_us = float('inf')
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            for _ in range(batches):
+                audit_log.record_many('bench', bundle.version, batch, matrix, prices, 'model', 1.0, {}, {})
+            record_many_us = min(record_many_us, (time.perf_counter() - t0) / batches * 1e6)
+            audit_log.flush()
+
+        # Then the writer's cost per record
+        for i in range(calls):
+            audit_log.record('bench', bundle.version, rows[i % len(rows)], vectors[i % len(rows)], 4.2, 'model', 1.0)
+        t0 = time.perf_counter()
+        audit_log.flush()
+        writer_us = (time.perf_counter() - t0) / calls * 1e6
+        status = audit_log.status()
+
+        t0 = time.perf_counter()
+        df = read_audit_log(tmp)
+        read_s = time.perf_counter() - t0
+
+    print(f"\n🧾 Audit log ({status['written']:,} records written, {status['dropped']} dropped, {status['lost']} lost)")
+    print(f"   - record() on the request path: {record_us:.3f} µs (best of {args.rounds})")
+    print(f"   - record_many() of {len(batch)} rows: {record_many_us:.2f} µs (best of {args.rounds})")
+    print(f"   - writer (JSON lines + gzip, background): {writer_us:.2f} µs per record")
+    print(f"   - on disk: {status['bytes_per_record']:.1f} bytes per record")
+    print(f"   - read back: {len(df):,} rows x {df.shape[1]} columns in {read_s:.2f}s")
+
+    print(f"\n📊 End-to-end on/off (median of {args.rounds} blocks x {args.calls} calls; noise-dominated, not gated)")
+    print(f"   {'path':<20}{'off µs':>10}{'on µs':>10}{'difference':>12}")
+    for label, (off, on) in results.items():
+        print(f"   {label:<20}{off:>10.1f}{on:>10.1f}{(on - off) / off * 100:>+11.2f}%")
+
+    over = [f"record() {record_us:.2f} µs > {args.max_record_us} µs"] if record_us > args.max_record_us else []
+    if record_many_us > args.max_record_many_us:
+        over.append(f"record_many() {record_many_us:.1f} µs > {args.max_record_many_us} µs")
+    if over:
+        print(f"❌ Audit log request-path cost over budget: {'; '.join(over)}")
+        sys.exit(1)
+    print(f"✅ Audit log request-path cost within budget (record() {args.max_record_us} µs, "
+          f"record_many() {args.max_record_many_us} µs)")
+
+
+if __name__ == '__main__':
+    main()
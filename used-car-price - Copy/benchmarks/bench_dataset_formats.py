@@ -0,0 +1,143 @@
+"""
+Load time and memory of the dataset formats (dataset_store.py) versus the CSV.
+
+Generates --rows listings as CSV in a temp directory, converts them to Arrow
+IPC (.feather) and Parquet, then loads each one in a fresh interpreter:
+
+  csv, pd.read_csv    what the trainer did before: inferred dtypes, Python strings
+  csv, typed          read_dataset() on the CSV: same parser, compact dtypes
+  feather / parquet   read_dataset() on the columnar copies
+  feather, 3 columns  column projection (what a single report needs)
+  feather, analytics  read_columns(encoded=True): the columns /analysis
+                      aggregates, label codes instead of strings, no pandas
+
+and reports file size, median load time, the DataFrame's own memory
+(memory_usage(deep=True)) and how much the process's resident memory grew
+with the first load (mapped file pages included).
+pandas and pyarrow are imported before timing in every case.
+
+Exits with code 1 if a columnar copy does not hold exactly the CSV's values.
+
+    python benchmarks/bench_dataset_formats.py [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Child script: one kind of load, repeated; prints JSON
+LOAD_CHILD = r'''
+import json, os, statistics, sys, time
+sys.path.insert(0, sys.argv[1])
+import pandas as pd, pyarrow, pyarrow.csv, pyarrow.ipc, pyarrow.parquet
+import dataset_store
+
+case, path, repeat = sys.argv[2], sys.argv[3], int(sys.argv[4])
+columns = ['Brand', 'Car_Name', 'Selling_Price(Lakhs)']
+analytics = ['Selling_Price(Lakhs)', 'Present_Price(Lakhs)', 'Car_Age', 'Brand', 'Car_Name', 'Fuel_Type',
+             'City', 'Condition', 'Seller_Type']
+load = {
+    'pandas': lambda: pd.read_csv(path),
+    'typed': lambda: dataset_store.read_dataset(path),
+    'projection': lambda: dataset_store.read_dataset(path, columns),
+    'analytics': lambda: dataset_store.read_columns(path, analytics, encoded=True),
+}[case]
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+before_mb = rss_mb()
+timings = []
+for _ in range(repeat):
+    t0 = time.perf_counter()
+    data = load()
+    timings.append(time.perf_counter() - t0)
+    if len(timings) == 1:
+        grown_mb = rss_mb() - before_mb
+        if hasattr(data, 'memory_usage'):
+            frame_mb = data.memory_usage(deep=True).sum() / 1e6
+        else:  # {column: array or (codes, labels)}
+            frame_mb = sum((v[0] if isinstance(v, tuple) else v).nbytes for v in data.values()) / 1e6
+    del data
+print(json.dumps({'load_ms': statistics.median(timings) * 1000, 'rss_mb': grown_mb, 'frame_mb': frame_mb}))
+'''
+
+CASES = [
+    ('csv, pd.read_csv', 'csv', 'pandas'),
+    ('csv, typed', 'csv', 'typed'),
+    ('feather', 'feather', 'typed'),
+    ('parquet', 'parquet', 'typed'),
+    ('feather, 3 columns', 'feather', 'projection'),
+    ('feather, analytics', 'feather', 'analytics'),
+]
+
+
+def _run(case, path, repeat):
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', LOAD_CHILD, ROOT, case, path, str(repeat)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _same_values(csv_path, other_path):
+    """True if both files hold the same values (labels compared as strings, numbers at the stored dtype)."""
+    import numpy as np
+    from dataset_store import read_dataset
+
+    expected, actual = read_dataset(csv_path), read_dataset(other_path)
+    if expected.columns.tolist() != actual.columns.tolist() or len(expected) != len(actual):
+        return False
+    for col in expected.columns:
+        a, b = expected[col], actual[col]
+        if a.dtype == 'category':
+            a, b = a.astype(str), b.astype(str)
+        if not np.array_equal(a.to_numpy(), b.to_numpy()):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=60000)
+    parser.add_argument('--repeat', type=int, default=3, help='loads per case (median reported)')
+    args = parser.parse_args()
+
+    from dataset_store import convert
+    from generate_data import generate_dataset
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {ext: os.path.join(tmp, f'cars.{ext}') for ext in ('csv', 'feather', 'parquet')}
+        generate_dataset(paths['csv'], n_rows=args.rows, seed=0)
+        convert_ms = {}
+        for ext in ('feather', 'parquet'):
+            t0 = time.perf_counter()
+            convert(paths['csv'], paths[ext])
+            convert_ms[ext] = (time.perf_counter() - t0) * 1000
+
+        print(f"\n🗄️  Dataset formats: {args.rows:,} rows, median of {args.repeat} load(s), fresh process per case")
+        print(f"   {'format':<22}{'file MB':>9}{'load ms':>10}{'frame MB':>10}{'RSS +MB':>9}{'speedup':>9}")
+        base_ms = None
+        for label, ext, case in CASES:
+            r = _run(case, paths[ext], args.repeat)
+            base_ms = base_ms or r['load_ms']
+            print(f"   {label:<22}{os.path.getsize(paths[ext]) / 1e6:>9.1f}{r['load_ms']:>10.1f}"
+                  f"{r['frame_mb']:>10.1f}{r['rss_mb']:>9.1f}{base_ms / r['load_ms']:>8.1f}x")
+        print(f"   - CSV import: {convert_ms['feather']:.0f} ms to .feather, {convert_ms['parquet']:.0f} ms to .parquet")
+
+        mismatched = [ext for ext in ('feather', 'parquet') if not _same_values(paths['csv'], paths[ext])]
+    if mismatched:
+        print(f"❌ Columnar copies differ from the CSV: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("✅ Columnar copies hold exactly the CSV's values")
+
+
+if __name__ == '__main__':
+    main()
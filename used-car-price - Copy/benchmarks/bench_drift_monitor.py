@@ -0,0 +1,146 @@
+"""
+Request-path cost of the input-drift monitor (drift_monitor.py), and what it
+reports.
+
+Reports:
+  - what a request pays: observe() per row and observe_many() per
+    --batch-rows batch, timed in a tight loop (best of --rounds runs, so
+    noise can only make them look slower), with nothing folded inline
+  - the fold that adds the queued rows to the sketches, per row (off the
+    request path, on the monitor's background thread)
+  - the size of one worker's snapshot and the time to merge --workers of them
+  - drift scores for sampled dataset rows (should read ok) and for the same
+    rows shifted to this year's cars with a third of them in an unknown city
+    (should read drift); needs a model trained with a drift reference
+  - for context, _predict_price in alternating blocks with the monitor on
+    and off (prediction cache and request coalescing off). On a shared
+    machine that difference is mostly noise, so it is not gated on.
+
+Exits with code 1 if observe() costs more than --max-observe-us or an
+observe_many() call more than --max-observe-many-us.
+
+    python benchmarks/bench_drift_monitor.py [--calls 2000] [--rounds 5] [--max-observe-us 2] [--max-observe-many-us 10]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+def _scores(report, features=('Car_Age', 'City')):
+    parts = []
+    for name in features:
+        feature = report['features'].get(name, {})
+        parts.append(f"{name} PSI {feature.get('psi')} ({feature.get('status')})")
+    return ', '.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000, help='calls per block')
+    parser.add_argument('--rounds', type=int, default=5, help='on/off block pairs, and timing runs per call')
+    parser.add_argument('--workers', type=int, default=8, help='worker snapshots merged')
+    parser.add_argument('--batch-rows', type=int, default=128, help='rows per observe_many() call')
+    parser.add_argument('--max-observe-us', type=float, default=2.0, help='budget for one observe() call')
+    parser.add_argument('--max-observe-many-us', type=float, default=10.0,
+                        help='budget for one observe_many() call of --batch-rows rows')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DRIFT_DIR'] = tmp
+        from drift_monitor import DriftMonitor, merge_snapshots
+        from run_benchmarks import _load_app, _sample_rows
+
+        app = _load_app()
+        monitor = app.drift_monitor
+        bundle = app.model_manager.current()
+        rows = _sample_rows(args.calls)
+
+        def run():
+            for row in rows:
+                app._predict_price(row, bundle=bundle)
+
+        timings = {True: [], False: []}
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()  # warm-up
+            for _ in range(args.rounds):
+                for enabled in (False, True):
+                    monitor.enabled = enabled
+                    t0 = time.perf_counter()
+                    run()
+                    timings[enabled].append((time.perf_counter() - t0) / len(rows) * 1e6)
+        off, on = statistics.median(timings[False]), statistics.median(timings[True])
+
+        # The monitor on its own, on a fresh instance that never folds inline: first what requests pay
+        encoded = [bundle.pipeline.encode_row(row, current_year=app.CURRENT_YEAR) for row in rows]
+        baseline = DriftMonitor(fold_rows=sys.maxsize)
+        observe_us = observe_many_us = float('inf')
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            for vector, errors, unknowns in encoded:
+                baseline.observe(bundle, vector, unknowns, errors)
+            observe_us = min(observe_us, (time.perf_counter() - t0) / len(encoded) * 1e6)
+        batch = rows[:args.batch_rows]
+        matrix, _, errors, unknowns = bundle.pipeline.encode_rows(batch, current_year=app.CURRENT_YEAR)
+        batches = max(len(rows) // len(batch), 1)
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            for _ in range(batches):
+                baseline.observe_many(bundle, matrix, errors, unknowns)
+            observe_many_us = min(observe_many_us, (time.perf_counter() - t0) / batches * 1e6)
+        # ... then the background thread's work
+        queued = (len(encoded) + batches * len(batch)) * args.rounds
+        t0 = time.perf_counter()
+        baseline.fold()
+        fold_us = (time.perf_counter() - t0) / queued * 1e6
+
+        snapshot = json.loads(json.dumps(baseline.snapshot()))
+        snapshot_bytes = len(json.dumps(snapshot))
+        t0 = time.perf_counter()
+        merge_snapshots([snapshot] * args.workers)
+        merge_ms = (time.perf_counter() - t0) * 1000
+
+        # Same rows, then as this year's cars with every third one in a city the encoders never saw
+        shifted = DriftMonitor()
+        moved = [dict(row, Year=app.CURRENT_YEAR, City='Atlantis' if i % 3 == 0 else row['City'])
+                 for i, row in enumerate(rows)]
+        matrix, _, errors, unknowns = bundle.pipeline.encode_rows(moved, current_year=app.CURRENT_YEAR)
+        shifted.observe_many(bundle, matrix, errors, unknowns)
+        reports = {'sampled rows': baseline.report(bundle), 'shifted rows': shifted.report(bundle)}
+
+    print(f"\n📈 Drift monitor ({len(bundle.columns)} features)")
+    print(f"   - observe() on the request path: {observe_us:.2f} µs (best of {args.rounds})")
+    print(f"   - observe_many() of {len(batch)} rows: {observe_many_us:.2f} µs (best of {args.rounds})")
+    print(f"   - fold into the sketches (background): {fold_us:.2f} µs per row")
+    print(f"   - snapshot: {snapshot_bytes / 1024:.1f} KB; merging {args.workers}: {merge_ms:.1f} ms")
+    for label, report in reports.items():
+        if not report['features'] or report['reference_rows'] is None:
+            print(f"   - {label}: the model has no drift reference (retrain with car_price_prediction.py)")
+        else:
+            print(f"   - {label}: {report['status']} | {_scores(report)}")
+
+    print(f"\n📊 End-to-end on/off (median of {args.rounds} blocks x {args.calls} calls; noise-dominated, not gated)")
+    print(f"   {'path':<20}{'off µs':>10}{'on µs':>10}{'difference':>12}")
+    print(f"   {'_predict_price':<20}{off:>10.1f}{on:>10.1f}{(on - off) / off * 100:>+11.2f}%")
+
+    over = [f"observe() {observe_us:.2f} µs > {args.max_observe_us} µs"] if observe_us > args.max_observe_us else []
+    if observe_many_us > args.max_observe_many_us:
+        over.append(f"observe_many() {observe_many_us:.1f} µs > {args.max_observe_many_us} µs")
+    if over:
+        print(f"❌ Drift monitor request-path cost over budget: {'; '.join(over)}")
+        sys.exit(1)
+    print(f"✅ Drift monitor request-path cost within budget (observe() {args.max_observe_us} µs, "
+          f"observe_many() {args.max_observe_many_us} µs)")
+
+
+if __name__ == '__main__':
+    main()
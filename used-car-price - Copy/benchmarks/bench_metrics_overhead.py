@@ -0,0 +1,127 @@
+"""
+Overhead of the /metrics instrumentation on the prediction hot path.
+
+Times each metrics primitive in a tight loop (best of --rounds runs, so a
+noisy neighbour can only make it look slower, never faster) and adds them up
+into the instrumentation cost of one /api/predict request: four stage
+timers, the request histogram, the predictions counter and the in-flight
+gauge going up and down. That cost, in µs, decides the exit code.
+
+For context it also runs _predict_price and /api/predict (Flask test client)
+in alternating blocks with metrics switched on and off. On a shared machine
+that difference is mostly noise (several % either way between identical
+runs), so it is reported but never gated on. Prediction cache and request
+coalescing are off so every call does the full model path.
+
+Exits with code 1 if the per-request cost exceeds --max-request-us.
+
+    python benchmarks/bench_metrics_overhead.py [--calls 2000] [--rounds 5] [--max-request-us 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+# Metrics calls made by one POST /api/predict: parse, encode, predict and serialize timers, the request
+# latency observation, the predictions counter, and the in-flight gauge's inc() and dec()
+REQUEST_CALLS = {'histogram.time block': 4, 'histogram.observe': 1, 'counter.inc': 1, 'gauge.inc/dec': 2}
+
+
+def _per_call_us(fn, calls, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / calls * 1e6
+
+
+def primitive_costs(calls=200000, rounds=5):
+    from service_metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram('bench_seconds', 'bench', ['stage'])
+    counter = registry.counter('bench_total', 'bench', ['type'])
+    gauge = registry.gauge('bench_in_flight', 'bench')
+
+    def timed_block():
+        with histogram.time('encode'):
+            pass
+
+    return {
+        'histogram.observe': _per_call_us(lambda: histogram.observe(0.0007, 'encode'), calls, rounds),
+        'histogram.time block': _per_call_us(timed_block, calls, rounds),
+        'counter.inc': _per_call_us(lambda: counter.inc('ValueError'), calls, rounds),
+        'gauge.inc/dec': _per_call_us(gauge.inc, calls, rounds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000, help='calls per block')
+    parser.add_argument('--rounds', type=int, default=5, help='on/off block pairs, and timing runs per primitive')
+    parser.add_argument('--max-request-us', type=float, default=20.0,
+                        help='budget for the metrics calls of one /api/predict request')
+    args = parser.parse_args()
+
+    from run_benchmarks import _load_app, _sample_rows
+
+    app = _load_app()
+    bundle = app.model_manager.current()
+    rows = _sample_rows(args.calls)
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'bench@example.com'
+
+    def run_direct():
+        for row in rows:
+            app._predict_price(row, bundle=bundle)
+
+    def run_http():
+        for row in rows:
+            client.post('/api/predict', json=row)
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for label, run in (('_predict_price', run_direct), ('POST /api/predict', run_http)):
+            run()  # warm-up
+            timings = {True: [], False: []}
+            for _ in range(args.rounds):
+                for enabled in (False, True):
+                    app.metrics.enabled = enabled
+                    t0 = time.perf_counter()
+                    run()
+                    timings[enabled].append((time.perf_counter() - t0) / len(rows) * 1e6)
+            results[label] = (statistics.median(timings[False]), statistics.median(timings[True]))
+    app.metrics.enabled = True
+
+    costs = primitive_costs(rounds=args.rounds)
+    request_us = sum(costs[name] * n for name, n in REQUEST_CALLS.items())
+    print(f"\n📏 Metrics primitives (µs per call, best of {args.rounds})")
+    for name, cost in costs.items():
+        print(f"   - {name:<22}{cost:>8.3f}")
+    print(f"   = {request_us:.1f} µs per /api/predict request "
+          f"({request_us / results['POST /api/predict'][0] * 100:.1f}% of the request)")
+
+    print(f"\n📊 End-to-end on/off (median of {args.rounds} blocks x {args.calls} calls; noise-dominated, not gated)")
+    print(f"   {'path':<20}{'off µs':>10}{'on µs':>10}{'difference':>12}")
+    for label, (off, on) in results.items():
+        print(f"   {label:<20}{off:>10.1f}{on:>10.1f}{(on - off) / off * 100:>+11.2f}%")
+
+    if request_us > args.max_request_us:
+        print(f"❌ Instrumentation costs {request_us:.1f} µs per request, over the {args.max_request_us} µs budget")
+        sys.exit(1)
+    print(f"✅ Instrumentation costs {request_us:.1f} µs per request, within {args.max_request_us} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Load-time benchmark: legacy car_model.pkl vs the car_model/ artifact.
+
+Each load runs in a fresh interpreter. Import cost (numpy, xgboost and whatever
+xgboost pulls in) is reported separately from deserialization, and the
+"total" column is what a server pays at start.
+
+    python benchmarks/bench_model_load.py [--pickle car_model.pkl] [--artifact car_model] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Child script: time imports + load + one prediction, print JSON
+CHILD = r'''
+import json, sys, time, resource
+t0 = time.perf_counter()
+from model_bundle import load_bundle
+import numpy as np
+import xgboost
+t1 = time.perf_counter()
+bundle = load_bundle(sys.argv[1])
+t2 = time.perf_counter()
+bundle.predict(np.zeros((1, len(bundle.columns))))
+t3 = time.perf_counter()
+print(json.dumps({
+    'import_s': t1 - t0, 'load_s': t2 - t1, 'first_predict_s': t3 - t2, 'total_s': t3 - t0,
+    'sklearn_imported': 'sklearn' in sys.modules,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+'''
+
+
+def measure(path, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-W', 'ignore', '-c', CHILD, path], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    summary = {key: statistics.median(s[key] for s in samples)
+               for key in ('import_s', 'load_s', 'first_predict_s', 'total_s', 'peak_rss_mb')}
+    summary['sklearn_imported'] = samples[0]['sklearn_imported']
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pickle', default='car_model.pkl')
+    parser.add_argument('--artifact', default='car_model')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    for label, path in (('pickle', args.pickle), ('artifact', args.artifact)):
+        if not os.path.exists(os.path.join(ROOT, path)):
+            print(f"⚠️  Skipping {label}: '{path}' not found")
+            continue
+        results[label] = measure(path, args.runs)
+
+    print(f"\n📦 Model load benchmark (median of {args.runs} fresh processes)")
+    print(f"{'format':<10}{'import s':>10}{'load s':>10}{'1st pred s':>12}{'total s':>10}{'RSS MB':>9}  sklearn")
+    for label, r in results.items():
+        print(f"{label:<10}{r['import_s']:>10.3f}{r['load_s']:>10.3f}{r['first_predict_s']:>12.4f}"
+              f"{r['total_s']:>10.3f}{r['peak_rss_mb']:>9.1f}  {'yes' if r['sklearn_imported'] else 'no'}")
+    if len(results) == 2:
+        print(f"\n🚀 Artifact deserialization: {results['pickle']['load_s'] / results['artifact']['load_s']:.2f}x faster than pickle")
+        print("   (import time is shared: importing xgboost also imports sklearn/pandas when they are installed)")
+    return results
+
+
+if __name__ == '__main__':
+    main()
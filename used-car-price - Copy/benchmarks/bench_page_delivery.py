@@ -0,0 +1,153 @@
+"""
+Bytes on the wire and time to first byte of the home and predict pages, before
+and after page_delivery.py (page cache, compression, fingerprinted assets).
+
+Starts serve.py (one worker) on a fresh SQLite database twice:
+  before  PAGE_CACHE_SIZE=0 RESPONSE_COMPRESSION=0 STATIC_MAX_AGE=0: every
+          hit re-renders, nothing is compressed, static files revalidate
+  after   the defaults
+and, as a logged-in browser sending Accept-Encoding: gzip, br, measures per page:
+  first visit   the page plus the CSS/JS it links (everything downloaded)
+  repeat visit  what a browser sends again: the page revalidated with
+                If-None-Match, static files revalidated unless their URL is
+                fingerprinted (then the browser cache answers, no request)
+  TTFB          median time to the response headers of a full page GET
+
+    python benchmarks/bench_page_delivery.py [--requests 200]
+"""
+import argparse
+import gzip
+import http.client
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_prefork_scaling import EMAIL, PASSWORD, _free_port  # noqa: E402
+
+PAGES = ['/home', '/predict_page']
+BROWSER_HEADERS = {'Accept-Encoding': 'gzip, br'}
+SETUPS = [
+    ('before', {'PAGE_CACHE_SIZE': '0', 'RESPONSE_COMPRESSION': '0', 'STATIC_MAX_AGE': '0'}),
+    ('after', {}),
+]
+
+
+def _wire_bytes(response, body):
+    """Status line + headers + body, as sent."""
+    head = f'HTTP/1.1 {response.status} {response.reason}\r\n'
+    head += ''.join(f'{key}: {value}\r\n' for key, value in response.getheaders()) + '\r\n'
+    return len(head.encode('latin-1')) + len(body)
+
+
+def _get(conn, path, headers):
+    """(response, body, wire bytes, seconds to the response headers)"""
+    t0 = time.perf_counter()
+    conn.request('GET', path, headers=headers)
+    response = conn.getresponse()
+    ttfb = time.perf_counter() - t0
+    body = response.read()
+    return response, body, _wire_bytes(response, body), ttfb
+
+
+def _decoded(response, body):
+    encoding = response.getheader('Content-Encoding')
+    if encoding == 'br':
+        import brotli
+        body = brotli.decompress(body)
+    elif encoding == 'gzip':
+        body = gzip.decompress(body)
+    return body.decode()
+
+
+def _validator(response):
+    """The If-None-Match a browser would send next time (nothing without an ETag: full download)."""
+    etag = response.getheader('ETag')
+    return {'If-None-Match': etag} if etag else {}
+
+
+def _login(conn):
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    conn.request('POST', '/signup', urllib.parse.urlencode({'name': 'bench', 'email': EMAIL, 'password': PASSWORD}),
+                 headers)
+    conn.getresponse().read()
+    conn.request('POST', '/login', urllib.parse.urlencode({'email': EMAIL, 'password': PASSWORD}), headers)
+    response = conn.getresponse()
+    response.read()
+    return response.getheader('Set-Cookie', '').split(';', 1)[0]
+
+
+def _visit(conn, page, headers):
+    """First and repeat visit of `page`: (first bytes, first requests, repeat bytes, repeat requests)."""
+    response, body, page_bytes, _ = _get(conn, page, headers)
+    if response.status != 200:
+        raise RuntimeError(f'{page} returned {response.status}')
+    assets = re.findall(r'(?:href|src)="(/static/[^"]+\.(?:css|js)[^"]*)"', _decoded(response, body))
+    first_bytes, first_requests = page_bytes, 1
+    repeat = [(page, _validator(response))]
+    for url in assets:
+        asset_response, _, asset_bytes, _ = _get(conn, url, headers)
+        first_bytes += asset_bytes
+        first_requests += 1
+        if 'immutable' not in (asset_response.getheader('Cache-Control') or ''):
+            repeat.append((url, _validator(asset_response)))
+
+    repeat_bytes = 0
+    for url, conditional in repeat:
+        _, _, wire, _ = _get(conn, url, dict(headers, **conditional))
+        repeat_bytes += wire
+    return first_bytes, first_requests, repeat_bytes, len(repeat)
+
+
+def run(label, overrides, args):
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'users.db')}",
+                   MAIL_OUTBOX_PATH=os.path.join(tmp, 'outbox.db'), MAIL_OUTBOX_SENDER='0',
+                   MODEL_WATCH_INTERVAL='0', PASSWORD_HASH_WORKERS='0', **overrides)
+        proc = subprocess.Popen([sys.executable, '-W', 'ignore', 'serve.py', '--host', '127.0.0.1',
+                                 '--port', str(port), '--workers', '1'],
+                                cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+        try:
+            while 'ready' not in (line := proc.stdout.readline()):
+                if not line:
+                    raise RuntimeError('serve.py exited before its worker was ready')
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            headers = dict(BROWSER_HEADERS, Cookie=_login(conn))
+            results = {}
+            for page in PAGES:
+                visit = _visit(conn, page, headers)
+                timings = [_get(conn, page, headers)[3] for _ in range(args.requests)]
+                results[page] = visit + (statistics.median(timings) * 1000,)
+        finally:
+            proc.terminate()
+            proc.wait(30)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='page GETs timed per page and setup')
+    args = parser.parse_args()
+
+    print(f"\n📦 Page delivery: one worker, keep-alive, Accept-Encoding: {BROWSER_HEADERS['Accept-Encoding']}")
+    print(f"   {'page':<15}{'setup':<8}{'first visit':>18}{'repeat visit':>18}{'TTFB ms':>10}")
+    results = {label: run(label, overrides, args) for label, overrides in SETUPS}
+    for page in PAGES:
+        for label, _ in SETUPS:
+            first, first_n, repeat, repeat_n, ttfb = results[label][page]
+            print(f"   {page:<15}{label:<8}{first:>9,} B / {first_n:>2}r{repeat:>9,} B / {repeat_n:>2}r{ttfb:>10.2f}")
+        before, after = results['before'][page], results['after'][page]
+        print(f"   {'':<15}{'change':<8}{after[0] / before[0] - 1:>17.0%} {after[2] / before[2] - 1:>17.0%} "
+              f"{after[4] / before[4] - 1:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
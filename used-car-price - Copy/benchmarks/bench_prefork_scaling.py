@@ -0,0 +1,182 @@
+"""
+Throughput scaling of the prefork server (serve.py) with the number of workers.
+
+For each --workers setting: starts serve.py on a fresh SQLite database in a
+temp directory, signs up and logs in one user, then drives POST /api/predict
+from several client processes over keep-alive connections for --seconds and
+reports requests/s, speedup and parallel efficiency versus one worker, plus
+each worker's resident (RSS) and proportional (PSS) memory: RSS much larger
+than PSS means the preloaded model is shared copy-on-write. The prediction
+cache is off, so every request runs the model.
+
+Clients burn CPU too, so on a small box they compete with the workers; give
+the load generator its own cores (or machine) for clean numbers.
+
+    python benchmarks/bench_prefork_scaling.py [--workers 1,2,4] [--seconds 10] [--connections-per-worker 4]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+EMAIL, PASSWORD = 'bench@example.com', 'correct horse battery staple'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _default_workers():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return ','.join(map(str, counts))
+
+
+def _login(port):
+    """Signs up and logs in; returns the session cookie."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    conn.request('POST', '/signup', urllib.parse.urlencode({'name': 'bench', 'email': EMAIL, 'password': PASSWORD}),
+                 headers)
+    conn.getresponse().read()
+    conn.request('POST', '/login', urllib.parse.urlencode({'email': EMAIL, 'password': PASSWORD}), headers)
+    response = conn.getresponse()
+    response.read()
+    cookie = response.getheader('Set-Cookie', '')
+    if response.status != 302 or 'session=' not in cookie:
+        raise RuntimeError('could not log in the benchmark user')
+    return cookie.split(';', 1)[0]
+
+
+def _memory_kb(pid):
+    stats = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                stats[key] = int(value.split()[0])
+    return stats
+
+
+def _client(port, cookie, bodies, connections, seconds, results):
+    """One load-generating process: `connections` keep-alive connections served round-robin by threads."""
+    import threading
+
+    deadline = time.perf_counter() + seconds
+    counts = [0, 0]  # ok, failed
+    lock = threading.Lock()
+
+    def loop(offset):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        headers = {'Content-Type': 'application/json', 'Cookie': cookie}
+        i, ok, failed = offset, 0, 0
+        while time.perf_counter() < deadline:
+            try:
+                conn.request('POST', '/api/predict', bodies[i % len(bodies)], headers)
+                response = conn.getresponse()
+                response.read()
+                ok += response.status == 200
+                failed += response.status != 200
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            i += 1
+        with lock:
+            counts[0] += ok
+            counts[1] += failed
+
+    threads = [threading.Thread(target=loop, args=(k * 997,)) for k in range(connections)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put(tuple(counts))
+
+
+def run(workers, args, bodies):
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'users.db')}",
+                   MAIL_OUTBOX_PATH=os.path.join(tmp, 'outbox.db'), MAIL_OUTBOX_SENDER='0',
+                   MODEL_WATCH_INTERVAL='0', PREDICTION_CACHE_SIZE='0', PASSWORD_HASH_WORKERS='0')
+        proc = subprocess.Popen([sys.executable, '-W', 'ignore', 'serve.py', '--host', '127.0.0.1',
+                                 '--port', str(port), '--workers', str(workers),
+                                 '--model-threads', str(args.model_threads)],
+                                cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+        try:
+            ready, worker_pids = 0, []
+            while ready < workers:
+                line = proc.stdout.readline()
+                if not line:
+                    raise RuntimeError('serve.py exited before its workers were ready')
+                pids = re.findall(r'Worker \d+ \(pid (\d+)\) ready', line)
+                ready += len(pids)
+                worker_pids += [int(pid) for pid in pids]
+            cookie = _login(port)
+
+            connections = workers * args.connections_per_worker
+            n_clients = max(1, min(args.client_processes, connections))
+            results = multiprocessing.Queue()
+            clients = [multiprocessing.Process(target=_client, args=(
+                port, cookie, bodies[k::n_clients], connections // n_clients + (k < connections % n_clients),
+                args.seconds, results)) for k in range(n_clients)]
+            for c in clients:
+                c.start()
+            totals = [results.get(timeout=args.seconds + 60) for _ in clients]
+            for c in clients:
+                c.join()
+            memory = [_memory_kb(pid) for pid in worker_pids]
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+    ok = sum(t[0] for t in totals)
+    return {'workers': workers, 'rps': ok / args.seconds, 'failed': sum(t[1] for t in totals),
+            'rss_mb': sum(m['Rss'] for m in memory) / len(memory) / 1024,
+            'pss_mb': sum(m['Pss'] for m in memory) / len(memory) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default=_default_workers(), help='comma-separated worker counts')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--connections-per-worker', type=int, default=4)
+    parser.add_argument('--client-processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--model-threads', type=int, default=1)
+    args = parser.parse_args()
+
+    from run_benchmarks import _sample_rows
+    bodies = [json.dumps(row) for row in _sample_rows(2000)]
+
+    print(f"\n🚀 Prefork scaling: {args.seconds:.0f}s per run, {args.connections_per_worker} connections per worker, "
+          f"{args.model_threads} XGBoost thread(s) per worker, {os.cpu_count()} CPU(s)")
+    print(f"   {'workers':<9}{'req/s':>9}{'speedup':>9}{'efficiency':>12}{'RSS MB':>9}{'PSS MB':>9}")
+    base = None  # (workers, req/s) of the first run
+    for workers in [int(w) for w in args.workers.split(',')]:
+        r = run(workers, args, bodies)
+        base = base or (workers, r['rps'])
+        speedup = r['rps'] / base[1]
+        print(f"   {workers:<9}{r['rps']:>9.0f}{speedup:>8.2f}x{speedup * base[0] / workers:>11.0%}"
+              f"{r['rss_mb']:>9.1f}{r['pss_mb']:>9.1f}" + (f"  ({r['failed']} failed)" if r['failed'] else ''))
+
+
+if __name__ == '__main__':
+    main()
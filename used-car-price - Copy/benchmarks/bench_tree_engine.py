@@ -0,0 +1,100 @@
+"""
+Compiled NumPy trees (tree_engine.py) versus XGBoost's own predict().
+
+  1. Agreement: both engines score the trainer's test split (same
+     train_test_split(test_size=0.2, random_state=42)); reports the max
+     absolute difference and how many final (rounded) prices differ.
+  2. Latency: median model.predict time at batch sizes 1, 16 and 1024 (and
+     any --batch-sizes you add), single-threaded and with XGBoost's default
+     threads.
+
+Exits with code 1 if any prediction differs by more than --tolerance.
+
+    python benchmarks/bench_tree_engine.py [--model car_model.pkl] [--batch-sizes 1,16,1024]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _median_ms(fn, min_seconds=0.5, min_runs=20):
+    fn()  # warm-up
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() - started < min_seconds:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000.0
+
+
+def _test_split(bundle, dataset):
+    from sklearn.model_selection import train_test_split
+    from dataset_store import read_dataset
+
+    df = read_dataset(dataset, bundle.columns)
+    matrix, valid, _, _ = bundle.pipeline.encode_columns({col: df[col] for col in bundle.columns}, len(df),
+                                                         cast_inputs=False)
+    _, X_test = train_test_split(matrix[valid], test_size=0.2, random_state=42)
+    return X_test
+
+
+def main():
+    from dataset_store import find_dataset
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.path.join(ROOT, 'car_model.pkl'))
+    parser.add_argument('--dataset', default=find_dataset(ROOT))
+    parser.add_argument('--batch-sizes', default='1,16,1024')
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    args = parser.parse_args()
+
+    from feature_pipeline import finalize_prices
+    from model_artifact import trimmed_booster
+    from model_bundle import load_bundle
+    from tree_engine import compile_model
+
+    bundle = load_bundle(args.model)
+    booster = trimmed_booster(bundle.model)
+    t0 = time.perf_counter()
+    compiled = compile_model(bundle.model)
+    compile_ms = (time.perf_counter() - t0) * 1000.0
+
+    # --- Agreement on the test split ---
+    X_test = _test_split(bundle, args.dataset)
+    reference = np.asarray(bundle.predict(X_test))
+    ours = compiled.predict(X_test)
+    max_diff = float(np.max(np.abs(reference - ours)))
+    price_flips = int(np.sum(np.asarray(finalize_prices(reference)) != np.asarray(finalize_prices(ours))))
+
+    print(f"\n🌲 Compiled trees: {compiled.num_trees} trees, depth {compiled.max_depth}, "
+          f"compiled + verified in {compile_ms:.0f} ms")
+    print(f"   - test split: {len(X_test)} rows, max |diff| {max_diff:.3g}, "
+          f"{price_flips} final prices differ")
+
+    # --- Latency ---
+    print(f"   {'batch':>7}{'xgb 1 thr':>12}{'xgb default':>13}{'numpy':>10}{'speedup':>10}   (median ms)")
+    for size in [int(s) for s in args.batch_sizes.split(',')]:
+        X = X_test[np.arange(size) % len(X_test)]
+        booster.set_param({'nthread': 1})
+        xgb_one = _median_ms(lambda: bundle.predict(X))
+        booster.set_param({'nthread': 0})  # XGBoost's default: all cores
+        xgb_all = _median_ms(lambda: bundle.predict(X))
+        numpy_ms = _median_ms(lambda: compiled.predict(X))
+        print(f"   {size:>7}{xgb_one:>12.3f}{xgb_all:>13.3f}{numpy_ms:>10.3f}{min(xgb_one, xgb_all) / numpy_ms:>9.2f}x")
+
+    if max_diff > args.tolerance:
+        print(f"❌ Compiled trees differ from XGBoost by {max_diff:.3g} (tolerance {args.tolerance})")
+        sys.exit(1)
+    print("✅ Compiled trees match XGBoost")
+
+
+if __name__ == '__main__':
+    main()
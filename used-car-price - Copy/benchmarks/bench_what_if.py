@@ -0,0 +1,84 @@
+"""
+Cost of a 200-point what-if grid versus a single prediction.
+
+Compares, through the Flask test client:
+  - one POST /api/predict
+  - one POST /api/what_if with a 200-point grid (5 x 10 x 2 x 2)
+  - the 200 POST /api/predict calls the frontend would otherwise make
+Prediction cache and request coalescing are off, so every call hits the model.
+
+    python benchmarks/bench_what_if.py [--repeats 30]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+GRID = {
+    'years_ahead': [0, 1, 2, 3, 4],
+    'extra_kms': [0, 10000, 20000, 30000, 40000, 50000, 60000, 70000, 80000, 90000],
+    'extra_owners': [0, 1],
+    'extra_accidents': [0, 1],
+}
+
+
+def _median_ms(fn, repeats):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    from run_benchmarks import _load_app, _sample_rows
+
+    app = _load_app()
+    car = _sample_rows(1)[0]
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'bench@example.com'
+
+    # The same 200 cars the grid describes, as individual /api/predict payloads
+    singles = [dict(car, **{'Year': car['Year'] - years, 'Kms_Driven': car['Kms_Driven'] + kms,
+                            'Owner': car['Owner'] + owners, 'Accidents': car['Accidents'] + accidents})
+               for years in GRID['years_ahead'] for kms in GRID['extra_kms']
+               for owners in GRID['extra_owners'] for accidents in GRID['extra_accidents']]
+
+    def one_predict():
+        assert client.post('/api/predict', json=car).status_code == 200
+
+    def grid():
+        response = client.post('/api/what_if', json=dict(car, grid=GRID))
+        assert response.status_code == 200 and len(response.get_json()['points']) == len(singles)
+
+    def many_predicts():
+        for payload in singles:
+            client.post('/api/predict', json=payload)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        single_ms = _median_ms(one_predict, args.repeats)
+        grid_ms = _median_ms(grid, args.repeats)
+        loop_ms = _median_ms(many_predicts, max(3, args.repeats // 10))
+
+    print(f"\n📈 What-if grid benchmark ({len(singles)} points, median)")
+    print(f"   - 1 x /api/predict:              {single_ms:8.2f} ms")
+    print(f"   - 1 x /api/what_if (200 points): {grid_ms:8.2f} ms  ({grid_ms / single_ms:.1f}x one prediction)")
+    print(f"   - 200 x /api/predict:            {loop_ms:8.2f} ms  ({loop_ms / grid_ms:.0f}x slower than the grid)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+End-to-end check of the contact-form mail outbox against a local stand-in
+SMTP server (no network, no real mail).
+
+  1. The SMTP server starts "down" (421 on connect); /contact is posted
+     --messages times and must still answer in milliseconds.
+  2. The sender's attempts fail and are retried with backoff.
+  3. The server comes up; every queued mail must arrive exactly once, over
+     fewer SMTP connections than messages.
+
+Exits with code 1 on any failed expectation.
+
+    python benchmarks/check_mail_outbox.py [--messages 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class StandInSMTP(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.up = False
+        self.connections = 0
+        self.messages = []  # (recipients, data)
+        self.lock = threading.Lock()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        if not server.up:
+            self.reply('421 stand-in server is down')
+            return
+        with server.lock:
+            server.connections += 1
+        self.reply('220 stand-in ESMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply('250-stand-in')
+                self.reply('250 8BITMIME')
+            elif verb in ('HELO', 'NOOP'):
+                self.reply('250 ok')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 ok')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip(' <>'))
+                self.reply('250 ok')
+            elif verb == 'DATA':
+                self.reply('354 end with .')
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b'.\r\n', b'.\n', b''):
+                        break
+                    data.append(chunk)
+                with server.lock:
+                    server.messages.append((recipients, b''.join(data)))
+                self.reply('250 queued')
+            elif verb == 'RSET':
+                recipients = []
+                self.reply('250 ok')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20, help='contact-form submissions')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    smtp = StandInSMTP()
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+    tmp = tempfile.mkdtemp()
+
+    os.chdir(ROOT)
+    os.environ.update({
+        'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': str(smtp.server_address[1]), 'MAIL_USE_TLS': '0',
+        'MAIL_USERNAME': 'noreply@example.com', 'MAIL_PASSWORD': '', 'ADMIN_EMAIL': 'admin@example.com',
+        'MAIL_OUTBOX_PATH': os.path.join(tmp, 'outbox.db'), 'MAIL_OUTBOX_BACKOFF': '0.5',
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'users.db')}", 'MODEL_WATCH_INTERVAL': '0',
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'visitor@example.com'
+
+    failures = []
+    latencies = []
+    for i in range(args.messages):
+        form = {'name': f'Visitor {i}', 'email': f'visitor{i}@example.com', 'subject': f'Question {i}',
+                'message': 'How much is my car worth?'}
+        t0 = time.perf_counter()
+        response = client.post('/contact', data=form)
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code != 302:
+            failures.append(f'/contact returned {response.status_code}')
+
+    time.sleep(1.5)  # let the sender hit the down server and schedule retries
+    down_status = app.mail_outbox.status()
+    if down_status['failed_attempts'] == 0:
+        failures.append('no delivery attempt failed while the SMTP server was down')
+
+    smtp.up = True
+    expected = 2 * args.messages
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline and len(smtp.messages) < expected:
+        time.sleep(0.1)
+    time.sleep(0.5)  # catch duplicates arriving late
+    app.mail_outbox.stop()
+    status = app.mail_outbox.status()
+
+    recipients = sorted(r for rcpts, _ in smtp.messages for r in rcpts)
+    wanted = sorted(['admin@example.com'] * args.messages + [f'visitor{i}@example.com' for i in range(args.messages)])
+    if recipients != wanted:
+        failures.append(f'delivered {len(smtp.messages)} mails to the wrong recipients (expected {expected})')
+    if status['pending'] or status['dead']:
+        failures.append(f"{status['pending']} pending / {status['dead']} dead after the server came back")
+    if smtp.connections >= expected:
+        failures.append(f'{smtp.connections} SMTP connections for {expected} mails (no connection reuse)')
+
+    ms = sorted(t * 1000.0 for t in latencies)
+    print(f"\n📬 Mail outbox check ({args.messages} contact forms -> {expected} mails)")
+    print(f"   - /contact latency: p50 {statistics.median(ms):.2f} ms, max {ms[-1]:.2f} ms (SMTP server down)")
+    print(f"   - failed attempts while down: {down_status['failed_attempts']}")
+    print(f"   - delivered: {len(smtp.messages)} mails over {smtp.connections} SMTP connection(s)")
+    if failures:
+        print("❌ " + '; '.join(failures))
+        sys.exit(1)
+    print("✅ Every mail delivered exactly once after retries")
+
+
+if __name__ == '__main__':
+    main()
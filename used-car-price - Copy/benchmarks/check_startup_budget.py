@@ -0,0 +1,106 @@
+"""
+Cold-start budget check for the web server.
+
+Imports app.py in fresh interpreters (exactly what a worker does on boot) and
+fails with exit code 1 if the median start-up time or peak RSS exceeds its
+budget, or if pandas/sklearn ended up in the serving process.
+tests/test_startup_budget.py enforces the same budgets in the test suite.
+
+    python benchmarks/check_startup_budget.py [--max-seconds 1.5] [--max-rss-mb 160] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must never be imported by a serving worker
+FORBIDDEN_MODULES = ['pandas', 'sklearn']
+MAX_SECONDS = float(os.environ.get('STARTUP_BUDGET_S', 1.5))
+MAX_RSS_MB = float(os.environ.get('STARTUP_BUDGET_RSS_MB', 160))
+
+# Peak RSS is VmHWM, this process's own high-water mark: ru_maxrss carries the parent's over fork/exec
+CHILD = r'''
+import contextlib, io, json, resource, sys, time
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+elapsed = time.perf_counter() - t0
+print(json.dumps({
+    'startup_s': elapsed,
+    'peak_rss_mb': peak_rss_mb(),
+    'model_loaded': app.model_manager.current() is not None,
+    'imported': [m for m in %r if m in sys.modules],
+}))
+''' % (FORBIDDEN_MODULES,)
+
+
+def measure(runs=3):
+    env = dict(os.environ, MODEL_WATCH_INTERVAL='0')
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-W', 'ignore', '-c', CHILD], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def summarize(samples):
+    """(median start-up seconds, median peak RSS MB, forbidden modules imported, model loaded everywhere)."""
+    return (statistics.median(s['startup_s'] for s in samples),
+            statistics.median(s['peak_rss_mb'] for s in samples),
+            sorted({m for s in samples for m in s['imported']}),
+            all(s['model_loaded'] for s in samples))
+
+
+def budget_failures(samples, max_seconds=MAX_SECONDS, max_rss_mb=MAX_RSS_MB):
+    startup, rss, imported, loaded = summarize(samples)
+    failures = []
+    if not loaded:
+        failures.append('model failed to load')
+    if startup > max_seconds:
+        failures.append(f'start-up {startup:.3f} s > {max_seconds} s')
+    if rss > max_rss_mb:
+        failures.append(f'RSS {rss:.1f} MB > {max_rss_mb} MB')
+    if imported:
+        failures.append(f"serving process imported {', '.join(imported)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-seconds', type=float, default=MAX_SECONDS)
+    parser.add_argument('--max-rss-mb', type=float, default=MAX_RSS_MB)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    samples = measure(args.runs)
+    startup, rss, _, loaded = summarize(samples)
+
+    print(f"\n⏱️  Worker cold start (median of {args.runs}): {startup:.3f} s (budget {args.max_seconds} s)")
+    print(f"🧠 Peak RSS per worker: {rss:.1f} MB (budget {args.max_rss_mb} MB)")
+    print(f"📦 Model loaded: {'yes' if loaded else 'NO'}")
+
+    failures = budget_failures(samples, args.max_seconds, args.max_rss_mb)
+    if failures:
+        print("❌ Budget exceeded: " + '; '.join(failures))
+        sys.exit(1)
+    print("✅ Within start-up budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Load test: prediction latency during a login storm.
+
+Starts the app in a real threaded HTTP server (fresh SQLite database in a
+temp directory), keeps a few clients calling /api/predict back to back and
+measures their latency, first on a quiet server and then while other clients
+hammer POST /login. Runs once per --hash-workers setting, so inline hashing
+(0) can be compared with the bounded pool.
+
+    python benchmarks/load_login_storm.py [--hash-workers 0,1] [--seconds 10] [--predict-clients 2] [--login-clients 8]
+"""
+import argparse
+import contextlib
+import http.cookiejar
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+EMAIL, PASSWORD = 'storm@example.com', 'correct horse battery staple'
+
+SERVER = r'''
+import contextlib, io, sys
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+with app.app.app_context():
+    app.db.create_all()
+    if app._find_user(sys.argv[2]) is None:
+        app.db.session.add(app.User(name='storm', email=sys.argv[2], password_hash=app.password_hasher.hash(sys.argv[3])))
+        app.db.session.commit()
+from werkzeug.serving import WSGIRequestHandler, make_server
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+server = make_server('127.0.0.1', int(sys.argv[1]), app.app, threaded=True, request_handler=QuietHandler)
+print('ready', flush=True)
+server.serve_forever()
+'''
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _client(base):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def send(path, data=None, json_body=None):
+        if data is None and json_body is None:
+            req = urllib.request.Request(base + path)
+        elif json_body is not None:
+            req = urllib.request.Request(base + path, data=json.dumps(json_body).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        else:
+            req = urllib.request.Request(base + path, data=urllib.parse.urlencode(data).encode())
+        try:
+            with opener.open(req, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    return send
+
+
+@contextlib.contextmanager
+def running_server(hash_workers):
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'users.db')}",
+                   PASSWORD_HASH_WORKERS=str(hash_workers), MODEL_WATCH_INTERVAL='0',
+                   PREDICTION_CACHE_SIZE='0')
+        proc = subprocess.Popen([sys.executable, '-W', 'ignore', '-c', SERVER, str(port), EMAIL, PASSWORD],
+                                cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+        try:
+            if proc.stdout.readline().strip() != 'ready':
+                raise RuntimeError('server failed to start')
+            yield f'http://127.0.0.1:{port}'
+        finally:
+            proc.terminate()
+            proc.wait(10)
+
+
+def run_phase(base, rows, seconds, predict_clients, login_clients):
+    stop = threading.Event()
+    latencies, logins, failures = [], [0], [0]
+    lock = threading.Lock()
+
+    predictors = []
+    for _ in range(predict_clients):
+        send = _client(base)
+        if send('/login', {'email': EMAIL, 'password': PASSWORD}) != 302:
+            raise RuntimeError('could not log in the prediction client')
+        predictors.append(send)
+
+    def predict_loop(send, offset):
+        i = offset
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            status = send('/api/predict', json_body=rows[i % len(rows)])
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                failures[0] += status != 200
+            i += 1
+
+    def login_loop():
+        send = _client(base)
+        while not stop.is_set():
+            status = send('/login', {'email': EMAIL, 'password': PASSWORD})
+            with lock:
+                logins[0] += status == 302
+            send('/logout')  # so the next POST /login really checks the password
+
+    threads = [threading.Thread(target=predict_loop, args=(send, k * 1000)) for k, send in enumerate(predictors)]
+    threads += [threading.Thread(target=login_loop) for _ in range(login_clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    ms = np.asarray(latencies) * 1000.0
+    return {'predictions': len(ms), 'failed': failures[0], 'p50_ms': float(np.percentile(ms, 50)),
+            'p99_ms': float(np.percentile(ms, 99)), 'logins_per_sec': logins[0] / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hash-workers', default='0,1', help='comma-separated PASSWORD_HASH_WORKERS settings')
+    parser.add_argument('--seconds', type=float, default=10.0, help='duration of each phase')
+    parser.add_argument('--predict-clients', type=int, default=2)
+    parser.add_argument('--login-clients', type=int, default=8)
+    args = parser.parse_args()
+
+    from run_benchmarks import _sample_rows
+    rows = _sample_rows(2000)
+
+    print(f"\n🌩️  Login storm: {args.predict_clients} prediction clients, {args.login_clients} login clients, "
+          f"{args.seconds:.0f}s per phase, {os.cpu_count()} CPU(s)")
+    print(f"   {'hash workers':<14}{'phase':<8}{'preds':>7}{'p50 ms':>9}{'p99 ms':>9}{'logins/s':>10}")
+    for workers in [int(w) for w in args.hash_workers.split(',')]:
+        with running_server(workers) as base:
+            quiet = run_phase(base, rows, args.seconds, args.predict_clients, 0)
+            storm = run_phase(base, rows, args.seconds, args.predict_clients, args.login_clients)
+        label = 'inline' if workers == 0 else str(workers)
+        for phase, r in (('quiet', quiet), ('storm', storm)):
+            print(f"   {label:<14}{phase:<8}{r['predictions']:>7}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                  f"{r['logins_per_sec']:>10.1f}" + (f"  ({r['failed']} failed)" if r['failed'] else ''))
+        print(f"   {'':<14}-> p99 during storm is {storm['p99_ms'] / quiet['p99_ms']:.1f}x the quiet p99")
+
+
+if __name__ == '__main__':
+    main()
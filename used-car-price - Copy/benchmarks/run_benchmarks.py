@@ -0,0 +1,321 @@
+"""
+End-to-end performance suite: data generation, training, prediction latency,
+batched throughput and the Flask endpoints. Runs offline on a laptop-class
+CPU, writes results as JSON and compares them with the committed baseline.
+
+    python benchmarks/run_benchmarks.py                     # run + compare with benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --quick             # smaller sizes (CI smoke run)
+    python benchmarks/run_benchmarks.py --only predict,http # selected groups
+    python benchmarks/run_benchmarks.py --update-baseline   # accept current numbers as the new baseline
+
+Exits with code 1 when any metric is worse than its baseline by more than
+--threshold (default 0.25 = 25%, or $BENCH_REGRESSION_THRESHOLD).
+
+Prediction benchmarks run against the committed model with the prediction
+cache and request coalescing switched off, so they measure the model path
+itself. Training runs in a scratch directory and never touches the model.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+GROUPS = ['generate', 'train', 'predict', 'http']
+
+# (sizes for the full run, sizes for --quick)
+SIZES = {
+    'generate_rows': (500000, 100000),
+    'train_rows': (20000, 5000),
+    'latency_calls': (2000, 300),
+    'batch_sizes': ((1, 16, 128, 1024, 10000), (1, 128, 1024)),
+    'http_calls': (500, 100),
+}
+
+# Child script for training: runs train_model() in the scratch directory and reports wall time + peak RSS.
+# The peak is VmHWM, the high-water mark of this process's own memory: Linux carries ru_maxrss over
+# fork/exec, so it would report the suite's peak once the in-process groups have run.
+TRAIN_CHILD = r'''
+import contextlib, io, json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import car_price_prediction
+    t0 = time.perf_counter()
+    car_price_prediction.train_model()
+    elapsed = time.perf_counter() - t0
+print(json.dumps({'wall_s': elapsed, 'peak_rss_mb': peak_rss_mb()}))
+'''
+
+
+def _metric(value, unit, better):
+    return {'value': round(float(value), 4), 'unit': unit, 'better': better}
+
+
+def _percentiles_ms(samples):
+    ms = np.asarray(samples) * 1000.0
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 99))
+
+
+def _sample_rows(n_rows, seed=7):
+    """Realistic request payloads: generated listings as JSON-safe dicts (Year, not Car_Age)."""
+    from generate_data import generate_chunk
+
+    df = generate_chunk(np.random.default_rng(seed), n_rows)
+    df['Maintenance_Cost(₹/yr)'] = df['Maintenance_Cost(₹/yr)'].round().astype(int)  # the form sends whole rupees
+    return json.loads(df.drop(columns=['Car_Age', 'Brand', 'Selling_Price(Lakhs)'], errors='ignore')
+                      .to_json(orient='records', force_ascii=False))
+
+
+# -----------------------------
+# BENCHMARKS
+# -----------------------------
+def bench_generate(quick):
+    from generate_data import generate_dataset
+
+    n_rows = SIZES['generate_rows'][quick]
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        generate_dataset(os.path.join(tmp, 'cars.csv'), n_rows=n_rows, seed=0)
+        elapsed = time.perf_counter() - t0
+    return {'generate.rows_per_sec': _metric(n_rows / elapsed, 'rows/s', 'higher')}
+
+
+def bench_train(quick):
+    from generate_data import generate_dataset
+
+    n_rows = SIZES['train_rows'][quick]
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_dataset(os.path.join(tmp, 'enhanced_car_dataset.csv'), n_rows=n_rows, seed=0)
+        out = subprocess.run([sys.executable, '-W', 'ignore', '-c', TRAIN_CHILD, ROOT], cwd=tmp,
+                             capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    return {
+        'train.wall_s': _metric(result['wall_s'], 's', 'lower'),
+        'train.peak_rss_mb': _metric(result['peak_rss_mb'], 'MB', 'lower'),
+    }
+
+
+def _load_app():
+    """Imports app.py from the project root with caching, coalescing and the file watcher off."""
+    os.chdir(ROOT)
+    for key, value in (('PREDICTION_CACHE_SIZE', '0'), ('PREDICT_BATCHING', '0'), ('MODEL_WATCH_INTERVAL', '0')):
+        os.environ.setdefault(key, value)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    if app.model_manager.current() is None:
+        raise RuntimeError('No model found: run generate_data.py and car_price_prediction.py first.')
+    return app
+
+
+def bench_predict(quick):
+    app = _load_app()
+    bundle = app.model_manager.current()
+    rows = _sample_rows(max(SIZES['latency_calls'][quick], max(SIZES['batch_sizes'][quick])))
+    metrics = {}
+
+    calls = SIZES['latency_calls'][quick]
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for row in rows[:50]:
+            app._predict_price(row, bundle=bundle)  # warm-up
+        for row in rows[:calls]:
+            t0 = time.perf_counter()
+            app._predict_price(row, bundle=bundle)
+            samples.append(time.perf_counter() - t0)
+    p50, p99 = _percentiles_ms(samples)
+    metrics['predict.single_p50_ms'] = _metric(p50, 'ms', 'lower')
+    metrics['predict.single_p99_ms'] = _metric(p99, 'ms', 'lower')
+
+    for batch_size in SIZES['batch_sizes'][quick]:
+        batch = rows[:batch_size]
+        repeats = max(3, min(200, 20000 // batch_size))
+        timings = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            app._predict_batch(batch, bundle)
+            timings.append(time.perf_counter() - t0)
+        metrics[f'predict.batch_{batch_size}_rows_per_sec'] = _metric(
+            batch_size / statistics.median(timings), 'rows/s', 'higher')
+    return metrics
+
+
+def bench_http(quick):
+    app = _load_app()
+    rows = _sample_rows(SIZES['http_calls'][quick] + 1)
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'bench@example.com'
+        sess['user_name'] = 'bench'
+
+    def _compare_priced(response):
+        # compare.html renders prices client-side; the outcome is in the flashed message.
+        # Popping the flashes also keeps the session cookie from growing request after request.
+        with client.session_transaction() as sess:
+            flashes = sess.pop('_flashes', [])
+        return response.status_code == 200 and ('success', 'Comparison successful!') in flashes
+
+    def _time_requests(send, priced):
+        samples = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            send(0)  # warm-up (template compilation, first request hooks)
+            for i in range(1, len(rows)):
+                t0 = time.perf_counter()
+                response = send(i)
+                samples.append(time.perf_counter() - t0)
+                # A failed prediction is much cheaper than a real one, so it must not pass silently
+                if not priced(response):
+                    raise RuntimeError(f'{response.request.path} did not price row {i} ({response.status_code})')
+        return _percentiles_ms(samples)
+
+    def _compare_form(i):
+        a, b = rows[i], rows[i - 1]
+        return {**{f'a_{k}': str(v) for k, v in a.items()}, **{f'b_{k}': str(v) for k, v in b.items()}}
+
+    metrics = {}
+    p50, p99 = _time_requests(lambda i: client.post('/api/predict', json=rows[i]),
+                              lambda response: response.status_code == 200)
+    metrics['http.api_predict_p50_ms'] = _metric(p50, 'ms', 'lower')
+    metrics['http.api_predict_p99_ms'] = _metric(p99, 'ms', 'lower')
+    p50, p99 = _time_requests(lambda i: client.post('/compare', data=_compare_form(i)), _compare_priced)
+    metrics['http.compare_p50_ms'] = _metric(p50, 'ms', 'lower')
+    metrics['http.compare_p99_ms'] = _metric(p99, 'ms', 'lower')
+    return metrics
+
+
+BENCHMARKS = {'generate': bench_generate, 'train': bench_train, 'predict': bench_predict, 'http': bench_http}
+
+
+# -----------------------------
+# BASELINE COMPARISON
+# -----------------------------
+def environment():
+    import xgboost
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def best_of(runs):
+    """Keeps each metric's best value over repeated runs (scheduling noise only ever makes numbers worse)."""
+    best = {}
+    for run in runs:
+        for name, metric in run.items():
+            kept = best.get(name)
+            if kept is None or (metric['value'] < kept['value']) == (metric['better'] == 'lower'):
+                best[name] = metric
+    return best
+
+
+def compare(metrics, baseline, threshold):
+    """Returns (rows for the report, list of regressions beyond threshold)."""
+    rows, regressions = [], []
+    for name, current in metrics.items():
+        base = baseline.get(name)
+        if base is None or not base['value']:
+            rows.append((name, current, None, None))
+            continue
+        change = (current['value'] - base['value']) / base['value']
+        worse_by = change if current['better'] == 'lower' else -change
+        rows.append((name, current, base['value'], change))
+        if worse_by > threshold:
+            regressions.append(f"{name}: {base['value']} -> {current['value']} {current['unit']} "
+                               f"({worse_by:+.0%} worse)")
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default=','.join(GROUPS), help=f"comma-separated groups ({', '.join(GROUPS)})")
+    parser.add_argument('--quick', action='store_true', help='smaller sizes (numbers are not comparable to a full run)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per group; the best value of each metric is kept')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results.json'))
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.environ.get('BENCH_REGRESSION_THRESHOLD', 0.25)),
+                        help='allowed relative regression before failing (0.25 = 25%%)')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results as the new baseline')
+    args = parser.parse_args()
+
+    groups = [g.strip() for g in args.only.split(',') if g.strip()]
+    unknown = [g for g in groups if g not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(unknown)}")
+
+    metrics = {}
+    for group in groups:
+        print(f"🏁 Running '{group}' benchmarks...")
+        t0 = time.perf_counter()
+        metrics.update(best_of(BENCHMARKS[group](args.quick) for _ in range(max(1, args.repeat))))
+        print(f"   - done in {time.perf_counter() - t0:.1f}s")
+
+    results = {'mode': 'quick' if args.quick else 'full', 'repeat': args.repeat, 'environment': environment(), 'metrics': metrics,
+               'suite_peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to '{args.output}'")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline updated: '{args.baseline}'")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('mode') != results['mode']:
+            print(f"⚠️  Baseline is a {saved.get('mode')} run; not comparing a {results['mode']} run against it")
+        else:
+            baseline = saved['metrics']
+            if saved.get('environment', {}).get('cpu_count') != results['environment']['cpu_count']:
+                print("⚠️  Baseline was recorded on a machine with a different CPU count")
+    else:
+        print(f"⚠️  No baseline at '{args.baseline}' (run with --update-baseline to create one)")
+
+    rows, regressions = compare(metrics, baseline, args.threshold)
+    print(f"\n📊 {'metric':<36}{'current':>14}{'baseline':>14}{'change':>9}")
+    for name, current, base, change in rows:
+        base_text = f"{base:>14,.3f}" if base is not None else f"{'-':>14}"
+        change_text = f"{change:>+9.1%}" if change is not None else f"{'-':>9}"
+        print(f"   {name:<36}{current['value']:>14,.3f}{base_text}{change_text}  {current['unit']}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"   - {line}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Offline bulk scorer for large listing files (CSV, Parquet or Arrow/Feather).
+
+Reads the input in chunks, encodes and predicts each chunk in one vectorized
+call, spreads chunks over a process pool (the model is loaded once per
+worker) and streams priced rows to the output as they complete, in input
+order. Prices are exactly what _predict_price returns for the same row: same
+casts, same Year -> Car_Age, same unknown-category policy, same max(0, ...)
+clamp and rounding. Rows it would reject get an 'error' instead.
+
+    python bulk_score.py listings.csv priced.csv [--workers 4] [--chunk-size 50000]
+"""
+import argparse
+import datetime as dt
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Optional: pyarrow writes CSV several times faster than DataFrame.to_csv (and is needed for Parquet)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+import dataset_store
+from feature_pipeline import NUMERIC_INPUTS, CATEGORICAL_COLS, finalize_prices
+from model_artifact import is_artifact
+from model_bundle import load_bundle, set_model_threads
+
+DEFAULT_MODEL = 'car_model' if is_artifact('car_model') else 'car_model.pkl'
+
+# The fields _predict_price reads ('Year', not 'Car_Age', exactly like the web form)
+INPUT_FIELDS = [field for field, _ in NUMERIC_INPUTS] + CATEGORICAL_COLS
+
+_worker_bundle = None
+_worker_year = None
+
+
+# -----------------------------
+# INPUT / OUTPUT
+# -----------------------------
+def read_chunks(path, chunk_size):
+    """Yields DataFrames of at most chunk_size rows from a CSV or a columnar (Parquet, Arrow/Feather) file."""
+    if dataset_store.is_columnar(path):
+        yield from dataset_store.iter_chunks(path, chunk_size=chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """
+    Appends priced chunks to a CSV or Parquet file without holding them in
+    memory. The schema is the input columns' types (from the first chunk)
+    plus predicted_price: float64 and error: string, so a chunk whose rows
+    all priced fits it as well as one with rejected rows. The file appears
+    atomically on close(); abort() leaves nothing behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = f'{path}.{os.getpid()}.tmp'
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, chunk):
+        if pa is None:
+            if self.path.endswith('.parquet'):
+                raise RuntimeError('Writing Parquet requires pyarrow.')
+            chunk.to_csv(self._tmp_path, mode='a' if self._started else 'w', header=not self._started, index=False)
+            self._started = True
+            return
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._schema = self._output_schema(table.schema)
+            if self.path.endswith('.parquet'):
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+            else:
+                self._writer = pa_csv.CSVWriter(self._tmp_path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._started:
+            os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    @staticmethod
+    def _output_schema(schema):
+        # A column that is empty in the first chunk has no type yet: later chunks may hold text
+        fields = [field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                  for field in schema if field.name not in ('predicted_price', 'error')]
+        return pa.schema(fields + [pa.field('predicted_price', pa.float64()), pa.field('error', pa.string())])
+
+
+# -----------------------------
+# SCORING
+# -----------------------------
+def score_chunk(bundle, chunk, current_year):
+    """Adds 'predicted_price' and 'error' columns to one chunk (one model.predict call)."""
+    n_rows = len(chunk)
+    data = {field: chunk[field] if field in chunk.columns else None for field in INPUT_FIELDS}
+    matrix, valid, errors, _ = bundle.pipeline.encode_columns(data, n_rows, current_year)
+
+    prices = np.full(n_rows, np.nan)
+    valid_idx = np.flatnonzero(valid)
+    if len(valid_idx):
+        prices[valid_idx] = finalize_prices(bundle.predict(matrix[valid_idx]))
+
+    error_col = np.full(n_rows, None, dtype=object)
+    for i, messages in errors.items():
+        error_col[i] = '; '.join(messages)
+
+    out = chunk.copy()
+    out['predicted_price'] = prices
+    out['error'] = error_col
+    return out
+
+
+def _init_worker(model_path, unknown_policy, current_year):
+    global _worker_bundle, _worker_year
+    _worker_bundle = load_bundle(model_path, unknown_policy, lean_imports=True)
+    _worker_year = current_year
+    # One thread per worker: parallelism comes from the process pool
+    set_model_threads(_worker_bundle, 1)
+
+
+def _score_in_worker(chunk):
+    return score_chunk(_worker_bundle, chunk, _worker_year)
+
+
+def bulk_score(input_path, output_path, model_path=DEFAULT_MODEL, workers=os.cpu_count(),
+               chunk_size=50000, unknown_policy='zero', current_year=None):
+    """Scores input_path into output_path; returns (rows, failed_rows, seconds)."""
+    current_year = current_year or dt.datetime.now().year
+    rows = failed = 0
+    started = time.perf_counter()
+
+    def _consume(scored):
+        nonlocal rows, failed
+        writer.write(scored)
+        rows += len(scored)
+        failed += int(scored['error'].notna().sum())
+        elapsed = time.perf_counter() - started
+        print(f"   - {rows:,} rows scored ({rows / elapsed:,.0f} rows/sec)", end='\r')
+
+    with ChunkWriter(output_path) as writer:
+        if workers and workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(model_path, unknown_policy, current_year)) as pool:
+                # Bounded window of in-flight chunks keeps memory flat; results are written in order
+                pending = []
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(_score_in_worker, chunk))
+                    if len(pending) >= workers * 2:
+                        _consume(pending.pop(0).result())
+                for future in pending:
+                    _consume(future.result())
+        else:
+            bundle = load_bundle(model_path, unknown_policy, lean_imports=True)
+            for chunk in read_chunks(input_path, chunk_size):
+                _consume(score_chunk(bundle, chunk, current_year))
+
+    return rows, failed, time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='listings file (.csv, .parquet or .feather/.arrow)')
+    parser.add_argument('output', help='priced output file (.csv or .parquet)')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='model artifact directory or pickle')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes (1 = in-process)')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--unknown-policy', default=os.environ.get('UNKNOWN_CATEGORY_POLICY', 'zero'))
+    args = parser.parse_args()
+
+    print(f"📥 Scoring '{args.input}' with '{args.model}' ({args.workers} workers, chunks of {args.chunk_size:,})")
+    n_rows, n_failed, seconds = bulk_score(args.input, args.output, args.model, args.workers,
+                                           args.chunk_size, args.unknown_policy)
+    print(f"\n✅ Wrote '{args.output}': {n_rows:,} rows ({n_failed:,} failed) in {seconds:.1f}s "
+          f"= {n_rows / max(seconds, 1e-9):,.0f} rows/sec")
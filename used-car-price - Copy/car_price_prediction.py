@@ -2,22 +2,68 @@ import pandas as pd
 import numpy as np
 import pickle
 import datetime as dt
+import argparse
+import hashlib
+import os
+import resource
+import time
+import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 from xgboost import XGBRegressor
+from feature_pipeline import FeaturePipeline, CATEGORICAL_COLS
+from model_artifact import BoosterModel, save_artifact, trimmed_booster
+import model_compression
+import hyperparameter_search
+import dataset_store
+import drift_monitor
 
-def train_model():
+# The typed columnar copy (.feather) if there is one, else the CSV
+DATASET_PATH = dataset_store.find_dataset()
+TARGET_COL = 'Selling_Price(Lakhs)'
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+# XGBoost hyperparameters of both trainers (a --search run replaces them with its best trial)
+DEFAULT_PARAMS = {'learning_rate': 0.05, 'max_depth': 5, 'subsample': 0.8, 'colsample_bytree': 0.8}
+
+
+def _report_resources(started):
+    """Prints wall time and peak RSS of this training run."""
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"⏱️  Wall time: {time.perf_counter() - started:.1f}s | 🧠 Peak RSS: {peak_mb:.0f} MB")
+    return peak_mb
+
+
+def _report_serving_cost(cost):
+    """Prints what the model costs to serve (single-threaded, as in a pinned worker)."""
+    latency = cost['latency_ms']
+    print(f"🔹 Size: {cost['size_bytes'] / 1024:.0f} KB ({cost['num_trees']} trees, depth {cost['max_depth']})")
+    print(f"🔹 Latency (1 thread): {latency['xgboost@1']:.3f} ms/row, "
+          f"{latency['xgboost@1024']:.2f} ms per 1024 rows | NumPy engine: {latency['numpy@1']:.3f} ms/row")
+
+
+def train_model(compress=None, max_mae_increase=0.02, optimize_for='xgboost@1024', search=None,
+                search_options=None):
     """
     Loads data, trains an XGBoost regression model, evaluates it, and saves it.
+    compress: optional list of model_compression.METHODS; the cheapest candidate
+    within max_mae_increase of the full model's MAE is saved instead.
+    search: optional hyperparameter_search.STRATEGIES entry; the hyperparameters
+    are then tuned by k-fold CV on the training split first (search_options are
+    passed on to hyperparameter_search.run_search).
     """
 
-    # --- 1. Load Dataset ---
+    started = time.perf_counter()
+
+    # --- 1. Load Dataset (compact dtypes; 'Year' is never read, 'Car_Age' replaces it) ---
     try:
-        df = pd.read_csv("enhanced_car_dataset.csv")
-        print("✅ Successfully loaded 'enhanced_car_dataset.csv'")
+        columns = [col for col in dataset_store.column_names(DATASET_PATH) if col != 'Year']
+        df = dataset_store.read_dataset(DATASET_PATH, columns)
+        print(f"✅ Successfully loaded '{DATASET_PATH}'")
     except FileNotFoundError:
-        print("❌ ERROR: 'enhanced_car_dataset.csv' not found. Please generate it first.")
+        print(f"❌ ERROR: '{DATASET_PATH}' not found. Please generate it first.")
         return
     except Exception as e:
         print(f"❌ Error loading data: {e}")
@@ -26,6 +72,12 @@ def train_model():
     # --- 2. Feature Engineering ---
     print("\n🔧 Feature engineering in progress...")
     
+    # Brand -> car models catalogue for the predict page, shipped with the model
+    catalogue = {}
+    if 'Brand' in df.columns:
+        catalogue = {brand: sorted(names.unique().tolist())
+                     for brand, names in df.groupby('Brand', observed=True)['Car_Name']}
+
     # --- UPDATED: We DROP 'Brand' because 'Car_Name' is more specific ---
     if 'Brand' in df.columns:
         df.drop('Brand', axis=1, inplace=True)
@@ -50,9 +102,9 @@ def train_model():
     for col in categorical_cols:
         if col in df.columns:
             encoder = LabelEncoder()
-            df[col] = encoder.fit_transform(df[col])
+            encoder.fit(df[col])
             mappings[col] = encoder # Save the fitted encoder
-            print(f"   - Encoded '{col}'")
+            print(f"   - Fitted vocabulary for '{col}' ({len(encoder.classes_)} classes)")
         else:
             print(f"   - WARNING: Column '{col}' not found in dataset.")
             
@@ -65,24 +117,40 @@ def train_model():
         print(f"❌ ERROR: The following expected columns are missing: {missing_in_df}")
         return
         
-    X = df[feature_cols]
+    # Encode through the same compiled pipeline the server uses, so the two can never disagree
+    model_columns = list(feature_cols)
+    pipeline = FeaturePipeline.from_encoders(mappings, model_columns)
+    matrix, _, _, _ = pipeline.encode_columns({col: df[col] for col in feature_cols}, len(df), cast_inputs=False)
+    X = pd.DataFrame(matrix, columns=model_columns, index=df.index)
     y = df['Selling_Price(Lakhs)']
     
-    model_columns = X.columns.tolist()
     print(f"   - Model will be trained on {len(model_columns)} features.")
 
     # --- 5. Train-Test Split ---
     print("🔪 Splitting data into train and test sets...")
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
+    # --- 5b. Optional hyperparameter search (k-fold CV on the training split only) ---
+    params = dict(DEFAULT_PARAMS)
+    search_summary = None
+    if search:
+        print(f"\n🔎 Hyperparameter search ({search})...")
+        try:
+            best, records = hyperparameter_search.run_search(X_train.to_numpy(), y_train.to_numpy(),
+                                                             strategy=search, baseline=DEFAULT_PARAMS,
+                                                             **(search_options or {}))
+        except KeyboardInterrupt:
+            return
+        hyperparameter_search.print_leaderboard(records, best)
+        params = dict(best['params'])
+        search_summary = {'strategy': search, 'trials': len(records), 'params': params,
+                          'cv_mae': best['mae'], 'cv_mae_std': best['mae_std'], 'fold_mae': best['fold_mae']}
+
     # --- 6. Model Training ---
     print("🚀 Training XGBoost Regressor model...")
     model = XGBRegressor(
         n_estimators=1000, 
-        learning_rate=0.05, 
-        max_depth=5, 
-        subsample=0.8,
-        colsample_bytree=0.8,
+        **params,
         random_state=42,
         n_jobs=-1,
         early_stopping_rounds=50
@@ -97,20 +165,435 @@ def train_model():
     print("\n📊 Evaluating model performance...")
     y_pred = model.predict(X_test)
     r2 = r2_score(y_test, y_pred)
+    mae = mean_absolute_error(y_test, y_pred)
     print(f"🔹 R² Score: {r2:.4f}")
+    print(f"🔹 MAE: {mae:.4f}")
+    booster = trimmed_booster(model)
+    cost = model_compression.serving_cost(booster, X_test.to_numpy(), model_compression.REPORT_KEYS)
+    _report_serving_cost(cost)
+    metadata = {'r2': round(float(r2), 6), 'mae': round(float(mae), 6), **cost}
+
+    # --- 7b. Optional compression: cheapest model within the MAE budget ---
+    if compress:
+        print(f"\n🗜️  Searching for a compact model ({', '.join(compress)}; "
+              f"MAE budget +{max_mae_increase:.0%}, optimizing {optimize_for})...")
+        chosen, points = model_compression.compress(
+            booster, X_train.to_numpy(), y_train.to_numpy(), X_test.to_numpy(), y_test.to_numpy(),
+            methods=compress, max_mae_increase=max_mae_increase, optimize_for=optimize_for)
+        model_compression.print_trade_off(points, chosen, optimize_for)
+        print(f"   - Chosen: {chosen['name']} (R² {chosen['r2']:.4f}, MAE {chosen['mae']:.4f}, "
+              f"{chosen['latency_ms'][optimize_for]:.3f} vs {points[0]['latency_ms'][optimize_for]:.3f} ms "
+              f"at {optimize_for})")
+        model = BoosterModel(chosen['booster'])
+        metadata = {**model_compression.summary(chosen),
+                    'compression': {'methods': list(compress), 'max_mae_increase': max_mae_increase,
+                                    'optimize_for': optimize_for,
+                                    'trade_off': [model_compression.summary(p) for p in points]}}
+
+    if search_summary:
+        metadata['search'] = search_summary
+
+    # Training distribution of every feature, for the server's drift monitor (/admin/drift)
+    metadata['drift_reference'] = drift_monitor.reference_summary(pipeline, X_train.to_numpy())
+    print(f"📈 Drift reference: {len(metadata['drift_reference']['numeric'])} numeric, "
+          f"{len(metadata['drift_reference']['categorical'])} categorical features")
 
     # --- 8. Save Model + Metadata ---
     model_data = {
         'model': model,
         'mappings': mappings, # The saved encoders
-        'columns': model_columns # The exact feature order
+        'columns': model_columns, # The exact feature order
+        'pipeline': pipeline.to_dict(), # Compiled encoder used at serving time
+        'catalogue': catalogue, # Brand -> car models map for the predict page
+        'metadata': metadata # Scores, serving cost (and increments, see train_model_incremental)
     }
 
     with open('car_model.pkl', 'wb') as f:
         pickle.dump(model_data, f)
 
     print("\n💾 Model and encoders saved to 'car_model.pkl'")
+
+    # Versioned artifact (native booster + JSON manifest) that the server loads without pickle/sklearn
+    manifest = save_artifact('car_model', model, pipeline, metadata=metadata, catalogue=catalogue)
+    print(f"💾 Model artifact saved to 'car_model/' (hash {manifest['content_hash'][:12]})")
+
+    # Small raw holdout the server uses to validate this model before hot-swapping it in
+    holdout = df.loc[X_test.index[:500], feature_cols + ['Selling_Price(Lakhs)']]
+    holdout.to_csv('model_holdout.csv', index=False)
+    print(f"💾 Validation holdout ({len(holdout)} rows) saved to 'model_holdout.csv'")
+    _report_resources(started)
     print("---------------------------------------------")
 
+
+# -----------------------------
+# OUT-OF-CORE TRAINING
+# -----------------------------
+def _split_mask(chunk_index, n_rows):
+    """Deterministic per-chunk 80/20 test mask: identical on every pass over the file."""
+    return np.random.default_rng([RANDOM_STATE, chunk_index]).random(n_rows) < TEST_SIZE
+
+
+class _ChunkIter(xgb.DataIter):
+    """
+    Feeds XGBoost one encoded chunk at a time. Only one chunk of raw rows is
+    ever in memory; XGBoost keeps the quantized matrix (or pages it to disk).
+    """
+
+    def __init__(self, path, pipeline, chunk_size, test_split, cache_prefix=None):
+        self.path = path
+        self.pipeline = pipeline
+        self.chunk_size = chunk_size
+        self.test_split = test_split
+        self._reader = None
+        self._chunk_index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def _chunks(self):
+        return dataset_store.iter_chunks(self.path, self.pipeline.columns + [TARGET_COL], self.chunk_size)
+
+    def next(self, input_data):
+        if self._reader is None:
+            self._reader = iter(self._chunks())
+        chunk = next(self._reader, None)
+        if chunk is None:
+            return False
+        mask = _split_mask(self._chunk_index, len(chunk))
+        self._chunk_index += 1
+        if not self.test_split:
+            mask = ~mask
+
+        X, y = _encode_chunk(self.pipeline, chunk[mask])
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        self._reader = None
+        self._chunk_index = 0
+
+
+def _encode_chunk(pipeline, chunk):
+    matrix, _, _, _ = pipeline.encode_columns({col: chunk[col] for col in pipeline.columns},
+                                              len(chunk), cast_inputs=False)
+    return matrix.astype(np.float32), chunk[TARGET_COL].to_numpy(dtype=np.float32)
+
+
+def train_model_streaming(path=DATASET_PATH, chunk_size=200000, external_memory_dir=None):
+    """
+    Memory-bounded training: streams the dataset in chunks with compact dtypes and
+    feeds XGBoost through a DataIter into a QuantileDMatrix (or, with
+    external_memory_dir, an ExtMemQuantileDMatrix whose pages live on disk).
+    Keeps the 80/20 split and early stopping on the test rows.
+    """
+    started = time.perf_counter()
+
+    # --- 1. Vocabulary pass (categorical columns only) ---
+    print(f"📥 Scanning '{path}' for category vocabularies (chunks of {chunk_size:,} rows)...")
+    try:
+        header = dataset_store.column_names(path)
+    except FileNotFoundError:
+        print(f"❌ ERROR: '{path}' not found. Please generate it first.")
+        return
+
+    vocab_cols = [col for col in CATEGORICAL_COLS + ['Brand'] if col in header]
+    seen = {col: set() for col in vocab_cols}
+    pairs = set()
+    n_rows = 0
+    for chunk in dataset_store.iter_chunks(path, vocab_cols, chunk_size):
+        n_rows += len(chunk)
+        for col in vocab_cols:
+            seen[col].update(chunk[col].cat.categories.tolist())
+        if 'Brand' in chunk.columns:
+            pairs.update(zip(chunk['Brand'].astype(str), chunk['Car_Name'].astype(str)))
+
+    catalogue = {}
+    for brand, car_name in sorted(pairs):
+        catalogue.setdefault(brand, []).append(car_name)
+
+    # Sorted vocabularies give the same codes LabelEncoder would
+    vocabularies = {col: sorted(seen[col]) for col in CATEGORICAL_COLS if col in seen}
+    numerical_cols = [col for col in header if col not in CATEGORICAL_COLS + ['Brand', 'Year', TARGET_COL]]
+    model_columns = numerical_cols + [col for col in CATEGORICAL_COLS if col in header]
+    pipeline = FeaturePipeline(model_columns, vocabularies)
+    print(f"   - {n_rows:,} rows, {len(model_columns)} features")
+
+    # --- 2. Quantized training / evaluation matrices ---
+    print("🔪 Streaming 80/20 split into quantized DMatrix...")
+    if external_memory_dir:
+        os.makedirs(external_memory_dir, exist_ok=True)
+        train_iter = _ChunkIter(path, pipeline, chunk_size, False, os.path.join(external_memory_dir, 'train'))
+        test_iter = _ChunkIter(path, pipeline, chunk_size, True, os.path.join(external_memory_dir, 'test'))
+        dtrain = xgb.ExtMemQuantileDMatrix(train_iter, max_bin=256)
+        dtest = xgb.ExtMemQuantileDMatrix(test_iter, ref=dtrain, max_bin=256)
+    else:
+        dtrain = xgb.QuantileDMatrix(_ChunkIter(path, pipeline, chunk_size, False), max_bin=256)
+        dtest = xgb.QuantileDMatrix(_ChunkIter(path, pipeline, chunk_size, True), ref=dtrain, max_bin=256)
+    print(f"   - train rows: {dtrain.num_row():,} | test rows: {dtest.num_row():,}")
+
+    # --- 3. Model Training (same hyperparameters as train_model) ---
+    print("🚀 Training XGBoost booster with early stopping...")
+    params = {
+        'objective': 'reg:squarederror',
+        'tree_method': 'hist',
+        **DEFAULT_PARAMS,
+        'seed': RANDOM_STATE,
+    }
+    booster = xgb.train(params, dtrain, num_boost_round=1000, evals=[(dtest, 'test')],
+                        early_stopping_rounds=50, verbose_eval=False)
+    print(f"   - Best iteration: {booster.best_iteration}")
+    del dtrain
+
+    # --- 4. Streaming evaluation (running sums, no test set in memory) + drift reference of the train rows ---
+    print("\n📊 Evaluating model performance...")
+    trimmed = booster[:booster.best_iteration + 1]
+    reference = drift_monitor.ReferenceBuilder(pipeline)
+    n = sse = sae = sum_y = sum_y2 = 0.0
+    holdout = None
+    for index, chunk in enumerate(dataset_store.iter_chunks(path, model_columns + [TARGET_COL], chunk_size)):
+        mask = _split_mask(index, len(chunk))
+        if holdout is None:
+            holdout = chunk[mask].head(500)
+        X, y = _encode_chunk(pipeline, chunk)
+        reference.add(X[~mask])
+        X, y = X[mask], y[mask]
+        residual = trimmed.inplace_predict(X).astype(np.float64) - y
+        n += len(y)
+        sse += float(np.sum(residual ** 2))
+        sae += float(np.sum(np.abs(residual)))
+        sum_y += float(np.sum(y, dtype=np.float64))
+        sum_y2 += float(np.sum(np.square(y, dtype=np.float64)))
+    r2 = 1 - sse / (sum_y2 - sum_y ** 2 / n)
+    print(f"🔹 R² Score: {r2:.4f}")
+    print(f"🔹 MAE: {sae / n:.4f}")
+    X_sample, _ = _encode_chunk(pipeline, holdout)
+    cost = model_compression.serving_cost(trimmed, X_sample, model_compression.REPORT_KEYS)
+    _report_serving_cost(cost)
+    drift_reference = reference.summary()
+    print(f"📈 Drift reference: {len(drift_reference['numeric'])} numeric, "
+          f"{len(drift_reference['categorical'])} categorical features ({drift_reference['rows']:,} train rows)")
+
+    # --- 5. Save artifact + holdout ---
+    manifest = save_artifact('car_model', trimmed, pipeline,
+                             metadata={'r2': round(float(r2), 6), 'mae': round(sae / n, 6),
+                                       'training_mode': 'streaming', 'rows': n_rows, **cost,
+                                       'drift_reference': drift_reference},
+                             catalogue=catalogue)
+    print(f"\n💾 Model artifact saved to 'car_model/' (hash {manifest['content_hash'][:12]})")
+    holdout.to_csv('model_holdout.csv', index=False)
+    print(f"💾 Validation holdout ({len(holdout)} rows) saved to 'model_holdout.csv'")
+
+    _report_resources(started)
+    print("---------------------------------------------")
+
+
+# -----------------------------
+# INCREMENTAL TRAINING
+# -----------------------------
+def _fit_rounds(params, columns, X_train, y_train, X_eval, y_eval, num_boost_round, xgb_model=None):
+    """xgb.train with the trainer's early stopping on the evaluation rows; returns the booster cut at its best."""
+    dtrain = xgb.DMatrix(X_train, label=y_train, feature_names=columns)
+    deval = xgb.DMatrix(X_eval, label=y_eval, feature_names=columns)
+    booster = xgb.train(params, dtrain, num_boost_round=num_boost_round, evals=[(deval, 'holdout')],
+                        early_stopping_rounds=50, verbose_eval=False, xgb_model=xgb_model)
+    return booster[:booster.best_iteration + 1]
+
+
+def _scores(booster, X, y):
+    predicted = booster.inplace_predict(X)
+    return {'r2': round(float(r2_score(y, predicted)), 6), 'mae': round(float(mean_absolute_error(y, predicted)), 6)}
+
+
+def train_model_incremental(new_path, dataset_path=DATASET_PATH, model_path='car_model.pkl', extra_rounds=100,
+                            replay_rows=10000, compare=True, output_path=None):
+    """
+    Warm-start retraining on newly collected listings (new_path, same columns
+    as the dataset). The category vocabularies of the current model are
+    extended with the new labels, appended after the existing codes, so every
+    existing tree keeps its meaning. Boosting then continues from the current
+    booster for at most extra_rounds rounds, on the new rows plus a random
+    replay sample of replay_rows existing training rows. Early stopping uses
+    the holdout: the trainer's test split of the existing rows plus 20% of the
+    new ones. With compare=True a full retrain on the combined data is timed
+    and scored on the same holdout. The model is saved back where it was
+    loaded from (or to output_path), as both <name>.pkl and the <name>/
+    artifact; the new rows are appended to the dataset once it is saved.
+    """
+    from model_bundle import load_bundle
+
+    started = time.perf_counter()
+
+    # --- 1. Current model, existing and new rows ---
+    try:
+        bundle = load_bundle(model_path)
+        with open(new_path, 'rb') as f:
+            new_sha256 = hashlib.sha256(f.read()).hexdigest()
+        old = dataset_store.read_dataset(dataset_path)
+        new = dataset_store.read_dataset(new_path)
+    except FileNotFoundError as e:
+        print(f"❌ ERROR: '{e.filename}' not found.")
+        return
+    increments = bundle.metadata.get('increments', [])
+    if any(entry['sha256'] == new_sha256 for entry in increments):
+        print(f"❌ ERROR: '{new_path}' was already added to this model.")
+        return
+    missing = [col for col in old.columns if col not in new.columns]
+    if missing:
+        print(f"❌ ERROR: '{new_path}' is missing the columns {missing}")
+        return
+    new = new[old.columns.tolist()]
+    print(f"✅ Loaded model '{model_path}' ({bundle.version}), {len(old):,} existing rows, "
+          f"{len(new):,} new rows from '{new_path}'")
+
+    # --- 2. Vocabularies: append unseen labels, keep every existing code ---
+    pipeline, added = bundle.pipeline.extended({col: new[col].unique() for col in CATEGORICAL_COLS
+                                                if col in bundle.pipeline.vocabularies})
+    for col, labels in added.items():
+        print(f"   - '{col}': {len(labels)} new label(s) appended: {', '.join(map(str, labels[:5]))}"
+              + (' ...' if len(labels) > 5 else ''))
+    catalogue = {brand: list(names) for brand, names in bundle.catalogue.items()}
+    if 'Brand' in new.columns:
+        for brand, names in new.groupby('Brand', observed=True)['Car_Name']:
+            catalogue[brand] = sorted(set(catalogue.get(brand, [])) | set(names.unique().tolist()))
+
+    # --- 3. Splits: the trainer's test split of the old rows + 20% of the new rows form the holdout ---
+    old_train, old_test = train_test_split(np.arange(len(old)), test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    new_train, new_test = train_test_split(np.arange(len(new)), test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    rng = np.random.default_rng(RANDOM_STATE)
+    replay = rng.choice(old_train, min(replay_rows, len(old_train)), replace=False)
+    holdout = pd.concat([old.iloc[old_test], new.iloc[new_test]], ignore_index=True)
+    n_new_holdout = len(new_test)
+
+    def encode(pipe, frame):
+        matrix, _, _, _ = pipe.encode_columns({col: frame[col] for col in pipe.columns}, len(frame),
+                                              cast_inputs=False)
+        return matrix, frame[TARGET_COL].to_numpy(dtype=np.float64)
+
+    # --- 4. Continue boosting from the current booster ---
+    print(f"\n🔁 Continuing boosting: up to {extra_rounds} extra rounds on {len(new_train):,} new "
+          f"+ {len(replay):,} replayed rows...")
+    params = {'objective': 'reg:squarederror', 'tree_method': 'hist', **DEFAULT_PARAMS, 'seed': RANDOM_STATE}
+    base = trimmed_booster(bundle.model)
+    base_trees = base.num_boosted_rounds()
+    X_fit, y_fit = encode(pipeline, pd.concat([new.iloc[new_train], old.iloc[replay]]))
+    X_holdout, y_holdout = encode(pipeline, holdout)
+    booster = _fit_rounds(params, pipeline.columns, X_fit, y_fit, X_holdout, y_holdout, extra_rounds, xgb_model=base)
+    incremental_s = time.perf_counter() - started
+    print(f"   - {base_trees} + {booster.num_boosted_rounds() - base_trees} trees in {incremental_s:.1f}s")
+
+    # --- 5. Evaluation (and the full retrain it replaces) ---
+    print("\n📊 Evaluating on the holdout...")
+    new_rows = slice(len(holdout) - n_new_holdout, None)
+    results = {
+        'current model': (base, bundle.pipeline, None),
+        'incremental': (booster, pipeline, incremental_s),
+    }
+    if compare:
+        print("   - Running a full retrain for comparison...")
+        t0 = time.perf_counter()
+        combined = pd.concat([old, new], ignore_index=True)
+        full_pipeline = FeaturePipeline(bundle.pipeline.columns,
+                                        {col: sorted(combined[col].unique().tolist()) for col in pipeline.vocabularies})
+        X_all, y_all = encode(full_pipeline, pd.concat([old.iloc[old_train], new.iloc[new_train]]))
+        X_full_holdout, _ = encode(full_pipeline, holdout)
+        full = _fit_rounds(params, full_pipeline.columns, X_all, y_all, X_full_holdout, y_holdout, 1000)
+        results['full retrain'] = (full, full_pipeline, time.perf_counter() - t0)
+
+    report = {}
+    print(f"   {'model':<16}{'trees':>7}{'R²':>9}{'MAE':>9}{'new-row MAE':>13}{'time':>9}")
+    for name, (model, pipe, seconds) in results.items():
+        X_eval = X_holdout if pipe is pipeline else encode(pipe, holdout)[0]
+        scores = _scores(model, X_eval, y_holdout)
+        scores['new_rows_mae'] = _scores(model, X_eval[new_rows], y_holdout[new_rows])['mae']
+        report[name] = {'num_trees': model.num_boosted_rounds(), **scores,
+                        'seconds': None if seconds is None else round(seconds, 2)}
+        print(f"   {name:<16}{model.num_boosted_rounds():>7}{scores['r2']:>9.4f}{scores['mae']:>9.4f}"
+              f"{scores['new_rows_mae']:>13.4f}" + (f"{seconds:>8.1f}s" if seconds is not None else f"{'-':>9}"))
+    if compare:
+        full, inc = report['full retrain'], report['incremental']
+        print(f"⏱️  Time saved: {full['seconds'] - inc['seconds']:.1f}s ({full['seconds'] / inc['seconds']:.1f}x faster) "
+              f"| MAE delta vs full retrain: {inc['mae'] - full['mae']:+.4f} "
+              f"({(inc['mae'] - full['mae']) / full['mae']:+.1%})")
+
+    # --- 6. Save model + metadata, then append the new rows ---
+    cost = model_compression.serving_cost(booster, X_holdout, model_compression.REPORT_KEYS)
+    _report_serving_cost(cost)
+    # The model now stands for old and new rows alike: so does the drift reference
+    X_reference, _ = encode(pipeline, pd.concat([old.iloc[old_train], new.iloc[new_train]]))
+    metadata = {**{k: report['incremental'][k] for k in ('r2', 'mae')}, **cost, 'training_mode': 'incremental',
+                'base_version': bundle.version, 'comparison': report,
+                'drift_reference': drift_monitor.reference_summary(pipeline, X_reference),
+                'increments': increments + [{'file': os.path.basename(new_path), 'sha256': new_sha256,
+                                             'rows': len(new), 'added_labels': added,
+                                             'extra_trees': booster.num_boosted_rounds() - base_trees,
+                                             'at': dt.datetime.now().isoformat(timespec='seconds')}]}
+    model = BoosterModel(booster)
+    # car_model.pkl and car_model/ are one model in two formats: write both for the name given
+    artifact_path = (output_path or model_path).rstrip('/\\')
+    if artifact_path.endswith('.pkl'):
+        artifact_path = artifact_path[:-len('.pkl')]
+    with open(f'{artifact_path}.pkl', 'wb') as f:
+        # No 'mappings': the extended vocabularies append labels out of sorted order, which no
+        # LabelEncoder can represent, and the old encoders would not know the new labels
+        pickle.dump({'model': model, 'columns': pipeline.columns, 'pipeline': pipeline.to_dict(),
+                     'catalogue': catalogue, 'metadata': metadata}, f)
+    print(f"\n💾 Model and encoders saved to '{artifact_path}.pkl'")
+    manifest = save_artifact(artifact_path, model, pipeline, metadata=metadata, catalogue=catalogue)
+    print(f"💾 Model artifact saved to '{artifact_path}/' (hash {manifest['content_hash'][:12]})")
+
+    holdout.sample(min(500, len(holdout)), random_state=RANDOM_STATE)[pipeline.columns + [TARGET_COL]].to_csv(
+        'model_holdout.csv', index=False)
+    dataset_store.append_rows(dataset_path, new)
+    print(f"💾 Appended {len(new):,} rows to '{dataset_path}' and refreshed 'model_holdout.csv'")
+    _report_resources(started)
+    print("---------------------------------------------")
+
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train the used-car price model.')
+    parser.add_argument('--streaming', action='store_true',
+                        help='out-of-core mode: stream the dataset in chunks (bounded memory)')
+    parser.add_argument('--chunk-size', type=int, default=200000, help='rows per chunk in streaming mode')
+    parser.add_argument('--external-memory', metavar='DIR', default=None,
+                        help='streaming mode: page the quantized matrix to DIR instead of RAM')
+    parser.add_argument('--data', default=DATASET_PATH, help='dataset path (streaming and incremental modes)')
+    parser.add_argument('--compress', nargs='+', choices=model_compression.METHODS, metavar='METHOD',
+                        help=f"save the cheapest model within the MAE budget, searching with any of "
+                             f"{', '.join(model_compression.METHODS)}")
+    parser.add_argument('--max-mae-increase', type=float, default=0.02,
+                        help='compression: allowed relative MAE increase over the full model (default 0.02)')
+    parser.add_argument('--optimize-for', default='xgboost@1024', choices=model_compression.LATENCY_KEYS,
+                        help='compression: latency to minimize, as engine@batch_size')
+    parser.add_argument('--incremental', metavar='NEW_CSV', default=None,
+                        help='warm-start the current model on new listings, then append them to the dataset')
+    parser.add_argument('--model', default='car_model.pkl', help='incremental: model to continue from')
+    parser.add_argument('--output', default=None,
+                        help='incremental: model to write, as <name>.pkl and <name>/ (default: --model)')
+    parser.add_argument('--extra-rounds', type=int, default=100,
+                        help='incremental: maximum boosting rounds added (default 100)')
+    parser.add_argument('--replay-rows', type=int, default=10000,
+                        help='incremental: existing training rows mixed into the new rows (default 10000)')
+    parser.add_argument('--skip-comparison', action='store_true',
+                        help='incremental: skip the full retrain used to report time saved and accuracy delta')
+    parser.add_argument('--search', choices=hyperparameter_search.STRATEGIES,
+                        help='tune the hyperparameters by k-fold CV before the final fit')
+    parser.add_argument('--trials', type=int, default=20, help='search: candidates for random / halving (default 20)')
+    parser.add_argument('--folds', type=int, default=5, help='search: cross-validation folds (default 5)')
+    parser.add_argument('--jobs', type=int, default=None, help='search: trial processes (default: one per CPU)')
+    parser.add_argument('--trial-threads', type=int, default=None,
+                        help='search: XGBoost threads per trial (default: CPUs / jobs)')
+    parser.add_argument('--search-dir', default='hp_search',
+                        help='search: shared encoded data and the resumable trial log (default hp_search/)')
+    args = parser.parse_args()
+
+    if args.streaming and (args.compress or args.search):
+        parser.error('--compress and --search need the in-memory trainer (drop --streaming)')
+    if args.incremental and (args.streaming or args.compress or args.search):
+        parser.error('--incremental cannot be combined with --streaming, --compress or --search')
+    if args.incremental:
+        train_model_incremental(args.incremental, args.data, args.model, args.extra_rounds, args.replay_rows,
+                                not args.skip_comparison, args.output)
+    elif args.streaming:
+        train_model_streaming(args.data, args.chunk_size, args.external_memory)
+    else:
+        train_model(args.compress, args.max_mae_increase, args.optimize_for, args.search,
+                    {'n_trials': args.trials, 'n_folds': args.folds, 'jobs': args.jobs,
+                     'trial_threads': args.trial_threads, 'search_dir': args.search_dir})
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+Typed, columnar storage for the listings dataset.
+
+The format is picked by file extension:
+  .feather / .arrow  Arrow IPC, uncompressed: memory-mapped, so a load is
+                     close to zero-copy and only the requested columns are
+                     ever paged in
+  .parquet           compressed, for archiving and exchange
+  .csv               plain text, still accepted everywhere (import / export)
+Categorical columns are dictionary-encoded (int16 codes plus one copy of
+each label) and numeric columns get the narrowest dtype that holds them
+(PANDAS_DTYPES), so a Car_Name costs 2 bytes per row instead of a Python
+string. CSV is read with the same dtypes.
+
+pyarrow is optional: without it only CSV is available. Nothing heavy is
+imported until a file is actually read or written, so the server can import
+this module for free.
+
+    python dataset_store.py enhanced_car_dataset.csv enhanced_car_dataset.feather   # convert, either way
+"""
+import os
+import sys
+
+import numpy as np
+
+DATASET_BASENAME = 'enhanced_car_dataset'
+COLUMNAR_EXTENSIONS = ('.feather', '.arrow', '.parquet')
+# Lookup order of find_dataset(): the fastest format first
+SEARCH_EXTENSIONS = ('.feather', '.arrow', '.parquet', '.csv')
+
+CATEGORY_COLS = ['Brand', 'Car_Name', 'City', 'Condition', 'Fuel_Type', 'Seller_Type', 'Transmission']
+# Compact dtypes of the dataset columns (pandas names); 'category' is dictionary-encoded on disk
+PANDAS_DTYPES = {
+    'Car_Age': 'int16', 'Year': 'int16', 'Owner': 'int8', 'Accidents': 'int8',
+    'Insurance_Age(yrs)': 'int8', 'Engine_Power(cc)': 'int16', 'Kms_Driven': 'int32',
+    'Present_Price(Lakhs)': 'float32', 'Selling_Price(Lakhs)': 'float32',
+    'Mileage(km/l)': 'float32', 'Maintenance_Cost(₹/yr)': 'float32',
+    **{col: 'category' for col in CATEGORY_COLS},
+}
+DICTIONARY_INDEX_MAX = np.iinfo(np.int16).max
+
+
+def is_columnar(path):
+    return os.path.splitext(path)[1].lower() in COLUMNAR_EXTENSIONS
+
+
+def find_dataset(directory='', basename=DATASET_BASENAME):
+    """The dataset file in `directory`, preferring columnar copies; the CSV name if there is none."""
+    for ext in SEARCH_EXTENSIONS:
+        path = os.path.join(directory, basename + ext)
+        if os.path.exists(path):
+            return path
+    return os.path.join(directory, basename + '.csv')
+
+
+def _pyarrow(path):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError(f"Reading or writing '{path}' requires pyarrow (pip install pyarrow).") from None
+    return pa
+
+
+def _csv_dtypes(columns):
+    return {col: dtype for col, dtype in PANDAS_DTYPES.items() if columns is None or col in columns}
+
+
+# -----------------------------
+# READING
+# -----------------------------
+def column_names(path):
+    if not is_columnar(path):
+        import pandas as pd
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    return _open_table(path, columns=None, schema_only=True).names
+
+
+def _open_table(path, columns, schema_only=False):
+    """pyarrow Table (or its schema) with only `columns`; Arrow IPC files are memory-mapped."""
+    pa = _pyarrow(path)
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        if schema_only:
+            return pq.read_schema(path)
+        return pq.read_table(path, columns=columns)
+
+    import pyarrow.ipc as ipc
+    reader = ipc.open_file(pa.memory_map(path, 'r'))
+    if schema_only:
+        return reader.schema
+    table = reader.read_all()
+    return table if columns is None else table.select(columns)
+
+
+def read_dataset(path, columns=None):
+    """
+    The dataset (or only `columns` of it) as a DataFrame with compact dtypes:
+    categoricals for the label columns, narrow ints and float32 elsewhere.
+    """
+    import pandas as pd
+
+    if not is_columnar(path):
+        return pd.read_csv(path, usecols=columns, dtype=_csv_dtypes(columns))
+    # split_blocks: one block per column, so numeric columns need no consolidation copy
+    return _open_table(path, columns).to_pandas(split_blocks=True)
+
+
+def iter_chunks(path, columns=None, chunk_size=200000):
+    """Yields DataFrames of at most chunk_size rows, with the same dtypes as read_dataset()."""
+    import pandas as pd
+
+    if not is_columnar(path):
+        yield from pd.read_csv(path, usecols=columns, dtype=_csv_dtypes(columns), chunksize=chunk_size)
+        return
+    pa = _pyarrow(path)
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns)
+    else:
+        batches = _open_table(path, columns).to_batches(max_chunksize=chunk_size)
+    for batch in batches:
+        yield pa.Table.from_batches([batch]).to_pandas(split_blocks=True)
+
+
+def read_columns(path, columns, encoded=False):
+    """
+    {column: NumPy array} for a columnar file, without pandas. Label columns
+    come back decoded, or with encoded=True as (codes, labels): int codes
+    (-1 for missing) into one list of labels, with no string built per row.
+    """
+    pa = _pyarrow(path)
+    table = _open_table(path, columns).unify_dictionaries()
+    out = {}
+    for col in columns:
+        values = table.column(col)
+        if not pa.types.is_dictionary(values.type):
+            out[col] = values.to_numpy()
+        elif encoded:
+            labels = values.chunk(0).dictionary.to_pylist() if values.num_chunks else []
+            codes = [chunk.indices.fill_null(-1).to_numpy() for chunk in values.chunks]
+            out[col] = (np.concatenate(codes) if codes else np.zeros(0, dtype=np.int16), labels)
+        else:
+            out[col] = values.cast(values.type.value_type).to_numpy()
+    return out
+
+
+# -----------------------------
+# WRITING
+# -----------------------------
+class DatasetWriter:
+    """
+    Writes DataFrame chunks to a CSV, Arrow IPC or Parquet file. The first
+    chunk fixes the columns. Label columns share one vocabulary that only
+    grows (new labels are appended as dictionary deltas), so memory stays flat
+    however many chunks are written. The file appears atomically on close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._tmp_path = f'{path}.{os.getpid()}.tmp'
+        self._writer = None  # pyarrow writer (columnar formats)
+        self._started = False
+        self._schema = None
+        self._vocabularies = {}  # column -> ({label: code}, [labels])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, chunk):
+        if not is_columnar(self.path):
+            chunk.to_csv(self._tmp_path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        else:
+            batch = self._record_batch(chunk)
+            if self._writer is None:
+                self._writer = self._open(batch.schema)
+            self._writer.write_batch(batch)
+        self._started = True
+        self.rows += len(chunk)
+
+    def close(self):
+        if not self._started:
+            raise ValueError(f"Nothing was written to '{self.path}'.")
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    # --- Internals ---
+    def _open(self, schema):
+        self._schema = schema
+        if self.path.lower().endswith('.parquet'):
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(self._tmp_path, schema)
+        import pyarrow.ipc as ipc
+        return ipc.new_file(self._tmp_path, schema, options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def _record_batch(self, chunk):
+        pa = _pyarrow(self.path)
+        import pandas as pd
+
+        arrays, fields = [], []
+        for col in (self._schema.names if self._schema else chunk.columns):
+            series = chunk[col]
+            dtype = PANDAS_DTYPES.get(col)
+            if dtype == 'category' or (dtype is None and series.dtype == object):
+                arrays.append(self._dictionary(pa, pd, col, series))
+            elif dtype is not None:
+                arrays.append(pa.array(series.to_numpy(dtype=dtype)))
+            else:
+                arrays.append(pa.Array.from_pandas(series))
+            fields.append(pa.field(col, arrays[-1].type))
+        return pa.record_batch(arrays, schema=self._schema or pa.schema(fields))
+
+    def _dictionary(self, pa, pd, col, series):
+        """int16 codes into the column's append-only vocabulary (existing codes never change)."""
+        lookup, labels = self._vocabularies.setdefault(col, ({}, []))
+        codes, uniques = pd.factorize(series)
+        for label in uniques.tolist():
+            if label not in lookup:
+                lookup[label] = len(labels)
+                labels.append(label)
+        if len(labels) > DICTIONARY_INDEX_MAX:
+            raise ValueError(f"Column '{col}' has more than {DICTIONARY_INDEX_MAX} distinct labels.")
+        table = np.array([lookup[label] for label in uniques.tolist()] + [0], dtype=np.int16)
+        return pa.DictionaryArray.from_arrays(pa.array(table[codes], type=pa.int16(), mask=codes < 0),
+                                              pa.array(labels, type=pa.string()))
+
+
+def write_dataset(path, frame, chunk_size=200000):
+    with DatasetWriter(path) as writer:
+        for start in range(0, max(len(frame), 1), chunk_size):
+            writer.write(frame.iloc[start:start + chunk_size])
+    return writer.rows
+
+
+def append_rows(path, frame):
+    """
+    Appends rows (in the dataset's column order) to the dataset. CSV grows in
+    place; a columnar file is rewritten (old rows streamed, never all in
+    memory twice) and swapped in atomically.
+    """
+    columns = column_names(path)
+    frame = frame[columns]
+    if not is_columnar(path):
+        with open(path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+        frame.to_csv(path, mode='a', header=False, index=False)
+        return
+
+    with DatasetWriter(path) as writer:
+        for chunk in iter_chunks(path):
+            writer.write(chunk)
+        writer.write(frame)
+
+
+def convert(source, destination, chunk_size=200000):
+    """Copies a dataset between formats chunk by chunk; returns the row count."""
+    with DatasetWriter(destination) as writer:
+        for chunk in iter_chunks(source, chunk_size=chunk_size):
+            writer.write(chunk)
+    return writer.rows
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python dataset_store.py <source .csv/.feather/.arrow/.parquet> <destination>")
+        sys.exit(1)
+    rows = convert(sys.argv[1], sys.argv[2])
+    print(f"✅ Wrote '{sys.argv[2]}' ({rows:,} rows, {os.path.getsize(sys.argv[2]) / 1e6:.1f} MB)")
@@ -0,0 +1,778 @@
+"""
+Input-drift monitor: constant-memory streaming summaries of every feature the
+model is asked to price, compared with summaries of its training data.
+
+  - QuantileSketch (numeric features, in model space: Car_Age rather than
+    Year) keeps logarithmic buckets, so any quantile is within
+    relative_accuracy of the true value; memory is capped at max_buckets.
+  - CategorySketch (categorical features) keeps one exact count per
+    vocabulary code plus a Misra-Gries summary of at most max_unknown values
+    the encoders have never seen, so junk input can't grow it.
+
+Both merge by adding counts, which is how the snapshots of prefork workers
+are combined. train_model() stores reference_summary() of the training
+matrix in the model metadata ('drift_reference'; the streaming trainer
+builds the same summary chunk by chunk with ReferenceBuilder); report() scores each
+feature with the population stability index (PSI) against it:
+< 0.1 ok, < 0.25 warn, above that drift.
+
+DriftMonitor.observe() only appends the row to a buffer (no lock, no sketch
+update on the request path). A background thread folds the buffer into the
+sketches every fold_interval seconds, or as soon as fold_rows rows are
+waiting, in vectorized blocks under the monitor's lock; without that thread
+the request that fills the buffer folds it. snapshot() and report() fold
+first, so they always include every observed row. Live summaries start afresh
+when the model version changes; with window_seconds they cover the last one
+to two windows (a row lands in the window current when it is folded). Each
+worker publishes its snapshot to `directory` every publish_interval seconds,
+and report() merges those of the live workers.
+"""
+import json
+import math
+import os
+import threading
+import time
+
+from collections import deque
+
+import numpy as np
+
+from worker_processes import lower_thread_priority, pid_alive
+
+# PSI thresholds: the usual reading of the index
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# Proportions below this are floored before the PSI log-ratio (a bin empty on one side)
+PSI_FLOOR = 1e-4
+REFERENCE_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+_REPORTED_QUANTILES = (0.05, 0.5, 0.95)
+# Folded blocks up to this size are added row by row (cheaper than the vectorized path)
+SMALL_BATCH = 16
+# |value| below this goes to the zero bucket
+_MIN_INDEXABLE = 1e-9
+# Longest unseen category value kept (longer ones are cut)
+_MAX_LABEL_CHARS = 100
+
+
+def psi(expected, actual):
+    """Population stability index between two lists of bin proportions."""
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e, a = max(e, PSI_FLOOR), max(a, PSI_FLOOR)
+        total += (a - e) * math.log(a / e)
+    return total
+
+
+def _status(score, count, min_samples):
+    if count < min_samples:
+        return 'too_few_samples'
+    if score is None:
+        return 'no_reference'
+    return 'drift' if score >= PSI_ALERT else 'warn' if score >= PSI_WARN else 'ok'
+
+
+# -----------------------------
+# SKETCHES
+# -----------------------------
+class QuantileSketch:
+    """
+    Mergeable streaming quantiles (the DDSketch layout): a value v > 0 is
+    counted in bucket ceil(log(v) / log(gamma)), negatives in a mirrored store,
+    near-zero values on their own. Beyond max_buckets per sign the buckets
+    nearest zero are folded together, trading accuracy there for bounded memory.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=1024):
+        self.relative_accuracy = float(relative_accuracy)
+        self.max_buckets = int(max_buckets)
+        self.gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        if value != value or value == math.inf or value == -math.inf:  # NaN: a missing input
+            return
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value > _MIN_INDEXABLE:
+            store = self.positive
+            key = math.ceil(math.log(value) / self._log_gamma)
+        elif value < -_MIN_INDEXABLE:
+            store = self.negative
+            key = math.ceil(math.log(-value) / self._log_gamma)
+        else:
+            self.zeros += 1
+            return
+        count = store.get(key)
+        if count is None:
+            store[key] = 1
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+        else:
+            store[key] = count + 1
+
+    def add_many(self, values):
+        """Vectorized add() for a column of values."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > _MIN_INDEXABLE]
+        negative = -values[values < -_MIN_INDEXABLE]
+        self.zeros += len(values) - len(positive) - len(negative)
+        for store, magnitudes in ((self.positive, positive), (self.negative, negative)):
+            if not len(magnitudes):
+                continue
+            keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                store[key] = store.get(key, 0) + count
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Cannot merge quantile sketches of different accuracy.')
+        for store, extra in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in extra.items():
+                store[key] = store.get(key, 0) + count
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), within relative_accuracy; None while empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for position, count in self._buckets():
+            seen += count
+            if seen > rank:
+                return min(max(self._value(position), self.min), self.max)
+        return self.max
+
+    def cdf(self, value, strict=False):
+        """Fraction of values <= `value` (< with strict), at bucket resolution."""
+        if not self.count:
+            return 0.0
+        target = self._position(value)
+        below = sum(count for position, count in self._buckets()
+                    if position < target or (not strict and position == target))
+        return below / self.count
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_buckets': self.max_buckets,
+            'count': self.count,
+            'zeros': self.zeros,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'positive': sorted(self.positive.items()),
+            'negative': sorted(self.negative.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'], data['max_buckets'])
+        sketch.count = data['count']
+        sketch.zeros = data['zeros']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        sketch.positive = {int(key): count for key, count in data['positive']}
+        sketch.negative = {int(key): count for key, count in data['negative']}
+        return sketch
+
+    # --- Internals ---
+    def _collapse(self, store):
+        """Folds the buckets nearest zero into one until max_buckets remain."""
+        keys = sorted(store)
+        folded = keys[:len(keys) - self.max_buckets]
+        target = keys[len(folded)]
+        store[target] += sum(store.pop(key) for key in folded)
+
+    def _position(self, value):
+        """Sort key of the bucket holding `value`: negatives (largest magnitude first), zero, positives."""
+        if value > _MIN_INDEXABLE:
+            return 2, math.ceil(math.log(value) / self._log_gamma)
+        if value < -_MIN_INDEXABLE:
+            return 0, -math.ceil(math.log(-value) / self._log_gamma)
+        return 1, 0
+
+    def _value(self, position):
+        side, key = position
+        if side == 1:
+            return 0.0
+        magnitude = 2 * self.gamma ** abs(key) / (self.gamma + 1)
+        return magnitude if side == 2 else -magnitude
+
+    def _buckets(self):
+        """(position, count) of every bucket, in value order."""
+        buckets = [((0, -key), count) for key, count in self.negative.items()]
+        if self.zeros:
+            buckets.append(((1, 0), self.zeros))
+        buckets += [((2, key), count) for key, count in self.positive.items()]
+        buckets.sort()
+        return buckets
+
+
+class CategorySketch:
+    """
+    Exact counts per vocabulary code, plus unseen values in a Misra-Gries
+    summary: at most max_unknown values are tracked, and any value seen more
+    than unknown / (max_unknown + 1) times is guaranteed to be among them
+    (its count a lower bound).
+    """
+
+    def __init__(self, size, max_unknown=32):
+        self.counts = [0] * int(size)
+        self.max_unknown = int(max_unknown)
+        self.unknown = 0
+        self.top_unknown = {}
+
+    @property
+    def count(self):
+        return sum(self.counts) + self.unknown
+
+    def add(self, code):
+        self.counts[code] += 1
+
+    def add_unknown(self, value):
+        self.unknown += 1
+        label = str(value)[:_MAX_LABEL_CHARS]
+        top = self.top_unknown
+        count = top.get(label)
+        if count is not None:
+            top[label] = count + 1
+        elif len(top) < self.max_unknown:
+            top[label] = 1
+        else:
+            # No room: every tracked value pays one count, the ones reaching zero make room later
+            for key in list(top):
+                if top[key] == 1:
+                    del top[key]
+                else:
+                    top[key] -= 1
+
+    def merge(self, other):
+        if len(other.counts) != len(self.counts):
+            raise ValueError('Cannot merge category sketches of different vocabularies.')
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.unknown += other.unknown
+        for label, count in other.top_unknown.items():
+            self.top_unknown[label] = self.top_unknown.get(label, 0) + count
+        if len(self.top_unknown) > self.max_unknown:
+            ranked = sorted(self.top_unknown.values(), reverse=True)
+            cut = ranked[self.max_unknown]
+            self.top_unknown = {label: count - cut for label, count in self.top_unknown.items() if count > cut}
+        return self
+
+    def to_dict(self):
+        return {'max_unknown': self.max_unknown, 'counts': list(self.counts), 'unknown': self.unknown,
+                'top_unknown': dict(self.top_unknown)}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(len(data['counts']), data['max_unknown'])
+        sketch.counts = list(data['counts'])
+        sketch.unknown = data['unknown']
+        sketch.top_unknown = dict(data['top_unknown'])
+        return sketch
+
+
+def _add_columns(sketches, block):
+    """
+    QuantileSketch.add_many() for several sketches at once, column j of
+    `block` going to sketches[j]: one np.unique over the whole block rather
+    than a handful of numpy calls per column.
+    """
+    block = np.asarray(block, dtype=np.float64)
+    if not sketches or not len(block):
+        return
+    if not np.isfinite(block).all():
+        for j, sketch in enumerate(sketches):
+            sketch.add_many(block[:, j])
+        return
+    side = np.where(block > _MIN_INDEXABLE, 1, np.where(block < -_MIN_INDEXABLE, 2, 0))
+    keys = np.ceil(np.log(np.maximum(np.abs(block), _MIN_INDEXABLE)) / sketches[0]._log_gamma).astype(np.int64)
+    lowest = int(keys.min())
+    span = int(keys.max()) - lowest + 1
+    # (column, side, key) folded into one integer per value
+    folded = (np.arange(len(sketches)) * 3 + side) * span + (keys - lowest)
+    values, counts = np.unique(folded, return_counts=True)
+    zeros = [{} for _ in sketches]
+    stores = [store for sketch, zero in zip(sketches, zeros) for store in (zero, sketch.positive, sketch.negative)]
+    for group, key, count in zip((values // span).tolist(), (values % span + lowest).tolist(), counts.tolist()):
+        store = stores[group]
+        store[key] = store.get(key, 0) + count
+    for sketch, zero, low, high in zip(sketches, zeros, block.min(axis=0).tolist(), block.max(axis=0).tolist()):
+        sketch.zeros += sum(zero.values())
+        sketch.count += len(block)
+        sketch.min = min(sketch.min, low)
+        sketch.max = max(sketch.max, high)
+        for store in (sketch.positive, sketch.negative):
+            if len(store) > sketch.max_buckets:
+                sketch._collapse(store)
+
+
+def _add_code_columns(sketches, block):
+    """CategorySketch.add() for a block of codes, column j going to sketches[j] (one bincount); codes below zero are skipped."""
+    block = np.asarray(block, dtype=np.int64)
+    if not sketches or not len(block):
+        return
+    sizes = [len(sketch.counts) for sketch in sketches]
+    offsets = np.cumsum([0] + sizes[:-1])
+    counts = np.bincount((block + offsets)[block >= 0], minlength=sum(sizes)).tolist()
+    for sketch, start, size in zip(sketches, offsets.tolist(), sizes):
+        sketch.counts = [a + b for a, b in zip(sketch.counts, counts[start:start + size])]
+
+
+# -----------------------------
+# TRAINING-TIME REFERENCE
+# -----------------------------
+def _numeric_features(pipeline):
+    """(model column, slot) of each numeric feature ('Year' arrives as Car_Age)."""
+    return [(pipeline.columns[slot], slot) for _, slot, _ in pipeline.numeric_slots]
+
+
+def reference_summary(pipeline, matrix):
+    """
+    Summary of an encoded training matrix to compare live traffic with: per
+    numeric feature its deciles as bin edges (duplicates merged, so discrete
+    features get one bin per value) with the exact share of rows in each bin,
+    plus min, max and a few quantiles; per categorical feature the share of
+    each vocabulary code. Small enough for the model manifest.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    summary = {'rows': int(len(matrix)), 'numeric': {}, 'categorical': {}}
+    for column, slot in _numeric_features(pipeline):
+        values = matrix[:, slot]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            continue
+        edges = np.unique(np.quantile(values, np.linspace(0.1, 0.9, 9), method='lower'))
+        # Bin i holds edges[i-1] < v <= edges[i], which is what QuantileSketch.cdf measures
+        counts = np.bincount(np.searchsorted(edges, values, side='left'), minlength=len(edges) + 1)
+        summary['numeric'][column] = {
+            'edges': edges.tolist(),
+            'proportions': [round(float(c), 6) for c in counts / len(values)],
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'quantiles': {f'p{round(q * 100):02d}': float(np.quantile(values, q)) for q in REFERENCE_QUANTILES},
+        }
+    for col, slot, lookup in pipeline.category_slots:
+        codes = matrix[:, slot]
+        codes = codes[~np.isnan(codes)].astype(np.int64)
+        counts = np.bincount(codes, minlength=len(lookup))
+        summary['categorical'][col] = [round(float(c), 6) for c in counts / max(len(codes), 1)]
+    return summary
+
+
+class ReferenceBuilder:
+    """
+    reference_summary() for data that never fits in memory: add() encoded
+    chunks, then summary(). Numeric features go through QuantileSketches, so
+    the deciles, bin shares and quantiles are within relative_accuracy of
+    the exact ones; categorical shares are exact.
+    """
+
+    def __init__(self, pipeline, relative_accuracy=0.01, max_buckets=1024):
+        self.rows = 0
+        self.numeric = [(column, slot, QuantileSketch(relative_accuracy, max_buckets))
+                        for column, slot in _numeric_features(pipeline)]
+        self.categorical = [(col, slot, CategorySketch(len(lookup))) for col, slot, lookup in pipeline.category_slots]
+
+    def add(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        self.rows += len(matrix)
+        _add_columns([sketch for _, _, sketch in self.numeric], matrix[:, [slot for _, slot, _ in self.numeric]])
+        codes = matrix[:, [slot for _, slot, _ in self.categorical]]
+        _add_code_columns([sketch for _, _, sketch in self.categorical],
+                          np.where(np.isnan(codes), -1, codes).astype(np.int64))
+
+    def summary(self):
+        summary = {'rows': self.rows, 'numeric': {}, 'categorical': {}}
+        for column, _, sketch in self.numeric:
+            if not sketch.count:
+                continue
+            edges = sorted({sketch.quantile(q) for q in np.linspace(0.1, 0.9, 9).tolist()})
+            below = [sketch.cdf(edge) for edge in edges] + [1.0]
+            summary['numeric'][column] = {
+                'edges': edges,
+                'proportions': [round(b - a, 6) for a, b in zip([0.0] + below[:-1], below)],
+                'min': sketch.min,
+                'max': sketch.max,
+                'quantiles': {f'p{round(q * 100):02d}': sketch.quantile(q) for q in REFERENCE_QUANTILES},
+            }
+        for col, _, sketch in self.categorical:
+            total = max(sum(sketch.counts), 1)
+            summary['categorical'][col] = [round(count / total, 6) for count in sketch.counts]
+        return summary
+
+
+# -----------------------------
+# LIVE MONITOR
+# -----------------------------
+class _Window:
+    """Live sketches of one model version since started_at."""
+
+    def __init__(self, pipeline, version, relative_accuracy, max_buckets, max_unknown):
+        self.version = version
+        self.started_at = time.time()
+        self.count = 0
+        self.numeric = [(column, slot, QuantileSketch(relative_accuracy, max_buckets))
+                        for column, slot in _numeric_features(pipeline)]
+        self.categorical = [(col, slot, CategorySketch(len(lookup), max_unknown))
+                            for col, slot, lookup in pipeline.category_slots]
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'started_at': self.started_at,
+            'count': self.count,
+            'numeric': {column: sketch.to_dict() for column, _, sketch in self.numeric},
+            'categorical': {col: sketch.to_dict() for col, _, sketch in self.categorical},
+        }
+
+
+def merge_snapshots(snapshots):
+    """Merges snapshot dicts (same model version) into (count, started_at, {column: sketch}, {column: sketch})."""
+    count, started_at, numeric, categorical = 0, None, {}, {}
+    for snapshot in snapshots:
+        count += snapshot['count']
+        started_at = min(started_at or snapshot['started_at'], snapshot['started_at'])
+        for column, data in snapshot['numeric'].items():
+            sketch = QuantileSketch.from_dict(data)
+            numeric[column] = numeric[column].merge(sketch) if column in numeric else sketch
+        for col, data in snapshot['categorical'].items():
+            sketch = CategorySketch.from_dict(data)
+            categorical[col] = categorical[col].merge(sketch) if col in categorical else sketch
+    return count, started_at, numeric, categorical
+
+
+class DriftMonitor:
+    def __init__(self, directory=None, publish_interval=10.0, window_seconds=0, relative_accuracy=0.01,
+                 max_buckets=1024, max_unknown=32, min_samples=100, fold_interval=1.0, fold_rows=512,
+                 enabled=True):
+        self.directory = directory
+        self.publish_interval = float(publish_interval)
+        self.fold_interval = float(fold_interval)
+        self.fold_rows = int(fold_rows)
+        self.window_seconds = float(window_seconds)
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.max_unknown = max_unknown
+        self.min_samples = int(min_samples)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._pending = deque()  # (bundle, matrix, unknowns by row) waiting to be folded
+        self._pending_rows = 0  # approximate: updated without the lock
+        self._wake = threading.Event()
+        self._current = None
+        self._previous = None  # the last full window, reported with the current one
+        self._rotate_at = math.inf
+        self._stop = threading.Event()
+        self._thread = None
+        self._warned = set()  # model versions already reported as having no reference
+        self.publish_errors = 0
+
+    # --- Request path ---
+    def observe(self, bundle, vector, unknowns=(), errors=()):
+        """
+        Queues one encoded row. Rows with invalid inputs are skipped (their
+        vectors hold placeholders); rows rejected only for an unknown
+        category (UNKNOWN_CATEGORY_POLICY=error) still count. The vector is
+        read when the buffer is folded: callers must not mutate it.
+        """
+        if not self.enabled or len(errors) > self._unknown_errors(bundle, unknowns):
+            return
+        # deque.append is atomic: no lock needed between request threads and the folding thread
+        self._pending.append((bundle, vector, {0: unknowns} if unknowns else None))
+        self._queued(1)
+
+    def observe_many(self, bundle, matrix, errors, unknowns):
+        """Batch observe(): `errors` and `unknowns` map a row index to a list, as encode_columns returns them."""
+        if not self.enabled or not len(matrix):
+            return
+        dropped = [i for i, row_errors in errors.items()
+                   if len(row_errors) > self._unknown_errors(bundle, unknowns.get(i, ()))]
+        if dropped:
+            keep = np.ones(len(matrix), dtype=bool)
+            keep[dropped] = False
+            index = np.cumsum(keep) - 1  # row index after the invalid rows are dropped
+            matrix = matrix[keep]
+            unknowns = {int(index[i]): found for i, found in unknowns.items() if keep[i]}
+        if len(matrix):
+            self._pending.append((bundle, matrix, unknowns or None))
+            self._queued(len(matrix))
+
+    def fold(self):
+        """Adds every buffered row to the sketches."""
+        with self._lock:
+            self._fold()
+
+    def _queued(self, n_rows):
+        self._pending_rows += n_rows
+        if self._pending_rows < self.fold_rows:
+            return
+        if self._thread is None or self._pending_rows >= 8 * self.fold_rows:
+            self.fold()  # nobody else folds (or they fell far behind): bound the buffer here
+        else:
+            self._wake.set()
+
+    def _fold(self):
+        """Folds the buffer in one block per run of rows of the same model version (caller holds the lock)."""
+        self._pending_rows = 0
+        while self._pending:
+            bundle, first, found = self._pending.popleft()
+            blocks = [first]
+            unknowns = dict(found) if found else {}
+            rows = len(first) if first.ndim == 2 else 1
+            while self._pending and self._pending[0][0].version == bundle.version:
+                _, block, found = self._pending.popleft()
+                for i, values in (found or {}).items():
+                    unknowns[rows + i] = values
+                blocks.append(block)
+                rows += len(block) if block.ndim == 2 else 1
+            matrix = np.vstack(blocks) if len(blocks) > 1 or first.ndim == 1 else first
+            self._add_block(self._window(bundle), matrix, unknowns)
+
+    @classmethod
+    def _add_block(cls, window, matrix, unknowns):
+        if len(matrix) <= SMALL_BATCH:
+            # The vectorized path costs a few numpy calls per feature whatever the block size
+            for i, values in enumerate(matrix.tolist()):
+                cls._add_row(window, values, unknowns.get(i, ()))
+            return
+        window.count += len(matrix)
+        _add_columns([sketch for _, _, sketch in window.numeric],
+                     matrix[:, [slot for _, slot, _ in window.numeric]])
+        codes = matrix[:, [slot for _, slot, _ in window.categorical]].astype(np.int64)
+        position = {col: j for j, (col, _, _) in enumerate(window.categorical)}
+        for i, found in unknowns.items():
+            for col, value in found:
+                if col in position:
+                    codes[i, position[col]] = -1
+                    window.categorical[position[col]][2].add_unknown(value)
+        _add_code_columns([sketch for _, _, sketch in window.categorical], codes)
+
+    @staticmethod
+    def _add_row(window, values, unknowns):
+        window.count += 1
+        unseen = dict(unknowns) if unknowns else None
+        for _, slot, sketch in window.numeric:
+            sketch.add(values[slot])
+        for col, slot, sketch in window.categorical:
+            if unseen is not None and col in unseen:
+                sketch.add_unknown(unseen[col])
+            else:
+                sketch.add(int(values[slot]))
+
+    # --- Snapshots ---
+    def snapshot(self):
+        """This process's live summaries (current and previous window merged) as a JSON-safe dict."""
+        with self._lock:
+            self._fold()
+            windows = [w.to_dict() for w in (self._previous, self._current) if w is not None]
+        if not windows:
+            return None
+        windows = [w for w in windows if w['version'] == windows[-1]['version']]
+        count, started_at, numeric, categorical = merge_snapshots(windows)
+        return {'pid': os.getpid(), 'version': windows[-1]['version'], 'started_at': started_at,
+                'updated_at': time.time(), 'count': count,
+                'numeric': {column: sketch.to_dict() for column, sketch in numeric.items()},
+                'categorical': {col: sketch.to_dict() for col, sketch in categorical.items()}}
+
+    def publish(self):
+        """Writes snapshot() to <directory>/drift-<pid>.json for the other workers' reports."""
+        snapshot = self.snapshot()
+        if snapshot is None or not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'drift-{os.getpid()}.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(path + '.tmp', path)
+
+    def worker_snapshots(self, version):
+        """Published snapshots of the other live workers for `version`."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith('drift-') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name[len('drift-'):-len('.json')])
+            except ValueError:
+                continue
+            if pid == os.getpid() or not pid_alive(pid):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get('version') == version:
+                snapshots.append(snapshot)
+        return snapshots
+
+    # --- Report ---
+    def report(self, bundle):
+        """Per-feature drift of the live traffic (all live workers) against bundle's training reference."""
+        if bundle is None:
+            return {'model_version': None, 'status': 'no_model', 'features': {}}
+        own = self.snapshot()
+        snapshots = [own] if own is not None and own['version'] == bundle.version else []
+        snapshots += self.worker_snapshots(bundle.version)
+        count, started_at, numeric, categorical = merge_snapshots(snapshots)
+        reference = bundle.metadata.get('drift_reference') or {}
+        vocabularies = bundle.pipeline.vocabularies
+
+        features = {}
+        for column, sketch in numeric.items():
+            features[column] = self._numeric_report(sketch, reference.get('numeric', {}).get(column))
+        for col, sketch in categorical.items():
+            features[col] = self._category_report(sketch, reference.get('categorical', {}).get(col),
+                                                  vocabularies.get(col, []))
+        statuses = {feature['status'] for feature in features.values()}
+        status = next((s for s in ('drift', 'warn', 'ok', 'too_few_samples', 'no_reference') if s in statuses),
+                      'too_few_samples')
+        return {
+            'model_version': bundle.version,
+            'status': status,
+            'reference_rows': reference.get('rows'),
+            'observed': count,
+            'since': started_at,
+            'workers': len(snapshots),
+            'thresholds': {'warn': PSI_WARN, 'drift': PSI_ALERT, 'min_samples': self.min_samples},
+            'features': features,
+        }
+
+    def _numeric_report(self, sketch, reference):
+        live = {f'p{round(q * 100):02d}': sketch.quantile(q) for q in _REPORTED_QUANTILES}
+        report = {'kind': 'numeric', 'count': sketch.count, 'psi': None,
+                  'live': dict(live, min=sketch.min if sketch.count else None,
+                               max=sketch.max if sketch.count else None)}
+        if reference:
+            below = [sketch.cdf(edge) for edge in reference['edges']] + [1.0]
+            actual = [b - a for a, b in zip([0.0] + below, below)]
+            report['psi'] = round(psi(reference['proportions'], actual), 4) if sketch.count else None
+            report['reference'] = dict({k: reference['quantiles'][k] for k in live if k in reference['quantiles']},
+                                       min=reference['min'], max=reference['max'])
+            inside = sketch.cdf(reference['max']) - sketch.cdf(reference['min'], strict=True) if sketch.count else 1.0
+            report['out_of_range_rate'] = round(1.0 - inside, 4)
+        report['status'] = _status(report['psi'], sketch.count, self.min_samples)
+        return report
+
+    def _category_report(self, sketch, reference, vocabulary):
+        total = sketch.count
+        report = {'kind': 'categorical', 'count': total, 'psi': None,
+                  'unknown_rate': round(sketch.unknown / total, 4) if total else None,
+                  'top_unknown': sorted(sketch.top_unknown.items(), key=lambda item: -item[1])[:10]}
+        if reference and total:
+            # Codes added by an incremental retrain have no reference share; unknowns are one more bin
+            expected = list(reference) + [0.0] * (len(sketch.counts) - len(reference)) + [0.0]
+            actual = [c / total for c in sketch.counts] + [sketch.unknown / total]
+            report['psi'] = round(psi(expected, actual), 4)
+            shifts = sorted(range(len(sketch.counts)), key=lambda code: -abs(actual[code] - expected[code]))
+            report['top_shifts'] = [{'value': vocabulary[code] if code < len(vocabulary) else code,
+                                     'reference': round(expected[code], 4), 'live': round(actual[code], 4)}
+                                    for code in shifts[:3]]
+        report['status'] = _status(report['psi'], total, self.min_samples)
+        return report
+
+    # --- Background folding and publishing ---
+    def start(self):
+        if self._thread is not None or not self.enabled:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='drift-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(5.0)
+        self._thread = None
+        self.fold()
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'drift-{os.getpid()}.json')
+        try:
+            os.remove(path)  # a stopped worker's traffic leaves the report with it
+        except OSError:
+            pass
+
+    def _run(self):
+        lower_thread_priority()
+        publishing = bool(self.directory) and self.publish_interval > 0
+        publish_at = time.monotonic() + self.publish_interval
+        while not self._stop.is_set():
+            self._wake.wait(self.fold_interval)
+            self._wake.clear()
+            try:
+                self.fold()
+            except Exception as e:
+                print(f"--- Drift rows not folded: {type(e).__name__}: {e} ---")
+            if publishing and time.monotonic() >= publish_at:
+                publish_at = time.monotonic() + self.publish_interval
+                try:
+                    self.publish()
+                except Exception as e:
+                    self.publish_errors += 1
+                    print(f"--- Drift snapshot not published: {type(e).__name__}: {e} ---")
+
+    def check_reference(self, bundle):
+        """
+        False (with a loud warning, once per model version) when the model
+        carries no training reference, so every feature would read no_reference.
+        """
+        if not self.enabled or bundle is None or bundle.metadata.get('drift_reference'):
+            return True
+        if bundle.version not in self._warned:
+            self._warned.add(bundle.version)
+            print(f"--- WARNING: model {bundle.version} has no drift reference: input drift can't be scored "
+                  f"(/admin/drift reports no_reference). Retrain with car_price_prediction.py to add one. ---")
+        return False
+
+    # --- Internals ---
+    def _window(self, bundle):
+        """The live window for bundle (caller holds the lock): a new model version or an elapsed window starts one."""
+        window = self._current
+        if window is None or window.version != bundle.version:
+            self.check_reference(bundle)
+            self._previous = None
+            self._rotate_at = time.monotonic() + self.window_seconds if self.window_seconds > 0 else math.inf
+        elif time.monotonic() >= self._rotate_at:
+            self._previous = window
+            self._rotate_at = time.monotonic() + self.window_seconds
+        else:
+            return window
+        self._current = _Window(bundle.pipeline, bundle.version, self.relative_accuracy, self.max_buckets,
+                                self.max_unknown)
+        return self._current
+
+    @staticmethod
+    def _unknown_errors(bundle, unknowns):
+        """How many of a row's errors are unknown categories (only the 'error' policy rejects those)."""
+        return len(unknowns) if bundle.pipeline.unknown_code is None else 0
@@ -0,0 +1,264 @@
+import math
+
+import numpy as np
+
+# -----------------------------
+# FEATURE SCHEMA
+# -----------------------------
+# Numeric inputs as they arrive from the form / JSON / CSV, with the cast applied to each.
+# 'Year' is turned into the engineered 'Car_Age' feature the model was trained on.
+NUMERIC_INPUTS = [
+    ('Year', int),
+    ('Present_Price(Lakhs)', float),
+    ('Kms_Driven', int),
+    ('Owner', int),
+    ('Mileage(km/l)', float),
+    ('Engine_Power(cc)', int),
+    ('Maintenance_Cost(₹/yr)', int),
+    ('Insurance_Age(yrs)', int),
+    ('Accidents', int),
+]
+CATEGORICAL_COLS = ['Car_Name', 'City', 'Condition', 'Fuel_Type', 'Seller_Type', 'Transmission']
+
+# What to do with a category the encoders never saw:
+#   'zero'    -> use code 0 (the original behaviour of the app)
+#   'missing' -> emit NaN so XGBoost follows the learned default branch
+#   'error'   -> reject the row
+UNKNOWN_POLICIES = ('zero', 'missing', 'error')
+
+
+def finalize_prices(predictions):
+    """Applies the serving clamp and rounding to raw model outputs."""
+    return [round(max(0, float(p)), 2) for p in predictions]
+
+
+class FeaturePipeline:
+    """
+    Compiled encoder built once from the category vocabularies and the model's
+    column order. Categories are plain dict lookups and every feature has a fixed
+    slot in the output vector, so no sklearn code runs per prediction.
+    """
+
+    def __init__(self, columns, vocabularies, unknown_policy='zero'):
+        if unknown_policy not in UNKNOWN_POLICIES:
+            raise ValueError(f"unknown_policy must be one of {UNKNOWN_POLICIES}, got {unknown_policy!r}")
+
+        self.columns = list(columns)
+        self.vocabularies = {col: list(labels) for col, labels in vocabularies.items()}
+        self.unknown_policy = unknown_policy
+
+        slots = {col: i for i, col in enumerate(self.columns)}
+        self.n_features = len(self.columns)
+
+        # (input field, slot, cast) for each numeric feature the model uses
+        self.numeric_slots = []
+        for field, cast in NUMERIC_INPUTS:
+            column = 'Car_Age' if field == 'Year' else field
+            if column in slots:
+                self.numeric_slots.append((field, slots[column], cast))
+
+        # (column, slot, {label: code}) for each categorical feature the model uses
+        self.category_slots = []
+        for col in CATEGORICAL_COLS:
+            if col in slots and col in self.vocabularies:
+                lookup = {label: code for code, label in enumerate(self.vocabularies[col])}
+                self.category_slots.append((col, slots[col], lookup))
+
+        self.unknown_code = {'zero': 0.0, 'missing': np.nan, 'error': None}[unknown_policy]
+
+    # --- Construction ---
+    @classmethod
+    def from_encoders(cls, mappings, columns, unknown_policy='zero'):
+        """Builds the pipeline from fitted LabelEncoders (the 'mappings' saved in car_model.pkl)."""
+        vocabularies = {col: encoder.classes_.tolist() for col, encoder in mappings.items()}
+        return cls(columns, vocabularies, unknown_policy)
+
+    @classmethod
+    def from_dict(cls, spec, unknown_policy=None):
+        return cls(spec['columns'], spec['vocabularies'],
+                   unknown_policy or spec.get('unknown_policy', 'zero'))
+
+    def to_dict(self):
+        return {
+            'columns': self.columns,
+            'vocabularies': self.vocabularies,
+            'unknown_policy': self.unknown_policy,
+        }
+
+    def extended(self, labels):
+        """
+        Returns (pipeline, added): a copy whose vocabularies also cover `labels`
+        ({column: iterable of labels}), with the unseen ones appended in sorted
+        order after the existing codes. Existing codes never change, so trees
+        trained on the old encoding stay valid. `added` maps column -> new labels.
+        """
+        vocabularies = {col: list(known) for col, known in self.vocabularies.items()}
+        added = {}
+        for col, values in labels.items():
+            known = set(vocabularies.setdefault(col, []))
+            fresh = sorted({label for label in values if label not in known})
+            if fresh:
+                vocabularies[col] += fresh
+                added[col] = fresh
+        return FeaturePipeline(self.columns, vocabularies, self.unknown_policy), added
+
+    # --- Single Row ---
+    def encode_row(self, row, prefix='', current_year=None):
+        """
+        Encodes one dict-like row. Returns (vector, errors, unknowns) where
+        unknowns is a list of (column, value) pairs for unseen categories.
+        """
+        vector = np.zeros(self.n_features, dtype=np.float64)
+        errors = []
+        unknowns = []
+
+        for field, slot, cast in self.numeric_slots:
+            raw = row.get(prefix + field)
+            try:
+                value = cast(raw)
+            except (TypeError, ValueError, OverflowError):
+                errors.append(f"Invalid value for '{field}': {raw!r}")
+                continue
+            if not math.isfinite(value):
+                errors.append(f"Invalid value for '{field}': {raw!r}")
+                continue
+            vector[slot] = current_year - value if field == 'Year' else value
+
+        for col, slot, lookup in self.category_slots:
+            value = row.get(prefix + col)
+            if _is_missing(value):
+                errors.append(f"Missing value for '{col}'.")
+                continue
+            code = lookup.get(value)
+            if code is None:
+                unknowns.append((col, value))
+                if self.unknown_code is None:
+                    errors.append(f"Unknown category '{value}' for column '{col}'.")
+                    continue
+                code = self.unknown_code
+            vector[slot] = code
+
+        return vector, errors, unknowns
+
+    # --- Column Batch ---
+    def encode_rows(self, rows, prefix='', current_year=None):
+        """Encodes a list of dict-like rows by transposing them into columns."""
+        fields = [field for field, _, _ in self.numeric_slots] + [col for col, _, _ in self.category_slots]
+        data = {field: [row.get(prefix + field) for row in rows] for field in fields}
+        return self.encode_columns(data, len(rows), current_year)
+
+    def encode_columns(self, data, n_rows=None, current_year=None, cast_inputs=True):
+        """
+        Encodes a column batch: `data` maps input field names to equal-length
+        sequences (lists, NumPy arrays or pandas Series). If 'Car_Age' is given
+        directly it is used as-is, otherwise it is derived from 'Year'.
+        With cast_inputs=False numeric columns are taken as recorded (training
+        data), instead of going through the int()/float() casts and finiteness
+        check applied to user input. Rows are validated exactly as encode_row()
+        does, with the same messages. Returns (matrix, valid_mask, errors, unknowns) where
+        errors/unknowns map a row index to a list.
+        """
+        if n_rows is None:
+            n_rows = len(next(iter(data.values()))) if data else 0
+        matrix = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        valid = np.ones(n_rows, dtype=bool)
+        errors = {}
+        unknowns = {}
+
+        for field, slot, cast in self.numeric_slots:
+            if field == 'Year' and 'Car_Age' in data:
+                field, cast = 'Car_Age', int
+            values, bad = self._cast_column(data.get(field), cast if cast_inputs else float, n_rows, cast_inputs)
+            for i in np.flatnonzero(bad):
+                valid[i] = False
+                errors.setdefault(int(i), []).append(f"Invalid value for '{field}': {_item(data.get(field), i)!r}")
+            if field == 'Year':
+                values = current_year - values
+            matrix[:, slot] = values
+
+        for col, slot, lookup in self.category_slots:
+            codes = self._lookup_column(data.get(col), lookup, n_rows)
+            missing = np.flatnonzero(codes < 0)
+            if len(missing):
+                column = data.get(col)
+                codes = codes.astype(np.float64)
+                codes[missing] = 0.0 if self.unknown_code is None else self.unknown_code
+                for i in missing:
+                    value = _item(column, i)
+                    if _is_missing(value):
+                        valid[i] = False
+                        codes[i] = 0.0
+                        errors.setdefault(int(i), []).append(f"Missing value for '{col}'.")
+                        continue
+                    unknowns.setdefault(int(i), []).append((col, value))
+                    if self.unknown_code is None:
+                        valid[i] = False
+                        errors.setdefault(int(i), []).append(f"Unknown category '{value}' for column '{col}'.")
+            matrix[:, slot] = codes
+
+        return matrix, valid, errors, unknowns
+
+    # --- Helpers ---
+    @staticmethod
+    def _cast_column(values, cast, n_rows, finite=True):
+        """
+        Returns (float array, bad mask), matching the per-row int()/float()
+        casts; with finite=True NaN and inf are bad as well.
+        """
+        bad = np.zeros(n_rows, dtype=bool)
+        if values is None:
+            return np.zeros(n_rows, dtype=np.float64), ~bad
+
+        # Plain lists (JSON rows) keep their Python objects so int('8.5') still fails like the row path
+        array = np.asarray(values) if hasattr(values, 'dtype') else np.array(values, dtype=object)
+        if array.dtype.kind in 'iub':
+            return array.astype(np.float64), bad
+        if array.dtype.kind == 'f':
+            out = array.astype(np.float64)
+            bad = ~np.isfinite(out) if finite or cast is int else bad
+            out = np.trunc(out) if cast is int else out
+            out[bad] = 0.0
+            return out, bad
+
+        # Strings / mixed objects: fall back to the exact per-value cast
+        out = np.zeros(n_rows, dtype=np.float64)
+        for i, raw in enumerate(array.tolist()):
+            try:
+                out[i] = cast(raw)
+            except (TypeError, ValueError, OverflowError):
+                bad[i] = True
+        if finite:
+            bad |= ~np.isfinite(out)
+            out[bad] = 0.0
+        return out, bad
+
+    @staticmethod
+    def _lookup_column(values, lookup, n_rows):
+        """Maps labels to codes with one dict lookup per distinct label; -1 marks unknowns."""
+        if values is None:
+            return np.full(n_rows, -1, dtype=np.int64)
+
+        categories = getattr(getattr(values, 'cat', None), 'categories', None)
+        if categories is not None:
+            # pandas Categorical: translate the (few) categories, then gather by code
+            table = np.array([lookup.get(label, -1) for label in categories.tolist()] + [-1], dtype=np.int64)
+            return table[values.cat.codes.to_numpy()]
+
+        return np.fromiter((lookup.get(value, -1) for value in _tolist(values)), dtype=np.int64, count=n_rows)
+
+
+def _is_missing(value):
+    """None or NaN: a field that was not filled in (an empty string is just an unknown label)."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _tolist(values):
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _item(values, i):
+    if values is None:
+        return None
+    value = values.iloc[int(i)] if hasattr(values, 'iloc') else values[int(i)]
+    # NumPy scalars -> plain Python values, so messages read 'nan' rather than 'np.float64(nan)'
+    return value.item() if isinstance(value, np.generic) else value
@@ -1,6 +1,19 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
 import pandas as pd
 import numpy as np
-import random
+
+import dataset_store
+
+# Optional: pyarrow's CSV writer formats rows ~10x faster than DataFrame.to_csv
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
 
 # -----------------------------
 # CONFIGURATION
@@ -9,6 +22,11 @@ N_ROWS = 60000
 CURRENT_YEAR = 2025
 MIN_YEAR = 2010
 
+# Rows generated and written per chunk; memory use depends on this, not on N_ROWS
+CHUNK_SIZE = 250000
+# Typed columnar Arrow file when pyarrow is installed (see dataset_store.py), CSV otherwise
+OUTPUT_FILE = 'enhanced_car_dataset.feather' if pa is not None else 'enhanced_car_dataset.csv'
+
 # Minimum absolute selling price in Lakhs (user requirement)
 MIN_SELLING_PRICE_LAKHS = 1.5
 
@@ -110,81 +128,78 @@ BRAND_REPUTATION = {
 
 
 # -----------------------------
-# DATA GENERATION
+# LOOKUP TABLES (built once)
 # -----------------------------
-data = []
+CAR_NAMES = np.array(list(CAR_SPECS.keys()), dtype=object)
+CAR_BRANDS = np.array([CAR_SPECS[name]['brand'] for name in CAR_NAMES], dtype=object)
+PRICE_LOW = np.array([CAR_SPECS[name]['price_range'][0] for name in CAR_NAMES])
+PRICE_HIGH = np.array([CAR_SPECS[name]['price_range'][1] for name in CAR_NAMES])
+CAR_BRAND_FACTOR = np.array([BRAND_REPUTATION[brand] for brand in CAR_BRANDS])
+
+# Each model's fuel options, padded into a fixed-width table + per-model option count
+FUEL_COUNT = np.array([len(CAR_SPECS[name]['fuel']) for name in CAR_NAMES])
+FUEL_TABLE = np.array([CAR_SPECS[name]['fuel'] + [''] * (FUEL_COUNT.max() - len(CAR_SPECS[name]['fuel']))
+                       for name in CAR_NAMES], dtype=object)
 
-for _ in range(N_ROWS):
-    car_name = random.choice(list(CAR_SPECS.keys()))
-    specs = CAR_SPECS[car_name]
-    brand = specs['brand']
-    year = random.randint(MIN_YEAR, CURRENT_YEAR - 1)
+CONDITION_FACTOR = np.array([1.05, 1.00, 0.9, 0.75])  # Excellent, Good, Average, Poor
+ENGINE_SIZES = np.array([1000, 1200, 1500, 1800, 2000, 2500])
+
+COLUMNS = [
+    'Brand', 'Car_Name', 'City', 'Year', 'Car_Age', 'Condition', 'Present_Price(Lakhs)',
+    'Selling_Price(Lakhs)', 'Kms_Driven', 'Fuel_Type', 'Seller_Type', 'Transmission', 'Owner',
+    'Mileage(km/l)', 'Engine_Power(cc)', 'Maintenance_Cost(₹/yr)', 'Insurance_Age(yrs)', 'Accidents'
+]
+
+
+# -----------------------------
+# DATA GENERATION
+# -----------------------------
+def generate_chunk(rng, n_rows):
+    """
+    Draws n_rows listings as arrays and applies every pricing factor as array
+    math. Same distributions and factors as the original per-row loop.
+    """
+    car_idx = rng.integers(0, len(CAR_NAMES), n_rows)
+    year = rng.integers(MIN_YEAR, CURRENT_YEAR, n_rows)
     car_age = CURRENT_YEAR - year
 
     # Prices
-    present_price = round(random.uniform(*specs['price_range']), 2)
+    present_price = np.round(rng.uniform(PRICE_LOW[car_idx], PRICE_HIGH[car_idx]), 2)
 
     # Random attributes
-    fuel_type = random.choice(specs['fuel'])
-    seller_type = random.choices(['Dealer', 'Individual'], [0.7, 0.3])[0]
-    transmission = random.choices(['Manual', 'Automatic'], [0.7, 0.3])[0]
-    owner = random.choices([0, 1, 2], [0.6, 0.3, 0.1])[0]
-    city = random.choice(CITIES)
-    condition = random.choices(CONDITIONS, [0.3, 0.4, 0.2, 0.1])[0]
+    fuel_pick = np.floor(rng.random(n_rows) * FUEL_COUNT[car_idx]).astype(np.int64)
+    fuel_type = FUEL_TABLE[car_idx, fuel_pick]
+    seller_dealer = rng.random(n_rows) < 0.7
+    manual = rng.random(n_rows) < 0.7
+    owner = rng.choice(3, n_rows, p=[0.6, 0.3, 0.1])
+    city_idx = rng.integers(0, len(CITIES), n_rows)
+    condition_idx = rng.choice(len(CONDITIONS), n_rows, p=[0.3, 0.4, 0.2, 0.1])
 
     # Mileage, Engine Power & Maintenance
-    mileage = round(random.uniform(12, 25), 1)  # km/l
-    engine_power = random.choice([1000, 1200, 1500, 1800, 2000, 2500])
-    maintenance_cost = round(random.uniform(3000, 15000), 2)
-    insurance_age = random.randint(0, 5)
-    accidents = random.choices([0, 1, 2], [0.8, 0.15, 0.05])[0]
+    mileage = np.round(rng.uniform(12, 25, n_rows), 1)  # km/l
+    engine_power = ENGINE_SIZES[rng.integers(0, len(ENGINE_SIZES), n_rows)]
+    maintenance_cost = np.round(rng.uniform(3000, 15000, n_rows), 2)
+    insurance_age = rng.integers(0, 6, n_rows)
+    accidents = rng.choice(3, n_rows, p=[0.8, 0.15, 0.05])
 
     # KMs Driven
-    avg_kms_per_year = random.randint(10000, 15000)
-    kms_driven = int(car_age * avg_kms_per_year + random.randint(-5000, 5000))
-    kms_driven = max(5000, kms_driven)
+    avg_kms_per_year = rng.integers(10000, 15001, n_rows)
+    kms_driven = np.maximum(5000, car_age * avg_kms_per_year + rng.integers(-5000, 5001, n_rows))
 
     # -----------------------------
     # SELLING PRICE CALCULATION
     # -----------------------------
-    selling_price = present_price
-
-    # Age depreciation
-    age_depreciation_rate = random.uniform(0.07, 0.10)
-    selling_price *= (1 - age_depreciation_rate) ** car_age
-
-    # Kms depreciation
-    kms_depreciation = (kms_driven / 100000) * 0.4
-    selling_price *= (1 - kms_depreciation)
-
-    # Owner depreciation
-    selling_price *= (1 - 0.08) ** owner
-
-    # Condition factor
-    if condition == 'Excellent':
-        selling_price *= 1.05
-    elif condition == 'Good':
-        selling_price *= 1.00
-    elif condition == 'Average':
-        selling_price *= 0.9
-    else:
-        selling_price *= 0.75
-
-    # Brand reputation
-    selling_price *= BRAND_REPUTATION[brand]
-
-    # Fuel & Transmission adjustment
-    if fuel_type == 'Diesel':
-        selling_price *= 1.05
-    if transmission == 'Automatic':
-        selling_price *= 1.03
-
-    # Accident & maintenance penalties
-    selling_price *= (1 - 0.05 * accidents)
-    selling_price *= (1 - 0.00001 * maintenance_cost)
-
-    # Random noise
-    selling_price *= random.uniform(0.95, 1.05)
+    selling_price = present_price.copy()
+    selling_price *= (1 - rng.uniform(0.07, 0.10, n_rows)) ** car_age     # Age depreciation
+    selling_price *= 1 - (kms_driven / 100000) * 0.4                       # Kms depreciation
+    selling_price *= (1 - 0.08) ** owner                                   # Owner depreciation
+    selling_price *= CONDITION_FACTOR[condition_idx]                       # Condition factor
+    selling_price *= CAR_BRAND_FACTOR[car_idx]                             # Brand reputation
+    selling_price *= np.where(fuel_type == 'Diesel', 1.05, 1.0)            # Fuel adjustment
+    selling_price *= np.where(manual, 1.0, 1.03)                           # Transmission adjustment
+    selling_price *= 1 - 0.05 * accidents                                  # Accident penalty
+    selling_price *= 1 - 0.00001 * maintenance_cost                        # Maintenance penalty
+    selling_price *= rng.uniform(0.95, 1.05, n_rows)                       # Random noise
 
     # -----------------------------
     # ENFORCE MINIMUM SELLING PRICE
@@ -195,39 +210,111 @@ for _ in range(N_ROWS):
     # Option B (optional, uncomment to use): model-proportional floor
     # This ensures expensive models don't drop to an unrealistically tiny fraction.
     # e.g., keep at least 18% of present price or the absolute floor, whichever is larger.
-    # model_floor = max(MIN_SELLING_PRICE_LAKHS, round(0.18 * present_price, 2))
-    # final_min_price = model_floor
+    # final_min_price = np.maximum(MIN_SELLING_PRICE_LAKHS, np.round(0.18 * present_price, 2))
 
-    selling_price = max(final_min_price, round(selling_price, 2))
+    selling_price = np.maximum(final_min_price, np.round(selling_price, 2))
 
-    # -----------------------------
-    # APPEND ROW
-    # -----------------------------
-    data.append({
-        'Brand': brand,
-        'Car_Name': car_name,
-        'City': city,
+    return pd.DataFrame({
+        'Brand': CAR_BRANDS[car_idx],
+        'Car_Name': CAR_NAMES[car_idx],
+        'City': np.array(CITIES, dtype=object)[city_idx],
         'Year': year,
         'Car_Age': car_age,
-        'Condition': condition,
+        'Condition': np.array(CONDITIONS, dtype=object)[condition_idx],
         'Present_Price(Lakhs)': present_price,
         'Selling_Price(Lakhs)': selling_price,
         'Kms_Driven': kms_driven,
         'Fuel_Type': fuel_type,
-        'Seller_Type': seller_type,
-        'Transmission': transmission,
+        'Seller_Type': np.where(seller_dealer, 'Dealer', 'Individual').astype(object),
+        'Transmission': np.where(manual, 'Manual', 'Automatic').astype(object),
         'Owner': owner,
         'Mileage(km/l)': mileage,
         'Engine_Power(cc)': engine_power,
         'Maintenance_Cost(₹/yr)': maintenance_cost,
         'Insurance_Age(yrs)': insurance_age,
-        'Accidents': accidents
-    })
+        'Accidents': accidents,
+    }, columns=COLUMNS)
+
+
+def _chunk_plan(n_rows, chunk_size, seed):
+    """
+    Splits the job into chunks, each with its own independent RNG stream spawned
+    from one SeedSequence. Output depends only on (seed, n_rows, chunk_size), not
+    on how many worker processes ran it.
+    """
+    sizes = [min(chunk_size, n_rows - start) for start in range(0, n_rows, chunk_size)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    return list(zip(streams, sizes))
+
+
+def _generate_task(task):
+    stream, size = task
+    return generate_chunk(np.random.default_rng(stream), size)
+
+
+def _render_chunk(task):
+    """Generates one chunk and returns it as CSV bytes (no header)."""
+    chunk = _generate_task(task)
+    if pa is not None:
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(pa.Table.from_pandas(chunk, preserve_index=False), sink,
+                         pa_csv.WriteOptions(include_header=False))
+        return sink.getvalue().to_pybytes()
+    return chunk.to_csv(index=False, header=False).encode('utf-8')
+
+
+def generate_dataset(path=OUTPUT_FILE, n_rows=N_ROWS, seed=None, chunk_size=CHUNK_SIZE, workers=1):
+    """
+    Writes n_rows listings to `path` chunk by chunk, so memory stays flat no
+    matter how many rows are requested. With workers > 1 chunks are generated in
+    a process pool and written in order as they complete. The format follows
+    the extension: CSV, or a typed columnar file (.feather/.arrow/.parquet).
+    Returns the SeedSequence entropy so a run can be reproduced.
+    """
+    seed_seq = np.random.SeedSequence(seed)
+    plan = _chunk_plan(n_rows, chunk_size, seed_seq.entropy)
+
+    if dataset_store.is_columnar(path):
+        with dataset_store.DatasetWriter(path) as writer:
+            if workers > 1:
+                with Pool(workers) as pool:
+                    for chunk in pool.imap(_generate_task, plan):
+                        writer.write(chunk)
+            else:
+                for task in plan:
+                    writer.write(_generate_task(task))
+        return seed_seq.entropy
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write((','.join(COLUMNS) + '\n').encode('utf-8'))
+        if workers > 1:
+            with Pool(workers) as pool:
+                for data in pool.imap(_render_chunk, plan):
+                    f.write(data)
+        else:
+            for task in plan:
+                f.write(_render_chunk(task))
+    os.replace(tmp_path, path)
+    return seed_seq.entropy
+
 
 # -----------------------------
-# EXPORT TO CSV
+# EXPORT
 # -----------------------------
-df = pd.DataFrame(data)
-df.to_csv('enhanced_car_dataset.csv', index=False)
-
-print(f"✅ Successfully generated 'enhanced_car_dataset_with_floor.csv' with {len(df)} rows and {df.shape[1]} columns.")
\ No newline at end of file
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate the synthetic used-car dataset.')
+    parser.add_argument('--rows', type=int, default=N_ROWS, help='number of listings to generate')
+    parser.add_argument('--seed', type=int, default=None, help='RNG seed (random if omitted)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows generated/written per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (independent RNG streams)')
+    parser.add_argument('--output', default=OUTPUT_FILE,
+                        help='.csv, or .feather/.arrow/.parquet for typed columnar storage (default %(default)s)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    entropy = generate_dataset(args.output, args.rows, args.seed, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ Successfully generated '{args.output}' with {args.rows} rows and {len(COLUMNS)} columns "
+          f"in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/sec, seed {entropy}).")
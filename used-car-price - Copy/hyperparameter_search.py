@@ -0,0 +1,282 @@
+"""
+Hyperparameter search for the XGBoost trainer, scored by k-fold cross-validation.
+
+run_search() tunes the parameters below on the training split:
+  - grid:    every combination in GRID
+  - random:  n_trials draws from SEARCH_SPACE
+  - halving: successive halving: n_trials random draws start on a small
+             boosting-round budget, the best 1/eta of each rung go on with eta
+             times the rounds, up to max_rounds
+A trial's score is its mean validation MAE over the same k folds, with early
+stopping inside each fold. The trainer's current parameters are always
+trial 0 of random and halving searches, so a search can only improve on them.
+
+Trials run in a process pool (jobs processes x trial_threads XGBoost threads
+each). The encoded matrix is written once to
+<search_dir>/<data fingerprint>/ as .npy files that the workers memory-map,
+so no worker re-reads or re-encodes the CSV; each worker builds the k fold
+matrices once and reuses them for every trial it runs. Finished trials are
+appended to trials.jsonl in the same directory, and draws are seeded, so an
+interrupted search picks up where it stopped when run again on the same data.
+"""
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+STRATEGIES = ('grid', 'random', 'halving')
+
+# Fixed for every trial; the trainer's early stopping and seed
+BASE_PARAMS = {'objective': 'reg:squarederror', 'tree_method': 'hist', 'max_bin': 256, 'seed': 42}
+EARLY_STOPPING_ROUNDS = 50
+
+GRID = {
+    'learning_rate': [0.03, 0.05, 0.1],
+    'max_depth': [4, 5, 6],
+    'subsample': [0.8, 1.0],
+    'colsample_bytree': [0.8, 1.0],
+}
+# name: (distribution, low, high)
+SEARCH_SPACE = {
+    'learning_rate': ('log', 0.01, 0.3),
+    'max_depth': ('int', 3, 8),
+    'subsample': ('uniform', 0.5, 1.0),
+    'colsample_bytree': ('uniform', 0.5, 1.0),
+    'min_child_weight': ('log', 0.5, 20.0),
+    'reg_lambda': ('log', 0.1, 10.0),
+}
+
+
+# --- Candidates ---
+def _draw(rng):
+    params = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            params[name] = float(f'{math.exp(rng.uniform(math.log(low), math.log(high))):.3g}')
+        else:
+            params[name] = float(f'{rng.uniform(low, high):.3g}')
+    return params
+
+
+def _candidates(strategy, n_trials, baseline, seed):
+    if strategy == 'grid':
+        return [dict(zip(GRID, values)) for values in itertools.product(*GRID.values())]
+    rng = np.random.default_rng(seed)
+    candidates = [dict(baseline)] if baseline else []
+    while len(candidates) < n_trials:
+        params = _draw(rng)
+        if params not in candidates:
+            candidates.append(params)
+    return candidates
+
+
+# --- Shared data ---
+def _prepare_data(X, y, n_folds, seed, search_dir):
+    """Writes X, y and the fold assignment once; returns the directory the workers map them from."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    digest = hashlib.sha256(X.tobytes())
+    digest.update(y.tobytes())
+    digest.update(f'{X.shape}:{n_folds}:{seed}'.encode())
+    data_dir = os.path.join(search_dir, digest.hexdigest()[:12])
+    os.makedirs(data_dir, exist_ok=True)
+
+    fold = np.empty(len(y), dtype=np.int8)
+    fold[np.random.default_rng(seed).permutation(len(y))] = np.arange(len(y)) % n_folds
+    for name, array in (('X', X), ('y', y), ('fold', fold)):
+        path = os.path.join(data_dir, f'{name}.npy')
+        if not os.path.exists(path):
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+    return data_dir
+
+
+# --- Trials (run in the pool's worker processes) ---
+_worker = {}
+
+
+def _init_worker(data_dir, nthread):
+    _worker.update(
+        X=np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r'),
+        y=np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r'),
+        fold=np.load(os.path.join(data_dir, 'fold.npy')),
+        nthread=nthread,
+        matrices={},
+    )
+
+
+def _fold_matrices(k):
+    """(train, validation, validation labels) for fold k, quantized once per worker."""
+    if k not in _worker['matrices']:
+        import xgboost as xgb
+
+        valid = _worker['fold'] == k
+        X, y = _worker['X'], _worker['y']
+        dtrain = xgb.QuantileDMatrix(X[~valid], label=y[~valid], max_bin=BASE_PARAMS['max_bin'],
+                                     nthread=_worker['nthread'])
+        dvalid = xgb.QuantileDMatrix(X[valid], label=y[valid], ref=dtrain, nthread=_worker['nthread'])
+        _worker['matrices'][k] = (dtrain, dvalid, np.asarray(y[valid]))
+    return _worker['matrices'][k]
+
+
+def _run_trial(trial):
+    import xgboost as xgb
+
+    started = time.perf_counter()
+    params = dict(BASE_PARAMS, **trial['params'], nthread=_worker['nthread'])
+    fold_mae, best_rounds = [], []
+    for k in range(int(_worker['fold'].max()) + 1):
+        dtrain, dvalid, y_valid = _fold_matrices(k)
+        booster = xgb.train(params, dtrain, num_boost_round=trial['rounds'], evals=[(dvalid, 'valid')],
+                            early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False)
+        predicted = booster.predict(dvalid, iteration_range=(0, booster.best_iteration + 1))
+        fold_mae.append(round(float(np.mean(np.abs(predicted.astype(np.float64) - y_valid))), 6))
+        best_rounds.append(booster.best_iteration + 1)
+    return {
+        **trial,
+        'mae': round(statistics.mean(fold_mae), 6),
+        'mae_std': round(statistics.pstdev(fold_mae), 6),
+        'fold_mae': fold_mae,
+        'best_rounds': int(statistics.median(best_rounds)),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+# --- Trial log ---
+class TrialLog:
+    """Append-only JSONL of finished trials, keyed by (params, rounds)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted run
+                    self.records[self.key(record)] = record
+
+    @staticmethod
+    def key(trial):
+        return json.dumps({'params': trial['params'], 'rounds': trial['rounds']}, sort_keys=True)
+
+    def get(self, trial):
+        return self.records.get(self.key(trial))
+
+    def append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.records[self.key(record)] = record
+
+
+def _describe(params):
+    return ' '.join(f'{name}={value}' for name, value in params.items())
+
+
+def _evaluate(trials, log, pool, counter):
+    """Runs the trials not already in the log; returns every trial's record, in order."""
+    pending = [t for t in trials if log.get(t) is None]
+    if len(pending) < len(trials):
+        counter[0] += len(trials) - len(pending)
+        print(f"   ↩️  {len(trials) - len(pending)} of {len(trials)} trials already in '{log.path}', skipping them")
+
+    def finished(record):
+        log.append(record)
+        counter[0] += 1
+        print(f"   [{counter[0]:>3}/{counter[1]}] MAE {record['mae']:.4f} ± {record['mae_std']:.4f}  "
+              f"{record['best_rounds']:>4}/{record['rounds']} rounds  {record['seconds']:>5.1f}s  "
+              f"{_describe(record['params'])}")
+
+    if pool is None:
+        for trial in pending:
+            finished(_run_trial(trial))
+    else:
+        futures = [pool.submit(_run_trial, trial) for trial in pending]
+        for future in as_completed(futures):
+            finished(future.result())
+    return [log.get(t) for t in trials]
+
+
+def _halving_rungs(n_candidates, max_rounds, eta):
+    """(rounds, survivors) per rung: n_candidates at the smallest budget, one at max_rounds."""
+    n_rungs = int(math.log(max(n_candidates, 1), eta) + 1e-9) + 1
+    return [(max(1, int(max_rounds / eta ** (n_rungs - 1 - i))), max(1, n_candidates // eta ** i))
+            for i in range(n_rungs)]
+
+
+def run_search(X, y, strategy='random', n_trials=20, n_folds=5, jobs=None, trial_threads=None,
+               search_dir='hp_search', max_rounds=1000, eta=3, baseline=None, seed=42):
+    """
+    Returns (best, records): the record with the lowest mean CV MAE (among the
+    full-budget trials for halving), and every record of this search.
+    A record is {'params', 'rounds', 'mae', 'mae_std', 'fold_mae', 'best_rounds', 'seconds'}.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{strategy}' (expected one of {', '.join(STRATEGIES)}).")
+    cpus = os.cpu_count() or 1
+    jobs = max(1, jobs or cpus)
+    trial_threads = max(1, trial_threads or cpus // jobs)
+
+    data_dir = _prepare_data(X, y, n_folds, seed, search_dir)
+    log = TrialLog(os.path.join(data_dir, 'trials.jsonl'))
+    candidates = _candidates(strategy, n_trials, baseline, seed)
+    if strategy == 'halving':
+        rungs = _halving_rungs(len(candidates), max_rounds, eta)
+    else:
+        rungs = [(max_rounds, len(candidates))]
+    print(f"   - {strategy}: {len(candidates)} candidates, {n_folds}-fold CV, "
+          f"{sum(n for _, n in rungs)} trials, {jobs} process(es) x {trial_threads} thread(s)")
+
+    pool = None
+    if jobs > 1:
+        # spawn: the parent may already have started XGBoost's OpenMP threads, which fork does not survive
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(data_dir, trial_threads))
+    else:
+        _init_worker(data_dir, trial_threads)
+    counter = [0, sum(n for _, n in rungs)]  # finished, total
+    records = []
+    try:
+        survivors = candidates
+        for rung, (rounds, n_keep) in enumerate(rungs):
+            if len(rungs) > 1:
+                print(f"   - rung {rung + 1}/{len(rungs)}: {n_keep} candidate(s) x {rounds} rounds")
+            results = _evaluate([{'params': p, 'rounds': rounds} for p in survivors[:n_keep]], log, pool, counter)
+            records += results
+            results.sort(key=lambda r: r['mae'])
+            survivors = [r['params'] for r in results]
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Search interrupted: {len(log.records)} finished trial(s) are kept in '{log.path}'; "
+              f"run the same command again to resume.")
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        _worker.clear()
+
+    return results[0], records
+
+
+def print_leaderboard(records, best, top=5):
+    final_rounds = best['rounds']
+    ranked = sorted((r for r in records if r['rounds'] == final_rounds), key=lambda r: r['mae'])
+    print(f"\n🏁 Top {min(top, len(ranked))} of {len(ranked)} trials at {final_rounds} rounds (mean CV MAE):")
+    for record in ranked[:top]:
+        marker = '→' if record is best else ' '
+        print(f" {marker} {record['mae']:.4f} ± {record['mae_std']:.4f}  {record['best_rounds']:>4} rounds  "
+              f"{_describe(record['params'])}")
@@ -0,0 +1,208 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+_STOP = object()
+
+
+class SchedulerClosed(RuntimeError):
+    """Raised for rows submitted to (or still queued in) a scheduler that has been closed."""
+
+
+class InferenceScheduler:
+    """
+    Coalesces concurrent single-row predictions into one batched predict call.
+
+    Request threads call predict(vector) and block on a Future. One background
+    thread drains the queue and flushes a batch as soon as either max_batch_size
+    rows are waiting or the oldest row has waited max_wait_ms. A row with
+    nothing queued behind it is flushed at once: at low load there is nothing
+    to coalesce, and rows arriving while it is predicted are batched next.
+    predict_fn receives
+    a 2-D matrix plus the context the rows were submitted with (e.g. the model
+    bundle they were encoded against) and must return one raw prediction per row.
+    Rows with different contexts in one flush are predicted in separate calls.
+    Once closed (or if the worker dies) submit() raises SchedulerClosed and
+    every row still queued fails with it, so no caller waits forever.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0, name='inference-scheduler'):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be >= 1')
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._closed_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    # --- Public API ---
+    def submit(self, vector, context=None):
+        """Queues one feature vector and returns a Future for its raw prediction."""
+        future = Future()
+        with self._closed_lock:
+            if self._closed:
+                raise SchedulerClosed('inference scheduler is closed')
+            self._queue.put((vector, time.perf_counter(), future, context))
+        return future
+
+    def predict(self, vector, context=None, timeout=None):
+        """Blocks for the row's raw prediction; on timeout the row is dropped from its batch if not yet picked up."""
+        future = self.submit(vector, context)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self, timeout=1.0):
+        """Stops the worker after the rows already queued; those it can't reach within timeout fail."""
+        with self._closed_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._fail_pending()
+
+    def stats(self):
+        """Snapshot of batch size distribution and queue wait times (milliseconds)."""
+        with self._stats_lock:
+            waits = np.array(self._recent_waits) * 1000.0 if self._recent_waits else np.zeros(1)
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'batches': self._batches,
+                'rows': self._rows,
+                'errors': self._errors,
+                'mean_batch_size': round(self._rows / self._batches, 3) if self._batches else 0.0,
+                'batch_size_histogram': {f'<={k}': v for k, v in self._size_buckets.items()},
+                'queue_wait_ms': {
+                    'p50': round(float(np.percentile(waits, 50)), 4),
+                    'p99': round(float(np.percentile(waits, 99)), 4),
+                    'max': round(self._max_wait_seen * 1000.0, 4),
+                    'mean': round(self._wait_total * 1000.0 / self._rows, 4) if self._rows else 0.0,
+                },
+                'predict_ms_total': round(self._predict_total * 1000.0, 3),
+                'queue_depth': self._queue.qsize(),
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_stats()
+
+    # --- Worker ---
+    def _reset_stats(self):
+        self._batches = 0
+        self._rows = 0
+        self._errors = 0
+        self._wait_total = 0.0
+        self._max_wait_seen = 0.0
+        self._predict_total = 0.0
+        self._recent_waits = deque(maxlen=4096)
+        # Power-of-two buckets up to max_batch_size
+        bounds, k = [], 1
+        while k < self.max_batch_size:
+            bounds.append(k)
+            k *= 2
+        bounds.append(self.max_batch_size)
+        self._size_buckets = {b: 0 for b in bounds}
+
+    def _fail_pending(self):
+        """Fails every queued row with SchedulerClosed (the scheduler is closed or its worker is gone)."""
+        with self._closed_lock:
+            self._closed = True
+        stop = False
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+            elif item[2].set_running_or_notify_cancel():
+                item[2].set_exception(SchedulerClosed('inference scheduler closed before the row was predicted'))
+        if stop and self._thread.is_alive():
+            self._queue.put(_STOP)  # still busy with a batch: let it exit afterwards
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            self._fail_pending()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            # Nothing else queued: waiting would only add latency to a lone request
+            deadline = item[1] + self.max_wait if not self._queue.empty() else 0.0
+            stop = False
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        # Rows whose caller timed out (future cancelled) are dropped
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[3]), []).append(item)
+
+        for group in groups.values():
+            try:
+                predictions = self.predict_fn(np.vstack([item[0] for item in group]), group[0][3])
+            except Exception as e:
+                with self._stats_lock:
+                    self._errors += 1
+                for item in group:
+                    item[2].set_exception(e)
+                continue
+            for item, prediction in zip(group, predictions):
+                item[2].set_result(prediction)
+        finished = time.perf_counter()
+
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._predict_total += finished - started
+            for bound in self._size_buckets:
+                if len(batch) <= bound:
+                    self._size_buckets[bound] += 1
+                    break
+            for item in batch:
+                wait = started - item[1]
+                self._wait_total += wait
+                self._recent_waits.append(wait)
+                if wait > self._max_wait_seen:
+                    self._max_wait_seen = wait
@@ -0,0 +1,219 @@
+"""
+Durable outbound mail queue.
+
+Requests call enqueue() (one local SQLite insert) and return immediately. A
+background sender drains due messages in batches over a single SMTP
+connection and retries failures with exponential backoff. Messages survive
+restarts; delivery is at-least-once (a crash between the SMTP send and the
+'sent' update resends that message).
+
+Batches are claimed with a short lease inside an IMMEDIATE transaction, so
+several worker processes can share one outbox file without double-sending.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    claimed_until REAL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+'''
+
+
+class MailOutbox:
+    """
+    `connect` is a zero-argument callable returning a context manager whose
+    value has send(message_dict); message_dict has subject, sender,
+    recipients and body. It is opened once per drain, not once per message.
+    """
+
+    def __init__(self, path, connect, batch_size=50, max_attempts=8,
+                 backoff_base=5.0, backoff_max=900.0, lease_seconds=120.0, poll_interval=5.0):
+        self.path = path
+        self.connect = connect
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.sent = 0
+        self.failed_attempts = 0
+        self.connections = 0
+        self.last_error = None
+
+        # Throwaway connection: a process that forks workers after this must not hand them an open one
+        conn = sqlite3.connect(self.path, timeout=15)
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    # --- Producer side ---
+    def enqueue(self, subject, sender, recipients, body):
+        now = time.time()
+        with self._db() as conn:
+            cursor = conn.execute(
+                'INSERT INTO outbox (subject, sender, recipients, body, created_at, next_attempt_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)', (subject, sender, json.dumps(list(recipients)), body, now, now))
+        self._wake.set()
+        return cursor.lastrowid
+
+    def status(self):
+        with self._db() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
+        return {
+            'pending': counts.get('pending', 0),
+            'sent_total': counts.get('sent', 0),
+            'dead': counts.get('dead', 0),
+            'sent_by_this_process': self.sent,
+            'failed_attempts': self.failed_attempts,
+            'smtp_connections': self.connections,
+            'last_error': self.last_error,
+            'running': self._thread is not None and self._thread.is_alive(),
+        }
+
+    # --- Sender side ---
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='mail-outbox', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def drain(self):
+        """Sends every due message; one SMTP connection for the whole drain. Returns messages sent."""
+        unsent = self._claim_batch()  # claimed by us, neither sent nor handed back yet
+        if not unsent:
+            return 0
+        sent = 0
+        try:
+            with self.connect() as smtp:
+                self.connections += 1
+                while unsent:
+                    row = unsent.pop(0)
+                    try:
+                        self._send_one(smtp, row)
+                    except Exception as e:
+                        # The connection is suspect now: hand the rest back and reconnect on the next drain
+                        self._record_failure([row], e)
+                        self._release(unsent)
+                        unsent = []
+                        break
+                    sent += 1
+                    if not unsent:
+                        unsent = self._claim_batch()
+        except Exception as e:
+            if unsent:
+                self._record_failure(unsent, e)
+            else:
+                self.last_error = f"{type(e).__name__}: {e}"
+        return sent
+
+    # --- Internals ---
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=15, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"--- Mail outbox error: {self.last_error} ---")
+            self._wake.wait(self._next_wait())
+            self._wake.clear()
+
+    def _next_wait(self):
+        with self._db() as conn:
+            row = conn.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()
+        if row[0] is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.05, row[0] - time.time()))
+
+    def _claim_batch(self):
+        now = time.time()
+        with self._db() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT id, subject, sender, recipients, body, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? AND (claimed_until IS NULL OR claimed_until < ?) "
+                "ORDER BY id LIMIT ?", (now, now, self.batch_size)).fetchall()
+            if rows:
+                conn.executemany('UPDATE outbox SET claimed_until = ? WHERE id = ?',
+                                 [(now + self.lease_seconds, row[0]) for row in rows])
+        return rows
+
+    def _send_one(self, smtp, row):
+        msg_id, subject, sender, recipients, body, attempts = row
+        smtp.send({'subject': subject, 'sender': sender, 'recipients': json.loads(recipients), 'body': body})
+        with self._db() as conn:
+            conn.execute("UPDATE outbox SET status = 'sent', sent_at = ?, attempts = ?, claimed_until = NULL, "
+                         "last_error = NULL WHERE id = ?", (time.time(), attempts + 1, msg_id))
+        self.sent += 1
+
+    def _release(self, rows):
+        if rows:
+            with self._db() as conn:
+                conn.executemany('UPDATE outbox SET claimed_until = NULL WHERE id = ?', [(row[0],) for row in rows])
+
+    def _record_failure(self, rows, error):
+        self.last_error = f"{type(error).__name__}: {error}"
+        self.failed_attempts += len(rows)
+        now = time.time()
+        updates = []
+        for row in rows:
+            attempts = row[5] + 1
+            status = 'dead' if attempts >= self.max_attempts else 'pending'
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+            updates.append((status, attempts, now + delay, self.last_error, row[0]))
+        with self._db() as conn:
+            conn.executemany('UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, '
+                             'claimed_until = NULL, last_error = ? WHERE id = ?', updates)
+        print(f"--- Mail delivery failed for {len(rows)} message(s), will retry: {self.last_error} ---")
+
+
+class _Transaction:
+    """`with` block that commits (or rolls back) an autocommit-mode sqlite3 connection's open transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.conn.in_transaction:
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
@@ -0,0 +1,367 @@
+"""
+Precomputed market analytics for the /analysis page.
+
+One vectorized pass over the dataset accumulates, per group, the row count
+and the sums of selling price, squared selling price and showroom price.
+Those four numbers are all the page needs (mean, spread, value retention)
+and they simply add up, so rows appended to the CSV later are folded in by
+reading only the new bytes. A columnar dataset (dataset_store.py) is never
+appended to in place, so it is re-aggregated whenever the file changes, reading
+only the columns used here from the memory-mapped file.
+
+The aggregates are kept in a small JSON cache next to the dataset, so the
+server never parses the CSV at boot and never imports pandas (pyarrow is
+used when it is installed, the csv module otherwise).
+
+    python market_analytics.py [--dataset enhanced_car_dataset.feather] [--cache analytics_cache.json] [--rebuild]
+"""
+import argparse
+import csv
+import datetime as dt
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+import dataset_store
+
+DATASET_PATH = 'enhanced_car_dataset.csv'
+CACHE_PATH = 'analytics_cache.json'
+CACHE_VERSION = 1
+
+PRICE_COL = 'Selling_Price(Lakhs)'
+PRESENT_COL = 'Present_Price(Lakhs)'
+
+# Output section -> dataset column it groups by
+DIMENSIONS = {
+    'by_age': 'Car_Age',
+    'by_brand': 'Brand',
+    'by_model': 'Car_Name',
+    'by_fuel': 'Fuel_Type',
+    'by_city': 'City',
+    'by_condition': 'Condition',
+    'by_seller': 'Seller_Type',
+}
+NUMERIC_DIMENSIONS = {'Car_Age'}
+
+# Bytes re-hashed at the end of the consumed region to detect a rewritten (not appended) file
+_FINGERPRINT_BYTES = 4096
+
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    """Serialized analytics ready to serve; swapped atomically on refresh."""
+    body: bytes
+    etag: str
+    last_modified: float
+    rows: int
+
+
+# -----------------------------
+# READING
+# -----------------------------
+def _read_columns(data, columns):
+    """Parses CSV bytes (header included) into {column: numpy array}, reading only `columns`."""
+    # Imported lazily: the server restores the cache at boot and only parses CSV in the background
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        pa = None
+
+    if pa is not None:
+        table = pa_csv.read_csv(pa.BufferReader(data),
+                                convert_options=pa_csv.ConvertOptions(include_columns=columns))
+        return {col: table.column(col).to_numpy() for col in columns}
+
+    reader = csv.DictReader(io.StringIO(data.decode('utf-8')))
+    rows = [[row[col] for col in columns] for row in reader]
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    return {col: np.asarray(vals) for col, vals in zip(columns, values)}
+
+
+def _fingerprint(f, offset):
+    f.seek(max(0, offset - _FINGERPRINT_BYTES))
+    return hashlib.sha1(f.read(min(offset, _FINGERPRINT_BYTES))).hexdigest()
+
+
+# -----------------------------
+# ENGINE
+# -----------------------------
+class MarketAnalytics:
+    """
+    Additive per-group aggregates over the listings dataset. refresh() folds in
+    rows appended since the last pass (or rebuilds if the file was replaced);
+    snapshot() returns the current JSON payload with an ETag.
+    """
+
+    def __init__(self, dataset_path=DATASET_PATH, cache_path=CACHE_PATH):
+        self.dataset_path = dataset_path
+        self.cache_path = cache_path
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = None
+        self._last_refresh_started = float('-inf')
+        self.last_error = None
+        self._reset()
+
+    # --- Access ---
+    def snapshot(self):
+        return self._snapshot
+
+    def status(self):
+        return {'dataset': self.dataset_path, 'rows': self._rows, 'offset': self._offset,
+                'refreshing': self._lock.locked(), 'last_error': self.last_error}
+
+    # --- Loading / Refreshing ---
+    def load_cache(self):
+        """Restores aggregates from the JSON cache. Returns False if there is no usable cache."""
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if cached.get('cache_version') != CACHE_VERSION:
+            return False
+        self._groups = {dim: {key: list(vals) for key, vals in groups.items()}
+                        for dim, groups in cached['groups'].items()}
+        self._rows = cached['rows']
+        self._offset = cached['offset']
+        self._header = cached['header'].encode('utf-8')
+        self._source = cached['source']
+        self._fingerprint = cached['fingerprint']
+        self._updated_at = cached['updated_at']
+        self._publish()
+        return True
+
+    def refresh(self, rebuild=False):
+        """
+        Brings the aggregates up to date with the dataset. Appended rows are read
+        from the last byte offset; a replaced or truncated file triggers a full
+        rebuild. Returns the number of rows added.
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.dataset_path)
+            except OSError as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return 0
+            source = [st.st_dev, st.st_ino]
+            if dataset_store.is_columnar(self.dataset_path):
+                return self._refresh_columnar(st, source, rebuild)
+
+            with open(self.dataset_path, 'rb') as f:
+                if rebuild or not self._still_valid(f, source, st.st_size):
+                    self._reset()
+                    f.seek(0)
+                    self._header = f.readline()
+                    self._offset = f.tell()
+                if st.st_size <= self._offset:
+                    if self._snapshot is None:
+                        self._publish()
+                    return 0
+                f.seek(self._offset)
+                data = f.read(st.st_size - self._offset)
+
+                # Only consume complete lines; a row still being written is picked up next time
+                end = data.rfind(b'\n') + 1
+                if end == 0:
+                    return 0
+                added = self._accumulate(self._header + data[:end])
+                self._offset += end
+                self._source = source
+                self._fingerprint = _fingerprint(f, self._offset)
+
+            self._updated_at = st.st_mtime
+            self.last_error = None
+            self._publish()
+            self._save_cache()
+            return added
+
+    def refresh_async(self, min_interval=30.0):
+        """
+        Starts a background refresh unless one ran in the last min_interval
+        seconds or stop() was called. The thread is not a daemon: pyarrow must
+        not be mid-read when the interpreter tears down.
+        """
+        now = time.monotonic()
+        if self._stop.is_set() or self._lock.locked() or now - self._last_refresh_started < min_interval:
+            return False
+        self._last_refresh_started = now
+        self._thread = threading.Thread(target=self._refresh_quietly, name='analytics-refresh')
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=5.0):
+        """Refuses further background refreshes and waits for the running one."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # --- Internals ---
+    def _reset(self):
+        self._groups = {dim: {} for dim in DIMENSIONS}
+        self._rows = 0
+        self._offset = 0
+        self._header = b''
+        self._source = None
+        self._fingerprint = None
+        self._updated_at = None
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"--- Analytics refresh failed: {self.last_error} ---")
+
+    def _still_valid(self, f, source, size):
+        """True if the file is the one we aggregated, with our consumed bytes untouched."""
+        if self._source != source or self._offset == 0 or size < self._offset:
+            return False
+        f.seek(0)
+        if f.readline() != self._header:
+            return False
+        return _fingerprint(f, self._offset) == self._fingerprint
+
+    def _refresh_columnar(self, st, source, rebuild):
+        """Columnar files are rewritten, never appended to: aggregate the whole file whenever it changes."""
+        fingerprint = f'{st.st_size}:{st.st_mtime_ns}'
+        if not rebuild and self._source == source and self._fingerprint == fingerprint:
+            if self._snapshot is None:
+                self._publish()
+            return 0
+        self._reset()
+        header = dataset_store.column_names(self.dataset_path)
+        added = self._fold(header, lambda wanted: dataset_store.read_columns(self.dataset_path, wanted, encoded=True))
+        self._header = ','.join(header).encode('utf-8')
+        self._offset = st.st_size
+        self._source = source
+        self._fingerprint = fingerprint
+        self._updated_at = st.st_mtime
+        self.last_error = None
+        self._publish()
+        self._save_cache()
+        return added
+
+    def _accumulate(self, data):
+        header = self._header.decode('utf-8-sig').strip().split(',')
+        return self._fold(header, lambda wanted: _read_columns(data, wanted))
+
+    def _fold(self, header, read_columns):
+        """Adds the rows returned by read_columns(wanted columns) to the per-group sums."""
+        wanted = [PRICE_COL, PRESENT_COL] + [col for col in DIMENSIONS.values() if col in header]
+        derive_age = 'Car_Age' not in header and 'Year' in header
+        if derive_age:
+            wanted.append('Year')
+        columns = read_columns(wanted)
+
+        price = np.asarray(columns[PRICE_COL], dtype=np.float64)
+        present = np.asarray(columns[PRESENT_COL], dtype=np.float64)
+        if derive_age:
+            columns['Car_Age'] = dt.datetime.now().year - np.asarray(columns['Year'], dtype=np.int64)
+
+        for dim, col in DIMENSIONS.items():
+            if col not in columns:
+                continue
+            keys = columns[col]
+            if isinstance(keys, tuple):
+                # Dictionary-encoded column: the codes already are the group index (-1 = missing, dropped)
+                inverse, labels = keys
+                uniq = np.asarray(labels + [''], dtype=object)
+                inverse = np.where(inverse < 0, len(labels), inverse).astype(np.intp)
+            else:
+                keys = np.asarray(keys, dtype=np.int64) if col in NUMERIC_DIMENSIONS else np.asarray(keys, dtype=str)
+                uniq, inverse = np.unique(keys, return_inverse=True)
+            sums = np.stack([
+                np.bincount(inverse, minlength=len(uniq)).astype(np.float64),
+                np.bincount(inverse, weights=price, minlength=len(uniq)),
+                np.bincount(inverse, weights=price * price, minlength=len(uniq)),
+                np.bincount(inverse, weights=present, minlength=len(uniq)),
+            ], axis=1)
+            groups = self._groups[dim]
+            for key, row in zip(uniq.tolist(), sums.tolist()):
+                if not row[0]:
+                    continue  # a label with no rows, or the missing-label slot
+                acc = groups.setdefault(str(key), [0.0, 0.0, 0.0, 0.0])
+                for i, value in enumerate(row):
+                    acc[i] += value
+
+        self._rows += len(price)
+        return len(price)
+
+    def _payload(self):
+        sections = {}
+        for dim, groups in self._groups.items():
+            numeric = DIMENSIONS[dim] in NUMERIC_DIMENSIONS
+            entries = []
+            for key, (count, total, total_sq, present) in groups.items():
+                mean = total / count
+                entries.append({
+                    'key': int(key) if numeric else key,
+                    'count': int(count),
+                    'mean_price': round(mean, 4),
+                    'std_price': round(float(np.sqrt(max(0.0, total_sq / count - mean * mean))), 4),
+                    'mean_present_price': round(present / count, 4),
+                    'retention': round(total / present, 4) if present else None,
+                    'share': round(count / self._rows, 6) if self._rows else 0.0,
+                })
+            entries.sort(key=(lambda e: e['key']) if numeric else (lambda e: -e['count']))
+            sections[dim] = entries
+        return {
+            'rows': self._rows,
+            'updated_at': dt.datetime.fromtimestamp(self._updated_at).isoformat(timespec='seconds')
+                          if self._updated_at else None,
+            **sections,
+        }
+
+    def _publish(self):
+        body = json.dumps(self._payload(), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        self._snapshot = AnalyticsSnapshot(body=body, etag=hashlib.sha1(body).hexdigest()[:16],
+                                           last_modified=self._updated_at or time.time(), rows=self._rows)
+
+    def _save_cache(self):
+        cached = {
+            'cache_version': CACHE_VERSION,
+            'rows': self._rows,
+            'offset': self._offset,
+            'header': self._header.decode('utf-8'),
+            'source': self._source,
+            'fingerprint': self._fingerprint,
+            'updated_at': self._updated_at,
+            'groups': self._groups,
+        }
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'  # workers may write at the same time
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cached, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"--- Could not write analytics cache '{self.cache_path}': {e} ---")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=dataset_store.find_dataset())
+    parser.add_argument('--cache', default=CACHE_PATH)
+    parser.add_argument('--rebuild', action='store_true', help='ignore the cache and aggregate from scratch')
+    args = parser.parse_args()
+
+    analytics = MarketAnalytics(args.dataset, args.cache)
+    if not args.rebuild:
+        analytics.load_cache()
+    started = time.perf_counter()
+    added = analytics.refresh(rebuild=args.rebuild)
+    if analytics.last_error:
+        print(f"❌ {analytics.last_error}")
+    else:
+        print(f"✅ Analytics over {analytics.snapshot().rows:,} rows ({added:,} new) "
+              f"in {time.perf_counter() - started:.2f}s -> '{args.cache}'")
@@ -0,0 +1,258 @@
+"""
+Versioned model artifact: a directory holding the booster in XGBoost's native
+UBJSON format plus a small JSON manifest (schema version, column order,
+category vocabularies, content hash). Loading it needs neither pickle nor
+sklearn.
+
+    car_model/
+        manifest.json
+        booster-<hash>.ubj
+
+The manifest is written last with an atomic rename, so a reader (or the
+server's file watcher) never sees a manifest pointing at a half-written booster.
+
+Convert an existing pickle:  python model_artifact.py car_model.pkl car_model
+"""
+import ctypes
+import datetime as dt
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+ARTIFACT_FORMAT = 'used-car-price-model'
+MANIFEST_NAME = 'manifest.json'
+
+
+class BoosterModel:
+    """Thin predict() wrapper around a raw xgboost.Booster (no sklearn estimator needed)."""
+
+    def __init__(self, booster):
+        self.booster = booster
+
+    def predict(self, matrix):
+        return self.booster.inplace_predict(np.asarray(matrix, dtype=np.float64))
+
+    def get_booster(self):
+        return self.booster
+
+
+# -----------------------------
+# LEAN SERVING (libxgboost without the xgboost package)
+# -----------------------------
+# Importing the xgboost package imports sklearn and pandas whenever they are installed
+# (xgboost.compat), which costs a serving worker ~1.5 s and ~100 MB. The booster itself only
+# needs the shared library, so lean loading talks to it directly through its C API.
+_lib = None
+_lib_lock = threading.Lock()
+
+
+def _xgboost_library():
+    """libxgboost, found with the xgboost package's own libpath.py (run standalone: no package import)."""
+    global _lib
+    with _lib_lock:
+        if _lib is None:
+            spec = importlib.util.find_spec('xgboost')
+            if spec is None or not spec.submodule_search_locations:
+                raise ImportError('xgboost is not installed.')
+            libpath_spec = importlib.util.spec_from_file_location(
+                '_xgboost_libpath', os.path.join(spec.submodule_search_locations[0], 'libpath.py'))
+            libpath = importlib.util.module_from_spec(libpath_spec)
+            libpath_spec.loader.exec_module(libpath)
+            lib = ctypes.cdll.LoadLibrary(libpath.find_lib_path()[0])
+            lib.XGBGetLastError.restype = ctypes.c_char_p
+            _lib = lib
+        return _lib
+
+
+class NativeBooster:
+    """
+    predict() on a booster held by libxgboost itself: the same library call as
+    xgboost.Booster.inplace_predict() (so the same float32 outputs), without
+    importing the xgboost package. get_booster() loads a full xgboost.Booster
+    from the same bytes when one is needed (tree compilation, retraining).
+    """
+
+    def __init__(self, booster_bytes):
+        self._lib = _xgboost_library()
+        self._bytes = bytes(booster_bytes)
+        self._booster = None
+        self.handle = ctypes.c_void_p()
+        self._check(self._lib.XGBoosterCreate(None, ctypes.c_uint64(0), ctypes.byref(self.handle)))
+        self._check(self._lib.XGBoosterLoadModelFromBuffer(self.handle, self._bytes, ctypes.c_uint64(len(self._bytes))))
+        features = ctypes.c_uint64()
+        self._check(self._lib.XGBoosterGetNumFeature(self.handle, ctypes.byref(features)))
+        self.n_features = features.value
+        # Same prediction config as inplace_predict() with its defaults
+        self._config = json.dumps({'type': 0, 'training': False, 'iteration_begin': 0, 'iteration_end': 0,
+                                   'missing': float('nan'), 'strict_shape': False, 'cache_id': 0}).encode()
+
+    def __del__(self):
+        if getattr(self, 'handle', None) and self.handle.value:
+            self._lib.XGBoosterFree(self.handle)
+
+    def _check(self, status):
+        if status != 0:
+            raise RuntimeError(f"XGBoost: {self._lib.XGBGetLastError().decode('utf-8', 'replace')}")
+
+    def predict(self, matrix):
+        data = np.ascontiguousarray(matrix, dtype=np.float64)
+        if data.ndim != 2 or data.shape[1] != self.n_features:
+            raise ValueError(f"Feature shape mismatch, expected: {self.n_features}, got {data.shape[-1]}")
+        interface = dict(data.__array_interface__)
+        shape, dims, result = ctypes.POINTER(ctypes.c_uint64)(), ctypes.c_uint64(), ctypes.POINTER(ctypes.c_float)()
+        self._check(self._lib.XGBoosterPredictFromDense(
+            self.handle, json.dumps(interface).encode(), self._config, None,
+            ctypes.byref(shape), ctypes.byref(dims), ctypes.byref(result)))
+        out_shape = tuple(shape[i] for i in range(dims.value))
+        # The buffer belongs to the booster: copy before the next call reuses it
+        return np.ctypeslib.as_array(result, shape=(int(np.prod(out_shape)),)).reshape(out_shape).copy()
+
+    def set_param(self, params):
+        for key, value in params.items():
+            self._check(self._lib.XGBoosterSetParam(self.handle, str(key).encode(), str(value).encode()))
+
+    def num_boosted_rounds(self):
+        rounds = ctypes.c_int()
+        self._check(self._lib.XGBoosterBoostedRounds(self.handle, ctypes.byref(rounds)))
+        return rounds.value
+
+    def get_booster(self):
+        if self._booster is None:
+            import xgboost as xgb
+
+            booster = xgb.Booster()
+            booster.load_model(bytearray(self._bytes))
+            self._booster = booster
+        return self._booster
+
+
+def is_artifact(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+
+def manifest_path(path):
+    return os.path.join(path, MANIFEST_NAME)
+
+
+def _content_hash(booster_bytes, manifest):
+    digest = hashlib.sha256(booster_bytes)
+    fields = {k: v for k, v in manifest.items() if k not in ('content_hash', 'booster_file', 'created_at')}
+    digest.update(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def trimmed_booster(model):
+    """Returns the booster cut at best_iteration, i.e. exactly the trees predict() uses."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None and best_iteration + 1 < booster.num_boosted_rounds():
+        booster = booster[:best_iteration + 1]
+    return booster
+
+
+def save_artifact(path, model, pipeline, metadata=None, catalogue=None):
+    """
+    Writes `model` (XGBRegressor or Booster) and its FeaturePipeline as an
+    artifact directory. `catalogue` is the brand -> car models map the predict
+    page needs, precomputed here so the server never has to read the dataset.
+    """
+    import xgboost as xgb
+
+    booster = trimmed_booster(model)
+    booster_bytes = bytes(booster.save_raw('ubj'))
+
+    spec = pipeline.to_dict()
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'schema_version': SCHEMA_VERSION,
+        'created_at': dt.datetime.now().isoformat(timespec='seconds'),
+        'xgboost_version': xgb.__version__,
+        'num_trees': booster.num_boosted_rounds(),
+        'booster_sha256': hashlib.sha256(booster_bytes).hexdigest(),
+        'columns': spec['columns'],
+        'vocabularies': spec['vocabularies'],
+        'unknown_policy': spec['unknown_policy'],
+        'catalogue': catalogue or {},
+        'metadata': metadata or {},
+    }
+    manifest['content_hash'] = _content_hash(booster_bytes, manifest)
+    manifest['booster_file'] = f"booster-{manifest['content_hash'][:12]}.ubj"
+
+    os.makedirs(path, exist_ok=True)
+    booster_path = os.path.join(path, manifest['booster_file'])
+    with open(booster_path + '.tmp', 'wb') as f:
+        f.write(booster_bytes)
+    os.replace(booster_path + '.tmp', booster_path)
+
+    previous = None
+    if os.path.exists(manifest_path(path)):
+        with open(manifest_path(path), encoding='utf-8') as f:
+            previous = json.load(f).get('booster_file')
+
+    with open(manifest_path(path) + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(manifest_path(path) + '.tmp', manifest_path(path))
+
+    # Keep the previous booster around (an old reader may still be loading it); drop anything older
+    keep = {manifest['booster_file'], previous}
+    for name in os.listdir(path):
+        if name.startswith('booster-') and name.endswith('.ubj') and name not in keep:
+            os.remove(os.path.join(path, name))
+
+    return manifest
+
+
+def load_manifest(path):
+    with open(manifest_path(path), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"'{path}' is not a {ARTIFACT_FORMAT} artifact.")
+    if manifest.get('schema_version') != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported artifact schema version {manifest.get('schema_version')} "
+                         f"(this code reads version {SCHEMA_VERSION}).")
+    return manifest
+
+
+def load_artifact(path, verify=True, lean=False):
+    """
+    Returns (model, manifest): a BoosterModel, or with lean=True a NativeBooster
+    that never imports the xgboost package. Verifies the content hash unless
+    verify=False.
+    """
+    manifest = load_manifest(path)
+    with open(os.path.join(path, manifest['booster_file']), 'rb') as f:
+        booster_bytes = f.read()
+    if verify and _content_hash(booster_bytes, manifest) != manifest['content_hash']:
+        raise ValueError(f"Content hash mismatch for '{path}': artifact is corrupt or was edited.")
+    if lean:
+        return NativeBooster(booster_bytes), manifest
+
+    import xgboost as xgb
+
+    booster = xgb.Booster()
+    booster.load_model(bytearray(booster_bytes))
+    return BoosterModel(booster), manifest
+
+
+def convert_pickle(pickle_path, artifact_path):
+    """One-off conversion of a legacy car_model.pkl into the artifact format."""
+    from model_bundle import load_bundle
+
+    bundle = load_bundle(pickle_path)
+    return save_artifact(artifact_path, bundle.model, bundle.pipeline,
+                         metadata={'converted_from': os.path.basename(pickle_path)},
+                         catalogue=bundle.catalogue)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python model_artifact.py <car_model.pkl> <artifact_dir>")
+        sys.exit(1)
+    manifest = convert_pickle(sys.argv[1], sys.argv[2])
+    print(f"✅ Wrote '{sys.argv[2]}' ({manifest['num_trees']} trees, hash {manifest['content_hash'][:12]})")
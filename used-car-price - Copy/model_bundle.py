@@ -0,0 +1,293 @@
+import csv
+import hashlib
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from feature_pipeline import FeaturePipeline
+from model_artifact import is_artifact, load_artifact, manifest_path
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    Everything a prediction needs, loaded together and never mutated. Requests
+    grab one bundle reference and use it throughout, so a swap can never mix
+    one model's encoders with another model's trees.
+    """
+    model: object
+    pipeline: FeaturePipeline
+    version: str
+    path: str
+    loaded_at: float
+    mappings: dict = field(default_factory=dict)
+    metadata: dict = field(default_factory=dict)
+    catalogue: dict = field(default_factory=dict)
+
+    @property
+    def columns(self):
+        return self.pipeline.columns
+
+    def predict(self, matrix):
+        return self.model.predict(matrix)
+
+
+def catalogue_from_vocabulary(pipeline):
+    """Fallback brand -> models map for artifacts without a catalogue ('Maruti Swift' -> 'Maruti')."""
+    catalogue = {}
+    for car_name in pipeline.vocabularies.get('Car_Name', []):
+        catalogue.setdefault(car_name.split(' ', 1)[0], []).append(car_name)
+    return catalogue
+
+
+# predict() engines: XGBoost itself, the NumPy tree walker (tree_engine.py) for every batch,
+# or the tree walker for small batches only ('auto', up to engine_max_rows rows)
+ENGINES = ('xgboost', 'numpy', 'auto')
+
+
+def load_bundle(path, unknown_policy='zero', lean_imports=False, engine='xgboost', engine_max_rows=32):
+    """
+    Loads an artifact directory (preferred) or a legacy pickle into a ModelBundle.
+    lean_imports keeps sklearn out of the process when loading an artifact.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown model engine '{engine}' (expected one of {', '.join(ENGINES)}).")
+    bundle = _load_bundle(path, unknown_policy, lean_imports)
+    if engine == 'xgboost':
+        return bundle
+    from tree_engine import CompiledModel, compile_model
+
+    # compile_model() refuses trees it can't reproduce exactly, so the version (and cached prices) stay valid
+    return replace(bundle, model=CompiledModel(bundle.model, compile_model(bundle.model),
+                                               max_rows=engine_max_rows if engine == 'auto' else None))
+
+
+def _load_bundle(path, unknown_policy, lean_imports):
+    if is_artifact(path):
+        model, manifest = load_artifact(path, lean=lean_imports)
+        pipeline = FeaturePipeline.from_dict(manifest, unknown_policy)
+        return ModelBundle(model=model, pipeline=pipeline, version=manifest['content_hash'][:12],
+                           path=path, loaded_at=time.time(), metadata=manifest.get('metadata', {}),
+                           catalogue=manifest.get('catalogue') or catalogue_from_vocabulary(pipeline))
+
+    with open(path, 'rb') as f:
+        model_bytes = f.read()
+    # Content hash of the artifact; cached prices and responses are tied to it
+    version = hashlib.sha256(model_bytes).hexdigest()[:12]
+    loaded = pickle.loads(model_bytes)
+
+    if not isinstance(loaded, dict) or 'model' not in loaded:
+        raise ValueError(f"'{path}' is in the old model format (expected a dict with 'model').")
+
+    mappings = loaded.get('mappings', {})
+    columns = loaded.get('columns', [])
+    # Compile the encoders once; older pickles without a pipeline are compiled from their LabelEncoders
+    if loaded.get('pipeline'):
+        pipeline = FeaturePipeline.from_dict(loaded['pipeline'], unknown_policy)
+    else:
+        pipeline = FeaturePipeline.from_encoders(mappings, columns, unknown_policy)
+
+    return ModelBundle(model=loaded['model'], pipeline=pipeline, version=version, path=path,
+                       loaded_at=time.time(), mappings=mappings, metadata=loaded.get('metadata', {}),
+                       catalogue=loaded.get('catalogue') or catalogue_from_vocabulary(pipeline))
+
+
+def set_model_threads(bundle, nthread):
+    """Caps the threads XGBoost uses for this bundle's predictions (None keeps the library default)."""
+    if nthread is None:
+        return
+    model = bundle.model
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = nthread
+    if hasattr(model, 'set_param'):
+        model.set_param({'nthread': nthread})  # NativeBooster / CompiledModel: no xgboost import
+    elif hasattr(model, 'get_booster'):
+        model.get_booster().set_param({'nthread': nthread})
+
+
+def warm_up(bundle, rounds=3):
+    """Runs a few dummy predictions so the first real request doesn't pay for lazy init."""
+    dummy = np.zeros((1, len(bundle.columns)), dtype=np.float64)
+    for _ in range(rounds):
+        bundle.predict(dummy)
+
+
+def read_holdout(path):
+    """Reads the holdout CSV into {column: list of strings} (csv module, so no pandas on the server)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    return {col: [row[col] for row in rows] for col in (rows[0].keys() if rows else [])}
+
+
+def holdout_mae(bundle, holdout):
+    """Mean absolute error of `bundle` on holdout columns of raw rows + 'Selling_Price(Lakhs)'."""
+    n_rows = len(holdout['Selling_Price(Lakhs)'])
+    matrix, valid, _, _ = bundle.pipeline.encode_columns(holdout, n_rows, cast_inputs=False)
+    predictions = np.asarray(bundle.predict(matrix[valid]), dtype=np.float64)
+    if not np.all(np.isfinite(predictions)):
+        raise ValueError('Model produced non-finite predictions on the holdout.')
+    target = np.asarray(holdout['Selling_Price(Lakhs)'], dtype=np.float64)[valid]
+    return float(np.mean(np.abs(predictions - target)))
+
+
+class ModelManager:
+    """
+    Owns the active ModelBundle and replaces it atomically. New artifacts are
+    loaded, warmed up and validated on a background thread; the swap itself is a
+    single reference assignment, so in-flight requests finish on the bundle they
+    started with.
+    """
+
+    def __init__(self, path, unknown_policy='zero', holdout_path=None,
+                 max_holdout_mae=None, max_mae_increase=0.25, lean_imports=False, nthread=None,
+                 engine='xgboost', engine_max_rows=32):
+        self.path = path
+        self.unknown_policy = unknown_policy
+        self.lean_imports = lean_imports
+        self.engine = engine
+        self.engine_max_rows = engine_max_rows
+        self.holdout_path = holdout_path
+        self.max_holdout_mae = max_holdout_mae
+        self.max_mae_increase = max_mae_increase
+        self.nthread = nthread
+
+        self._bundle = None
+        self._reload_lock = threading.Lock()
+        self._watch_thread = None
+        self._stop_watching = threading.Event()
+        self._last_stat = None
+
+        self.reloads = 0
+        self.rejected = 0
+        self.last_error = None
+        self.last_reload_at = None
+
+    # --- Access ---
+    def current(self):
+        return self._bundle
+
+    def status(self):
+        bundle = self._bundle
+        return {
+            'model_version': bundle.version if bundle else None,
+            'model_path': self.path,
+            'engine': self.engine,
+            'loaded_at': bundle.loaded_at if bundle else None,
+            'reloads': self.reloads,
+            'rejected': self.rejected,
+            'last_error': self.last_error,
+            'last_reload_at': self.last_reload_at,
+            'reloading': self._reload_lock.locked(),
+            'watching': self._watch_thread is not None and self._watch_thread.is_alive(),
+        }
+
+    # --- Loading ---
+    def load_initial(self):
+        """Synchronous first load at startup (no validation gate: there is nothing to fall back to)."""
+        bundle = load_bundle(self.path, self.unknown_policy, self.lean_imports, self.engine, self.engine_max_rows)
+        set_model_threads(bundle, self.nthread)
+        warm_up(bundle)
+        self._last_stat = self._stat()
+        self._bundle = bundle
+        return bundle
+
+    def reload(self):
+        """
+        Loads, warms and validates the artifact at self.path, then swaps it in.
+        Returns the new bundle, or None if it was unchanged or rejected.
+        """
+        with self._reload_lock:
+            stat = self._stat()
+            try:
+                candidate = load_bundle(self.path, self.unknown_policy, self.lean_imports, self.engine, self.engine_max_rows)
+                current = self._bundle
+                if current is not None and candidate.version == current.version:
+                    self._last_stat = stat
+                    return None
+                set_model_threads(candidate, self.nthread)
+                warm_up(candidate)
+                self._validate(candidate, current)
+            except Exception as e:
+                self.rejected += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._last_stat = stat
+                print(f"--- Model reload rejected: {self.last_error} ---")
+                return None
+
+            self._bundle = candidate
+            self._last_stat = stat
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload_at = time.time()
+            print(f"--- Model reloaded: version {candidate.version} ---")
+            return candidate
+
+    def reload_async(self):
+        """Starts a background reload; returns False if one is already running."""
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, name='model-reload', daemon=True).start()
+        return True
+
+    def set_nthread(self, nthread):
+        """Pins XGBoost's thread count for the active bundle and every later reload."""
+        self.nthread = nthread
+        if self._bundle is not None:
+            set_model_threads(self._bundle, nthread)
+
+    # --- File Watching ---
+    def watch(self, interval=5.0):
+        """Polls the artifact's mtime/size and reloads when it changes and has settled."""
+        if self._watch_thread is not None or interval <= 0:
+            return
+
+        def _loop():
+            pending = None
+            while not self._stop_watching.wait(interval):
+                stat = self._stat()
+                if stat is None or stat == self._last_stat:
+                    pending = None
+                    continue
+                # Require the same new stat on two polls so we never load a half-written file
+                if stat == pending:
+                    self.reload()
+                    pending = None
+                else:
+                    pending = stat
+
+        self._watch_thread = threading.Thread(target=_loop, name='model-watcher', daemon=True)
+        self._watch_thread.start()
+
+    def stop(self):
+        self._stop_watching.set()
+
+    # --- Internals ---
+    def _stat(self):
+        try:
+            # Artifacts are committed by renaming the manifest, so that is the file to watch
+            st = os.stat(manifest_path(self.path) if os.path.isdir(self.path) else self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _validate(self, candidate, current):
+        if not candidate.columns:
+            raise ValueError('Artifact has no feature columns.')
+        if current is not None and candidate.columns != current.columns:
+            print(f"--- Note: feature columns changed ({len(current.columns)} -> {len(candidate.columns)}) ---")
+
+        if not self.holdout_path or not os.path.exists(self.holdout_path):
+            return
+
+        holdout = read_holdout(self.holdout_path)
+        new_mae = holdout_mae(candidate, holdout)
+        if self.max_holdout_mae is not None and new_mae > self.max_holdout_mae:
+            raise ValueError(f'Holdout MAE {new_mae:.4f} exceeds limit {self.max_holdout_mae}.')
+        if current is not None and self.max_mae_increase is not None:
+            old_mae = holdout_mae(current, holdout)
+            if new_mae > old_mae * (1 + self.max_mae_increase):
+                raise ValueError(f'Holdout MAE got worse: {old_mae:.4f} -> {new_mae:.4f}.')
@@ -0,0 +1,153 @@
+"""
+Serving cost of a trained booster, and the search for a cheaper one.
+
+serving_cost() measures what a model costs to serve: artifact size, tree
+count and depth, and single-threaded predict latency (the serving setup: one
+XGBoost thread per worker) at a few batch sizes, for XGBoost and for the
+compiled NumPy engine.
+
+compress() builds cheaper candidates and picks the cheapest one whose test
+MAE stays within max_mae_increase of the full model:
+  - truncate: prefixes of the full booster (no retraining)
+  - distill:  small, shallow students fit to the full model's predictions
+  - search:   retrains over a depth x tree-count grid on the true labels
+Every candidate's accuracy and latency are kept, so the trade-off curve can
+be printed and stored with the artifact.
+"""
+import statistics
+import time
+
+import numpy as np
+
+# "<engine>@<batch size>" latency keys measured for every candidate
+LATENCY_KEYS = ('xgboost@1', 'xgboost@16', 'xgboost@1024', 'numpy@1', 'numpy@16')
+# The subset a plain training run reports (and stores), kept small so it adds well under a second
+REPORT_KEYS = ('xgboost@1', 'xgboost@1024', 'numpy@1')
+METHODS = ('truncate', 'distill', 'search')
+
+
+def _median_ms(fn, min_seconds=0.1, min_runs=10):
+    fn()  # warm-up
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() - started < min_seconds:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000.0
+
+
+def serving_cost(booster, X_sample, keys=LATENCY_KEYS):
+    """Size, shape and median single-threaded latency (ms) of `booster` on rows of X_sample."""
+    from tree_engine import CompiledTrees
+
+    booster.set_param({'nthread': 1})
+    compiled = CompiledTrees.from_booster(booster)
+    predict = {'xgboost': booster.inplace_predict, 'numpy': compiled.predict}
+    latency = {}
+    for key in keys:
+        engine, size = key.split('@')
+        batch = np.ascontiguousarray(X_sample[np.arange(int(size)) % len(X_sample)], dtype=np.float64)
+        latency[key] = round(_median_ms(lambda: predict[engine](batch)), 4)
+    return {
+        'num_trees': booster.num_boosted_rounds(),
+        'max_depth': compiled.max_depth,
+        'size_bytes': len(booster.save_raw('ubj')),
+        'latency_ms': latency,
+    }
+
+
+def accuracy(booster, X, y):
+    y = np.asarray(y, dtype=np.float64)
+    residual = booster.inplace_predict(X).astype(np.float64) - y
+    return {
+        'r2': round(float(1 - np.sum(residual ** 2) / np.sum((y - y.mean()) ** 2)), 6),
+        'mae': round(float(np.mean(np.abs(residual))), 6),
+    }
+
+
+def describe(name, method, booster, X_test, y_test):
+    """One point of the trade-off curve (the booster itself is kept under 'booster')."""
+    point = {'name': name, 'method': method, **accuracy(booster, X_test, y_test), **serving_cost(booster, X_test)}
+    point['booster'] = booster
+    return point
+
+
+# --- Candidates ---
+def _truncations(full, X_test, y_test, tree_counts):
+    total = full.num_boosted_rounds()
+    for n_trees in sorted({n for n in tree_counts if n < total}):
+        yield describe(f'truncate: first {n_trees}', 'truncate', full[:n_trees], X_test, y_test)
+
+
+def _fit(params, X_train, y_train, X_test, y_test, n_trees):
+    """Early-stopped xgb.train on (X_train, y_train), cut at its best iteration."""
+    import xgboost as xgb
+
+    dtrain = xgb.DMatrix(X_train, label=y_train)
+    dtest = xgb.DMatrix(X_test, label=y_test)
+    booster = xgb.train(params, dtrain, num_boost_round=n_trees, evals=[(dtest, 'test')],
+                        early_stopping_rounds=max(10, n_trees // 20), verbose_eval=False)
+    return booster[:booster.best_iteration + 1]
+
+
+def _grid(base_params, X_train, y_train, X_test, y_test, y_eval, depths, tree_counts, method):
+    for depth in depths:
+        for n_trees in tree_counts:
+            # Fewer trees need bigger steps to reach the same fit
+            params = dict(base_params, max_depth=depth, learning_rate=min(0.3, 50.0 / n_trees))
+            booster = _fit(params, X_train, y_train, X_test, y_eval, n_trees)
+            yield describe(f'{method}: d{depth} x <={n_trees}', method, booster, X_test, y_test)
+
+
+def compress(full, X_train, y_train, X_test, y_test, methods=METHODS, max_mae_increase=0.02,
+             optimize_for='xgboost@1024', base_params=None, depths=(3, 4, 5),
+             tree_counts=(50, 100, 200, 400)):
+    """
+    Returns (chosen, points): the cheapest point by `optimize_for` latency
+    whose MAE <= full MAE * (1 + max_mae_increase), and every point measured,
+    the full model first. Falls back to the full model if nothing qualifies.
+    """
+    base_params = dict(base_params or {'objective': 'reg:squarederror', 'tree_method': 'hist',
+                                       'subsample': 0.8, 'colsample_bytree': 0.8, 'seed': 42})
+    points = [describe('full model', 'full', full, X_test, y_test)]
+    if 'truncate' in methods:
+        points += _truncations(full, X_test, y_test, tree_counts + (int(full.num_boosted_rounds() * 0.75),))
+    if 'distill' in methods:
+        # Students learn the teacher's (smoother) predictions, and are early-stopped against them too
+        soft_train = full.inplace_predict(X_train)
+        soft_test = full.inplace_predict(X_test)
+        points += _grid(base_params, X_train, soft_train, X_test, y_test, soft_test,
+                        depths[:2], tree_counts[:3], 'distill')
+    if 'search' in methods:
+        points += _grid(base_params, X_train, y_train, X_test, y_test, y_test, depths, tree_counts, 'search')
+
+    budget = points[0]['mae'] * (1 + max_mae_increase)
+    eligible = [p for p in points if p['mae'] <= budget]
+    chosen = min(eligible, key=lambda p: (p['latency_ms'][optimize_for], p['mae']))
+    return chosen, points
+
+
+def pareto_front(points, optimize_for='xgboost@1024'):
+    """The points no other point beats on both MAE and `optimize_for` latency."""
+    def dominates(q, p):
+        q_cost, p_cost = q['latency_ms'][optimize_for], p['latency_ms'][optimize_for]
+        return q['mae'] <= p['mae'] and q_cost <= p_cost and (q['mae'] < p['mae'] or q_cost < p_cost)
+
+    return [p for p in points if not any(dominates(q, p) for q in points)]
+
+
+def print_trade_off(points, chosen, optimize_for='xgboost@1024'):
+    front = [id(p) for p in pareto_front(points, optimize_for)]
+    print(f"\n📉 Accuracy / latency trade-off (ms per call, 1 thread; * = Pareto front, optimizing {optimize_for})")
+    print(f"   {'candidate':<24}{'trees':>6}{'depth':>6}{'R²':>8}{'MAE':>8}{'KB':>7}"
+          + ''.join(f'{key:>13}' for key in LATENCY_KEYS))
+    for p in sorted(points, key=lambda p: p['latency_ms'][optimize_for]):
+        marker = '→' if p is chosen else ('*' if id(p) in front else ' ')
+        print(f" {marker} {p['name']:<24}{p['num_trees']:>6}{p['max_depth']:>6}{p['r2']:>8.4f}{p['mae']:>8.4f}"
+              f"{p['size_bytes'] / 1024:>7.0f}" + ''.join(f"{p['latency_ms'][key]:>13.3f}" for key in LATENCY_KEYS))
+
+
+def summary(point):
+    """JSON-safe copy of a point for artifact metadata."""
+    return {k: v for k, v in point.items() if k != 'booster'}
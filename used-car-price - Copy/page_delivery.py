@@ -0,0 +1,262 @@
+"""
+Fewer bytes and faster first bytes for pages and static files.
+
+  - PageCache keeps rendered pages (home, predict) per variant key (model
+    version, year and static asset version) as bytes, with an ETag and compressed copies made once at
+    render time, so a hit is a dict lookup and a revalidation is a 304.
+  - ResponseCompressor compresses other text responses (HTML, JSON, CSS, JS)
+    above min_bytes on the way out; a response with a strong ETag (e.g.
+    /api/analysis) is compressed once and the result reused.
+  - StaticAssets adds a content hash to every url_for('static') URL (?v=...).
+    A request with the current hash is served with a one-year immutable
+    Cache-Control, so repeat visitors never ask again; an edited file gets a new
+    URL. Text assets are kept precompressed in memory.
+
+Compressed copies carry a weak ETag (W/"..."): same content, different bytes.
+brotli is optional (pip install brotli); without it only gzip is offered.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first; the client's Accept-Encoding decides
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+                          'application/json', 'image/svg+xml'}
+ONE_YEAR = 365 * 24 * 3600
+
+
+def encode(body, encoding, fast=False):
+    """Compressed body; `fast` trades ratio for speed (per-request use), otherwise the best ratio (done once)."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5 if fast else 11)
+    return gzip.compress(body, compresslevel=6 if fast else 9, mtime=0)
+
+
+def negotiate(request, encodings=ENCODINGS):
+    """The first of `encodings` the client accepts, or None for identity."""
+    for encoding in encodings:
+        if request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+class EncodedBody:
+    """A response body with its ETag and its compressed copies (only those that are smaller)."""
+
+    def __init__(self, body, etag=None, encodings=ENCODINGS):
+        self.body = body
+        self.etag = etag or hashlib.sha1(body).hexdigest()[:16]
+        self.copies = {}
+        for encoding in encodings:
+            encoded = encode(body, encoding)
+            if len(encoded) < len(body):
+                self.copies[encoding] = encoded
+
+    def respond(self, request, response_class, mimetype):
+        """200 with the best encoding the client accepts, or 304 if its copy is still current."""
+        encoding = negotiate(request, tuple(self.copies))
+        response = response_class(self.copies[encoding] if encoding else self.body, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(self.etag, weak=encoding is not None)
+        return response.make_conditional(request)
+
+
+# -----------------------------
+# RENDERED PAGES
+# -----------------------------
+class PageCache:
+    """Thread-safe LRU of rendered pages as EncodedBody, keyed by whatever the page varies by."""
+
+    def __init__(self, max_entries=32, encodings=ENCODINGS):
+        self.max_entries = int(max_entries)
+        self.encodings = encodings
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key, render):
+        """The cached page for `key`; on a miss render() (returning str) runs outside the lock."""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+        page = EncodedBody(render().encode('utf-8'), encodings=self.encodings)
+        with self._lock:
+            self._pages[key] = page
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'enabled': self.enabled, 'entries': len(self._pages), 'hits': self.hits, 'misses': self.misses}
+
+
+# -----------------------------
+# DYNAMIC RESPONSES
+# -----------------------------
+class ResponseCompressor:
+    """after_request hook compressing text responses of at least min_bytes."""
+
+    def __init__(self, min_bytes=1024, encodings=ENCODINGS, memo_entries=64):
+        self.min_bytes = int(min_bytes)
+        self.encodings = encodings
+        self.memo_entries = int(memo_entries)
+        self._lock = threading.Lock()
+        self._memo = OrderedDict()  # (strong etag, encoding) -> compressed body
+
+    def compress(self, response, request):
+        if (not self.encodings or response.status_code != 200 or response.direct_passthrough
+                or response.is_streamed or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request, self.encodings)
+        if encoding is None or request.method == 'HEAD':
+            return response
+        body = response.get_data()
+        if len(body) < self.min_bytes:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (etag, encoding) if etag and not weak else None
+        with self._lock:
+            encoded = self._memo.get(key) if key else None
+        if encoded is None:
+            encoded = encode(body, encoding, fast=True)
+            if key:
+                with self._lock:
+                    self._memo[key] = encoded
+                    while len(self._memo) > self.memo_entries:
+                        self._memo.popitem(last=False)
+        if len(encoded) >= len(body):
+            return response
+        response.set_data(encoded)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+# -----------------------------
+# STATIC FILES
+# -----------------------------
+class StaticAssets:
+    """
+    Content-hashed URLs and far-future caching for a static folder. Files are
+    re-hashed when their size or mtime changes, so edits show up without a
+    restart. max_age=0 turns the fingerprints off (plain revalidated URLs).
+    version() rescans the folder at most every version_interval seconds.
+    """
+
+    def __init__(self, folder, max_age=ONE_YEAR, encodings=ENCODINGS, version_interval=2.0):
+        self.folder = folder
+        self.max_age = int(max_age)
+        self.encodings = encodings
+        self.version_interval = version_interval
+        self._lock = threading.Lock()
+        self._assets = {}  # filename -> (stat key, fingerprint, EncodedBody or None)
+        self._version = (float('-inf'), None)  # (monotonic time of the scan, version)
+
+    def _load(self, filename):
+        path = safe_join(self.folder, filename)
+        if path is None:
+            raise FileNotFoundError(filename)
+        st = os.stat(path)
+        stat_key = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            asset = self._assets.get(filename)
+        if asset is not None and asset[0] == stat_key:
+            return asset
+        with open(path, 'rb') as f:
+            data = f.read()
+        fingerprint = hashlib.sha256(data).hexdigest()[:12]
+        body = None  # binary files (images) keep going through send_file
+        if mimetypes.guess_type(filename)[0] in COMPRESSIBLE_MIMETYPES:
+            body = EncodedBody(data, etag=fingerprint, encodings=self.encodings)
+        asset = (stat_key, fingerprint, body)
+        with self._lock:
+            self._assets[filename] = asset
+        return asset
+
+    def fingerprint(self, filename):
+        try:
+            return self._load(filename)[1]
+        except OSError:
+            return None
+
+    def version(self):
+        """
+        One hash over every file's fingerprint: part of the key of any cached
+        page whose HTML embeds ?v= URLs, so an edited asset re-renders it.
+        None when fingerprints are off.
+        """
+        if self.max_age <= 0:
+            return None
+        checked_at, version = self._version
+        now = time.monotonic()
+        if now - checked_at < self.version_interval:
+            return version
+        digest = hashlib.sha256()
+        for root, _, files in os.walk(self.folder):
+            for name in sorted(files):
+                filename = os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, '/')
+                fingerprint = self.fingerprint(filename)
+                if fingerprint:
+                    digest.update(f'{filename}={fingerprint};'.encode('utf-8'))
+        version = digest.hexdigest()[:12]
+        self._version = (now, version)
+        return version
+
+    def url_defaults(self, endpoint, values):
+        """Flask url_defaults callback: url_for('static', filename=...) gains ?v=<content hash>."""
+        if endpoint == 'static' and self.max_age > 0 and 'filename' in values and 'v' not in values:
+            fingerprint = self.fingerprint(values['filename'])
+            if fingerprint:
+                values['v'] = fingerprint
+
+    def send(self, filename, request, response_class, send_file):
+        """Replacement static view; send_file(filename) serves (or 404s) what isn't kept in memory."""
+        try:
+            _, fingerprint, body = self._load(filename)
+        except OSError:
+            return send_file(filename)
+        if body is None:
+            response = send_file(filename)
+        else:
+            response = body.respond(request, response_class, mimetypes.guess_type(filename)[0])
+
+        if self.max_age > 0 and request.args.get('v') == fingerprint:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = self.max_age
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True  # unversioned URL: always revalidate
+        return response
@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's deliberately expensive password hashing on a small,
+    bounded thread pool instead of on every request thread at once.
+
+    hashlib's scrypt/pbkdf2 release the GIL, so a thread pool is enough to
+    get the work off the interpreter; the point of the pool is the cap. At
+    most `workers` hashes burn CPU at any moment, however many logins arrive
+    together, which leaves the remaining cores to price predictions. Beyond
+    `max_pending` queued hashes callers get HashingBusy (shed load) instead of
+    piling up. A hash that outlives `timeout` also surfaces as HashingBusy; its
+    slot stays taken until the worker actually finishes it, so abandoned hashes
+    still count against the cap. workers=0 hashes inline on the calling thread
+    (old behaviour).
+    """
+
+    def __init__(self, workers=1, max_pending=64, timeout=30.0):
+        self.workers = int(workers)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash') if self.workers > 0 else None
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+
+        self._stats_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    # --- Public API ---
+    def hash(self, password):
+        return self._run(generate_password_hash, password)
+
+    def check(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def stats(self):
+        with self._stats_lock:
+            return {'workers': self.workers, 'completed': self.completed, 'rejected': self.rejected,
+                    'timed_out': self.timed_out}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ---
+    def _run(self, fn, *args):
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise HashingBusy('Too many sign-in attempts in progress. Please try again in a moment.')
+        if self._executor is None:
+            try:
+                result = fn(*args)
+            finally:
+                self._release()
+        else:
+            try:
+                future = self._executor.submit(fn, *args)
+            except RuntimeError:
+                # Shut down: there is no worker left to hash, and no callback to free the slot
+                self._release()
+                raise HashingBusy('Sign-in is unavailable while the server shuts down.') from None
+            future.add_done_callback(self._release)
+            try:
+                result = future.result(self.timeout)
+            except FutureTimeout:
+                future.cancel()
+                with self._stats_lock:
+                    self.timed_out += 1
+                raise HashingBusy('Sign-in is taking too long right now. Please try again in a moment.') from None
+        with self._stats_lock:
+            self.completed += 1
+        return result
+
+    def _release(self, _future=None):
+        if self._slots is not None:
+            self._slots.release()
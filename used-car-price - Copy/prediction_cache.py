@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL cache of final prices, keyed on the encoded feature
+    vector and the model version. Because Car_Age is part of the vector, a
+    year rollover produces new keys on its own, and after a model reload the
+    old version's entries simply stop being hit and age out through LRU/TTL,
+    so requests still finishing on the old bundle don't flush the new one.
+    Sizes count the whole entry (key, value, bookkeeping) against max_bytes.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600.0, max_bytes=16 * 1024 * 1024):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds) if ttl_seconds else None
+        self.max_bytes = int(max_bytes)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (version, key) -> (value, expires_at, size)
+        self._bytes = 0
+        self._version = None  # of the latest put, for stats()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(vector):
+        # One float64 layout for every caller; adding 0.0 folds -0.0 into 0.0
+        return (np.ascontiguousarray(vector, dtype=np.float64) + 0.0).tobytes()
+
+    # --- Lookups ---
+    def get(self, key, version):
+        key = (version, key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key, size)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version):
+        if not self.enabled:
+            return
+        key = (version, key)
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        size = _sizeof(key) + _sizeof((value, expires_at, 0)) + _SLOT_BYTES
+        with self._lock:
+            self._version = version
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'model_version': self._version,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    # --- Internals (caller holds the lock) ---
+    def _remove(self, key, size):
+        del self._entries[key]
+        self._bytes -= size
+
+
+# Per-entry overhead of the OrderedDict (hash slot plus linked-list node), measured on CPython 3.11
+_SLOT_BYTES = 104
+
+
+def _sizeof(obj):
+    """sys.getsizeof() including the items of tuples/lists/dicts."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(_sizeof(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    return size
@@ -0,0 +1,224 @@
+"""
+Production launcher: one preloaded parent, N forked worker processes.
+
+The parent imports the app once (model bundle, encoders, analytics cache),
+creates the database tables, binds the listening socket and then forks the
+workers, so the model's memory is shared copy-on-write instead of being
+loaded N times. Each worker then:
+  - pins XGBoost to --model-threads threads (workers x threads <= cores),
+  - starts its own background threads (threads don't survive fork),
+  - runs a warm-up prediction and renders the login page,
+  - and only then starts accepting connections on the shared socket.
+
+SIGTERM / SIGINT shut down gracefully: workers stop accepting, finish their
+in-flight requests (up to --graceful-timeout) and exit; the parent waits for
+them. A worker that dies unexpectedly is replaced.
+
+    python serve.py [--workers 4] [--port 8000] [--model-threads 1]
+
+Unlike `python app.py` this never runs in debug mode. /metrics reports the
+sum over all workers (each publishes its counters to METRICS_DIR, by default
+instance/metrics, emptied at startup), whichever worker a scrape reaches. Each
+worker keeps its own prediction cache.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wsgi import ClosingIterator
+
+from model_bundle import warm_up
+
+
+def _log(message):
+    """One write() per line, so lines from concurrently logging workers never interleave."""
+    os.write(sys.stdout.fileno(), f"--- {message} ---\n".encode())
+
+
+class _InFlight:
+    """WSGI middleware counting requests in progress, so a worker knows when it has drained."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            self.count += 1
+        try:
+            # Counted until the server has written the body and closed the response
+            return ClosingIterator(self.wsgi_app(environ, start_response), self._done)
+        except BaseException:
+            self._done()
+            raise
+
+    def _done(self):
+        with self.lock:
+            self.count -= 1
+
+
+def _preload(args):
+    """Imports the app in the parent with background threads deferred until after the fork."""
+    os.environ['START_BACKGROUND_SERVICES'] = '0'
+    os.environ['MODEL_NTHREAD'] = '1'  # the parent's own load and warm-up stay single-threaded
+    import app
+
+    # Scrapes reach any worker: each must report the same cluster-wide counters
+    if app.metrics.directory is None:
+        app.metrics.directory = os.path.join(app.app.instance_path, 'metrics')
+    app.metrics.clear()
+
+    if app.model_manager.current() is None:
+        sys.exit("--- FATAL ERROR: No model loaded; refusing to start workers ---")
+    if not args.skip_db_init:
+        with app.app.app_context():
+            app.db.create_all()
+            # Pooled SQLite connections must not be inherited by the workers
+            app.db.engine.dispose()
+    return app
+
+
+def _listen(host, port, backlog=1024):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock, index, args):
+    """Body of a forked worker; never returns."""
+    class _Handler(WSGIRequestHandler):
+        def log_request(self, *a, **kw):
+            if args.access_log:
+                super().log_request(*a, **kw)
+
+    app.model_manager.set_nthread(args.model_threads)
+    # One mail sender is enough; the outbox lease would make more safe, just wasteful
+    app.start_background_services(mail_sender=app.MAIL_OUTBOX_SENDER and index == 0)
+
+    bundle = app.model_manager.current()
+    warm_up(bundle)
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.app.test_client().get('/login')  # compiles the first template
+
+    wsgi = _InFlight(app.app)
+    server = make_server(args.host, args.port, wsgi, threaded=True,
+                         request_handler=_Handler, fd=sock.fileno())
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        if not stopping.is_set():
+            stopping.set()
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    def _watch_parent(parent_pid):
+        # A SIGKILLed parent can't stop us: exit instead of serving as an orphan
+        while not stopping.wait(1.0):
+            if os.getppid() != parent_pid:
+                _stop(None, None)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    threading.Thread(target=_watch_parent, args=(os.getppid(),), name='parent-watch', daemon=True).start()
+    _log(f"Worker {index} (pid {os.getpid()}) ready: model {bundle.version}, {args.model_threads} XGBoost thread(s)")
+    try:
+        server.serve_forever()
+    finally:
+        deadline = time.monotonic() + args.graceful_timeout
+        while wsgi.count and time.monotonic() < deadline:
+            time.sleep(0.05)
+        app.stop_background_services()
+        _log(f"Worker {index} (pid {os.getpid()}) stopped")
+        os._exit(0)
+
+
+def _spawn(app, sock, index, args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _run_worker(app, sock, index, args)
+        except BaseException as e:
+            with contextlib.suppress(OSError):
+                _log(f"Worker {index} crashed: {type(e).__name__}: {e}")
+        os._exit(1)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--model-threads', type=int, default=int(os.environ.get('WORKER_MODEL_THREADS', 1)),
+                        help='XGBoost threads per worker')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help='seconds a stopping worker waits for in-flight requests')
+    parser.add_argument('--skip-db-init', action='store_true', help="don't run db.create_all() at startup")
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+
+    app = _preload(args)
+    sock = _listen(args.host, args.port)
+    # Keep the collector from touching (and so un-sharing) every preloaded object in every worker
+    gc.collect()
+    gc.freeze()
+
+    sys.stdout.flush()  # nothing buffered may be inherited (and written again) by the workers
+    _log(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s) (parent pid {os.getpid()})")
+    workers = {_spawn(app, sock, i, args): (i, time.monotonic()) for i in range(args.workers)}
+
+    stopping = threading.Event()
+
+    def _stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while not stopping.is_set():
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            stopping.wait(0.5)
+            continue
+        index, started = workers.pop(pid)
+        _log(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # don't spin on a worker that crashes at startup
+        workers[_spawn(app, sock, index, args)] = (index, time.monotonic())
+
+    _log("Shutting down: waiting for workers to finish in-flight requests")
+    for pid in workers:
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + args.graceful_timeout + 5.0
+    while workers and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            workers.pop(pid, None)
+        else:
+            time.sleep(0.05)
+    for pid in workers:
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGKILL)
+    sock.close()
+
+
+if __name__ == '__main__':
+    main()
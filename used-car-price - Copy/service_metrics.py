@@ -0,0 +1,312 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+from worker_processes import pid_alive
+
+# Latency buckets in seconds: 50 µs .. 2.5 s, dense where single predictions land
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def state(self):
+        """{labels: value} copy of this process's values."""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge_value(values, labels, value):
+        values[labels] = values.get(labels, 0) + value
+
+    def render(self, values=None):
+        """Exposition lines for `values` ({labels: value}, this process's own by default)."""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in sorted((self.state() if values is None else values).items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count per label set: counter.inc('ValueError')."""
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (e.g. requests in flight)."""
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram per label set. observe() is a bisect plus two adds
+    under a lock, cheap enough for every request. Buckets are stored
+    non-cumulative and summed at render time.
+    """
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *labels):
+        """Context manager that observes the wall time of its block."""
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def state(self):
+        with self._lock:
+            return {labels: [list(counts), total] for labels, (counts, total) in self._values.items()}
+
+    @staticmethod
+    def merge_value(values, labels, value):
+        counts, total = value
+        state = values.get(labels)
+        if state is None:
+            values[labels] = [list(counts), total]
+        elif len(state[0]) == len(counts):
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+
+    def render(self, values=None):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        snapshot = sorted((labels, counts, total)
+                          for labels, (counts, total) in (self.state() if values is None else values).items())
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, [le])} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics in the Prometheus text exposition format. With
+    enabled=False every update is a single attribute check and time() hands
+    back one shared no-op context manager (no timer object, no clock read), so
+    instrumented code needs no branches of its own.
+
+    With a `directory`, prefork workers share one view: each publishes its
+    values to <directory>/metrics-<pid>-<n>.json (every publish_interval
+    seconds, on stop() and before rendering), and render() sums every
+    published file, whichever worker the scrape reaches. Counters and
+    histograms of workers that have exited stay in the sum, so totals never go
+    backwards when a worker is replaced; gauges count live workers only. Call
+    clear() once before the workers start, so a new server starts from zero.
+    """
+
+    def __init__(self, enabled=True, directory=None, publish_interval=10.0):
+        self.enabled = enabled
+        self.directory = directory
+        self.publish_interval = float(publish_interval)
+        self.publish_errors = 0
+        self._metrics = []
+        self._publish_lock = threading.Lock()
+        self._file = None  # (pid, path): a forked worker gets a file of its own
+        self._stop = threading.Event()
+        self._thread = None
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    def render(self):
+        merged = None
+        if self.directory:
+            try:
+                merged = self._merge_published()
+            except OSError as e:
+                print(f"--- Metrics of the other workers unavailable: {type(e).__name__}: {e} ---")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(None if merged is None else merged[metric.name]))
+        return '\n'.join(lines) + '\n'
+
+    # --- Sharing across workers ---
+    def publish(self):
+        """Writes this process's values to its file in `directory`."""
+        if not self.directory:
+            return
+        state = {metric.name: [[list(labels), value] for labels, value in metric.state().items()]
+                 for metric in self._metrics}
+        with self._publish_lock:
+            path = self._path()
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(path + '.tmp', path)
+
+    def clear(self):
+        """Removes every published file (a new server's counters start from zero)."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.startswith('metrics-') and name.endswith(('.json', '.tmp')):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def start(self):
+        if self._thread is not None or not self.enabled or not self.directory or self.publish_interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-publisher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(5.0)
+        self._thread = None
+        try:
+            self.publish()  # the final counts stay in the sum after this worker exits
+        except OSError:
+            pass
+
+    # --- Internals ---
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def _path(self):
+        pid = os.getpid()
+        if self._file is None or self._file[0] != pid:
+            os.makedirs(self.directory, exist_ok=True)
+            # A reused pid must not overwrite the file of the worker that had it before
+            n = 0
+            while os.path.exists(os.path.join(self.directory, f'metrics-{pid}-{n}.json')):
+                n += 1
+            self._file = (pid, os.path.join(self.directory, f'metrics-{pid}-{n}.json'))
+        return self._file[1]
+
+    def _merge_published(self):
+        """{metric name: {labels: value}} summed over every published file (this process's made fresh)."""
+        self.publish()
+        kinds = {metric.name: metric for metric in self._metrics}
+        merged = {name: {} for name in kinds}
+        for name in os.listdir(self.directory):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name.split('-')[1])
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError, IndexError):
+                continue
+            live = pid == os.getpid() or pid_alive(pid)
+            for metric_name, values in state.items():
+                metric = kinds.get(metric_name)
+                if metric is None or (metric.kind == 'gauge' and not live):
+                    continue
+                for labels, value in values:
+                    metric.merge_value(merged[metric_name], tuple(labels), value)
+        return merged
+
+    def _run(self):
+        while not self._stop.wait(self.publish_interval):
+            try:
+                self.publish()
+            except Exception as e:
+                self.publish_errors += 1
+                print(f"--- Metrics not published: {type(e).__name__}: {e} ---")
@@ -0,0 +1,33 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """app.py imported once, with its databases and logs in a temporary directory and no background threads."""
+    tmp = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'START_BACKGROUND_SERVICES': '0',
+        'MODEL_WATCH_INTERVAL': '0',
+        'PREDICT_BATCHING': '0',
+        'DATABASE_URL': f"sqlite:///{tmp / 'users.db'}",
+        'MAIL_OUTBOX_PATH': str(tmp / 'mail_outbox.db'),
+        'AUDIT_LOG_DIR': str(tmp / 'audit_log'),
+        'DRIFT_DIR': str(tmp / 'drift'),
+        'ANALYTICS_CACHE_PATH': str(tmp / 'analytics_cache.json'),
+    })
+    os.environ.pop('ADMIN_TOKEN', None)
+    os.environ.pop('MODEL_ADMIN_TOKEN', None)
+    os.chdir(ROOT)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        with app.app.app_context():
+            app.db.create_all()
+    return app
@@ -0,0 +1,58 @@
+import pytest
+
+ADMIN_GETS = ['/admin/model_status', '/admin/mail_outbox', '/admin/audit_log', '/admin/drift']
+
+
+@pytest.fixture
+def client(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'user@example.com'
+        sess['user_name'] = 'User'
+    return client
+
+
+@pytest.fixture
+def token(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 's3cret')
+    return 's3cret'
+
+
+@pytest.mark.parametrize('path', ADMIN_GETS)
+def test_admin_routes_are_closed_without_a_configured_token(client, path):
+    assert client.get(path).status_code == 404
+    assert client.get(path, headers={'X-Admin-Token': ''}).status_code == 404
+
+
+def test_logged_in_user_cannot_reload_without_a_configured_token(app_module, client, monkeypatch):
+    started = []
+    monkeypatch.setattr(app_module.model_manager, 'reload_async', lambda: started.append(True) or True)
+    assert client.post('/admin/reload_model').status_code == 404
+    assert started == []
+
+
+@pytest.mark.parametrize('path', ADMIN_GETS)
+def test_wrong_token_is_refused(client, token, path):
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={'X-Admin-Token': 'guess'}).status_code == 403
+
+
+@pytest.mark.parametrize('path', ADMIN_GETS)
+def test_token_opens_admin_routes_without_a_session(app_module, token, path):
+    response = app_module.app.test_client().get(path, headers={'X-Admin-Token': token})
+    assert response.status_code == 200
+    assert response.is_json
+
+
+def test_reload_with_token(app_module, client, token, monkeypatch):
+    started = []
+    monkeypatch.setattr(app_module.model_manager, 'reload_async', lambda: started.append(True) or True)
+    response = client.post('/admin/reload_model', headers={'X-Admin-Token': token})
+    assert response.status_code == 202
+    assert response.get_json()['started'] is True and started == [True]
+
+
+def test_other_routes_still_need_a_login(app_module):
+    response = app_module.app.test_client().get('/compare')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
@@ -0,0 +1,111 @@
+import base64
+import glob
+import gzip
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from audit_log import AuditLog, iter_audit_log, read_audit_log
+
+
+class FormLike:
+    """Stands in for request.form: dict-like, but not a dict."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def items(self):
+        return self._data.items()
+
+
+@pytest.fixture
+def log(tmp_path):
+    return AuditLog(str(tmp_path), batch_size=3)
+
+
+def _segments(directory):
+    return sorted(glob.glob(os.path.join(directory, 'audit-*.jsonl.gz')))
+
+
+def test_records_round_trip(log, tmp_path):
+    log.record('predict', 'v1', FormLike({'Brand': 'Maruti', 'Kms_Driven': '42000'}),
+               np.array([3.0, np.nan, 42000.0]), 4.25, 'model', 1.5, unknown={'City': 'Atlantis'})
+    log.record('api_predict', 'v1', {'Brand': 'Honda'}, None, None, None, 0.2, error='Missing value for City.')
+    log.record_many('api_predict_batch', 'v2', [{'Brand': 'Tata'}, {'Brand': 'Kia'}],
+                    np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]), [7.5, None], 'model', 9.0,
+                    errors={1: 'Invalid value for Year.'})
+    assert log.flush() == 4 and log.status()['batches'] == 2
+
+    df = read_audit_log(str(tmp_path))
+    assert df['endpoint'].tolist() == ['predict', 'api_predict', 'api_predict_batch', 'api_predict_batch']
+    assert df['model_version'].tolist() == ['v1', 'v1', 'v2', 'v2']
+    assert df['Brand'].tolist() == ['Maruti', 'Honda', 'Tata', 'Kia']
+    assert df['Kms_Driven'].iloc[0] == '42000'
+    np.testing.assert_array_equal(df['price'], [4.25, np.nan, 7.5, np.nan])
+    assert df['source'].fillna('-').tolist() == ['model', '-', 'model', '-']
+    np.testing.assert_array_equal(df['latency_ms'], [1.5, 0.2, 9.0, 9.0])
+    assert df['error'].fillna('-').tolist() == ['-', 'Missing value for City.', '-', 'Invalid value for Year.']
+    assert df['unknown'].iloc[0] == {'City': 'Atlantis'}
+    np.testing.assert_array_equal(df['features'].iloc[0], [3.0, np.nan, 42000.0])
+    assert df['features'].iloc[1] is None and df['features'].iloc[3] is None
+    np.testing.assert_array_equal(df['features'].iloc[2], [1.0, 2.0, 3.0])
+    assert str(df['ts'].dt.tz) == 'UTC'
+
+
+def test_segments_are_plain_json_lines(log, tmp_path):
+    log.record('predict', 'v1', {'Brand': 'Maruti'}, np.array([1.0, np.nan]), 3.5, 'model', 1.0)
+    log.record('predict', 'v1', {'Brand': 'Kia'}, None, None, None, 1.0, error='bad')
+    log.flush()
+    with gzip.open(_segments(str(tmp_path))[0], 'rt', encoding='utf-8') as f:
+        batch = json.loads(f.readline())
+    assert batch['inputs'] == {'columns': ['Brand'], 'rows': [['Maruti'], ['Kia']]}
+    assert batch['price'] == [3.5, None] and batch['error'] == [None, 'bad'] and batch['feature_count'] == [2, 0]
+    features = np.frombuffer(base64.b64decode(batch['features']), dtype='<f8').reshape(2, 2)
+    np.testing.assert_array_equal(features, [[1.0, np.nan], [np.nan, np.nan]])
+
+
+def test_pickled_segments_are_never_loaded(tmp_path):
+    class Payload:
+        def __reduce__(self):
+            return (os.mkdir, (str(tmp_path / 'pwned'),))
+
+    with gzip.open(tmp_path / 'audit-20240101T000000.000000-1.pkl.gz', 'wb') as f:
+        pickle.dump(Payload(), f)
+    with gzip.open(tmp_path / 'audit-20240101T000000.000000-2.jsonl.gz', 'wb') as f:
+        f.write(pickle.dumps(Payload()))
+
+    assert read_audit_log(str(tmp_path)).empty
+    assert not (tmp_path / 'pwned').exists()
+
+
+def test_truncated_batch_ends_the_segment_quietly(log, tmp_path):
+    for i in range(3):
+        log.record('predict', 'v1', {'i': i}, None, float(i), 'model', 1.0)
+    log.flush()
+    first_batch = log.bytes_written
+    for i in range(3, 6):
+        log.record('predict', 'v1', {'i': i, 'pad': 'x' * 200}, None, float(i), 'model', 1.0)
+    log.flush()
+    log._close_segment()
+    path = _segments(str(tmp_path))[0]
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:first_batch + 12])  # the process died while writing the second batch
+
+    assert read_audit_log(str(tmp_path))['i'].tolist() == [0, 1, 2]
+
+
+def test_since_and_chunking(log, tmp_path, monkeypatch):
+    clock = iter(range(1000, 1010))
+    monkeypatch.setattr('audit_log.time.time', lambda: float(next(clock)))
+    for i in range(6):
+        log.record('predict', 'v1', {'i': i}, None, 1.0, 'model', 1.0)
+    log.flush()
+
+    chunks = list(iter_audit_log(str(tmp_path), since=1002, chunk_size=1))  # whole batches per chunk
+    assert [chunk['i'].tolist() for chunk in chunks] == [[2], [3, 4, 5]]
+    assert read_audit_log(str(tmp_path), since='1970-01-01 00:16:44')['i'].tolist() == [4, 5]
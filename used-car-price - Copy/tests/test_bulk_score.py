@@ -0,0 +1,54 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk_score import ChunkWriter, bulk_score
+from generate_data import generate_chunk
+
+
+@pytest.fixture(scope='module')
+def bundle(app_module):
+    bundle = app_module.model_manager.current()
+    if bundle is None:
+        pytest.skip('No trained model: run car_price_prediction.py first.')
+    return bundle
+
+
+def _rows(n_rows, seed=11):
+    df = generate_chunk(np.random.default_rng(seed), n_rows)
+    df['Maintenance_Cost(₹/yr)'] = df['Maintenance_Cost(₹/yr)'].round().astype(int)
+    return json.loads(df.drop(columns=['Car_Age', 'Brand', 'Selling_Price(Lakhs)'])
+                      .to_json(orient='records', force_ascii=False))
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_clean_chunk_before_a_rejected_row_and_prices_match_predict_price(app_module, bundle, tmp_path, suffix):
+    rows = _rows(200)
+    rows[150]['City'] = None
+    source, output = str(tmp_path / 'listings.csv'), str(tmp_path / f'priced{suffix}')
+    pd.DataFrame(rows).to_csv(source, index=False)
+
+    n_rows, n_failed, _ = bulk_score(source, output, bundle.path, workers=1, chunk_size=100,
+                                     unknown_policy=bundle.pipeline.unknown_policy,
+                                     current_year=app_module.CURRENT_YEAR)
+    priced = pd.read_parquet(output) if suffix == '.parquet' else pd.read_csv(output)
+
+    assert (n_rows, n_failed) == (200, 1)
+    assert sorted(os.listdir(tmp_path)) == sorted(['listings.csv', f'priced{suffix}'])
+    assert priced['error'].notna().tolist() == [i == 150 for i in range(200)]
+    assert np.isnan(priced['predicted_price'][150])
+    for i, row in enumerate(rows):
+        if i != 150:
+            assert priced['predicted_price'][i] == app_module._predict_price(row, bundle=bundle)[0]
+
+
+def test_failed_run_leaves_no_file(tmp_path):
+    path = str(tmp_path / 'priced.parquet')
+    with pytest.raises(RuntimeError):
+        with ChunkWriter(path) as writer:
+            writer.write(pd.DataFrame({'City': ['Pune'], 'predicted_price': [4.2], 'error': [None]}))
+            raise RuntimeError('worker died')
+    assert os.listdir(tmp_path) == []
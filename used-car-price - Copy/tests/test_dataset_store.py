@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset_store
+from dataset_store import DatasetWriter, append_rows, iter_chunks, read_columns, read_dataset, write_dataset
+
+pytest.importorskip('pyarrow')
+
+
+def _frame(n_rows, seed=0, cities=('Delhi', 'Mumbai', 'Pune')):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Car_Age': rng.integers(0, 20, n_rows),
+        'Kms_Driven': rng.integers(1000, 200000, n_rows),
+        'Mileage(km/l)': rng.normal(18, 3, n_rows).round(2),
+        'City': rng.choice(cities, n_rows),
+        'Fuel_Type': rng.choice(['CNG', 'Diesel', 'Petrol'], n_rows),
+    })
+
+
+@pytest.mark.parametrize('ext', ['.feather', '.parquet', '.csv'])
+def test_round_trip_keeps_values_and_compact_dtypes(tmp_path, ext):
+    frame = _frame(500)
+    path = str(tmp_path / f'cars{ext}')
+    assert write_dataset(path, frame, chunk_size=128) == 500
+
+    back = read_dataset(path)
+    assert back.dtypes.astype(str).to_dict() == {'Car_Age': 'int16', 'Kms_Driven': 'int32',
+                                                  'Mileage(km/l)': 'float32', 'City': 'category',
+                                                  'Fuel_Type': 'category'}
+    assert back['City'].astype(str).tolist() == frame['City'].tolist()
+    assert back['Car_Age'].tolist() == frame['Car_Age'].tolist()
+    assert np.allclose(back['Mileage(km/l)'], frame['Mileage(km/l)'], atol=1e-4)
+    assert dataset_store.column_names(path) == frame.columns.tolist()
+    assert sum(len(chunk) for chunk in iter_chunks(path, chunk_size=128)) == 500
+
+
+@pytest.mark.parametrize('ext', ['.feather', '.parquet'])
+def test_new_labels_in_later_chunks_keep_earlier_codes(tmp_path, ext):
+    path = str(tmp_path / f'cars{ext}')
+    first, second = _frame(100, seed=1), _frame(100, seed=2, cities=('Pune', 'Agra', 'Goa'))
+    with DatasetWriter(path) as writer:
+        writer.write(first)
+        writer.write(second)
+
+    codes, labels = read_columns(path, ['City'], encoded=True)['City']
+    assert labels[:3] == sorted(set(first['City']), key=first['City'].tolist().index)
+    assert set(labels) == {'Delhi', 'Mumbai', 'Pune', 'Agra', 'Goa'} and len(labels) == 5
+    assert [labels[code] for code in codes] == first['City'].tolist() + second['City'].tolist()
+    assert read_dataset(path)['City'].astype(str).tolist() == first['City'].tolist() + second['City'].tolist()
+
+
+@pytest.mark.parametrize('ext', ['.feather', '.csv'])
+def test_failed_write_leaves_no_file(tmp_path, ext):
+    path = str(tmp_path / f'cars{ext}')
+    with pytest.raises(RuntimeError):
+        with DatasetWriter(path) as writer:
+            writer.write(_frame(50))
+            raise RuntimeError('interrupted')
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('ext', ['.feather', '.parquet', '.csv'])
+def test_append_rows_adds_new_labels_and_keeps_old_rows(tmp_path, ext):
+    path = str(tmp_path / f'cars{ext}')
+    old, new = _frame(300, seed=3), _frame(40, seed=4, cities=('Goa',))
+    write_dataset(path, old)
+
+    append_rows(path, new[list(reversed(new.columns))])  # reordered to the dataset's columns
+
+    back = read_dataset(path)
+    assert len(back) == 340
+    assert back['City'].astype(str).tolist() == old['City'].tolist() + ['Goa'] * 40
+    assert back['Kms_Driven'].tolist() == old['Kms_Driven'].tolist() + new['Kms_Driven'].tolist()
+    assert sorted(os.listdir(tmp_path)) == [f'cars{ext}']
@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from drift_monitor import (CategorySketch, DriftMonitor, QuantileSketch, ReferenceBuilder, merge_snapshots, psi,
+                           reference_summary)
+from feature_pipeline import FeaturePipeline
+
+COLUMNS = ['Car_Age', 'Kms_Driven', 'Mileage(km/l)', 'City', 'Fuel_Type']
+VOCABULARIES = {'City': ['Delhi', 'Mumbai', 'Pune'], 'Fuel_Type': ['CNG', 'Diesel', 'Petrol']}
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return FeaturePipeline(COLUMNS, VOCABULARIES)
+
+
+def _matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 20, n),
+        rng.lognormal(10.5, 0.6, n).round(),
+        rng.normal(18, 3, n),
+        rng.choice(3, n, p=[0.5, 0.3, 0.2]),
+        rng.choice(3, n, p=[0.1, 0.4, 0.5]),
+    ]).astype(np.float64)
+
+
+def _bundle(pipeline, reference=None, version='v1'):
+    return SimpleNamespace(pipeline=pipeline, version=version,
+                           metadata={'drift_reference': reference} if reference else {})
+
+
+def test_streamed_reference_matches_the_exact_one(pipeline):
+    matrix = _matrix(20000)
+    builder = ReferenceBuilder(pipeline)
+    for chunk in np.array_split(matrix, 7):
+        builder.add(chunk)
+    streamed, exact = builder.summary(), reference_summary(pipeline, matrix)
+
+    assert streamed['rows'] == exact['rows'] == 20000
+    assert streamed['categorical'] == exact['categorical']
+    for column, expected in exact['numeric'].items():
+        got = streamed['numeric'][column]
+        assert len(got['edges']) == len(expected['edges'])
+        assert sum(got['proportions']) == pytest.approx(1.0, abs=1e-5)
+        assert psi(expected['proportions'], got['proportions']) < 0.02
+        assert got['min'] == expected['min'] and got['max'] == expected['max']
+        assert got['quantiles']['p50'] == pytest.approx(expected['quantiles']['p50'], rel=0.02)
+
+
+def test_model_without_reference_is_reported_loudly_once(pipeline, capsys):
+    monitor = DriftMonitor()
+    bundle = _bundle(pipeline)
+
+    assert monitor.check_reference(bundle) is False
+    monitor.observe_many(bundle, _matrix(50), {}, {})
+    assert capsys.readouterr().out.count('has no drift reference') == 1
+
+    assert monitor.check_reference(_bundle(pipeline, {'rows': 1}, 'v2')) is True
+    assert DriftMonitor(enabled=False).check_reference(bundle) is True
+
+
+def test_quantile_sketches_merge_to_the_whole():
+    values = np.random.default_rng(3).normal(5, 20, 5000)
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for value in values.tolist():
+        whole.add(value)
+    left.add_many(values[:2000])
+    for value in values[2000:].tolist():
+        right.add(value)
+
+    merged = QuantileSketch.from_dict(left.merge(right).to_dict())
+    assert merged.to_dict() == whole.to_dict()
+    assert merged.quantile(0.5) == pytest.approx(np.median(values), rel=0.02)
+    with pytest.raises(ValueError, match='different accuracy'):
+        whole.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_category_sketches_merge_counts_and_unknowns():
+    left, right = CategorySketch(3, max_unknown=2), CategorySketch(3, max_unknown=2)
+    for code in (0, 0, 2):
+        left.add(code)
+    right.add(1)
+    for value in ['Agra'] * 5 + ['Goa']:
+        left.add_unknown(value)
+    for value in ['Agra'] * 2 + ['Leh'] * 3:
+        right.add_unknown(value)
+
+    merged = left.merge(right)
+    assert merged.counts == [2, 1, 1]
+    assert merged.unknown == 11 and merged.count == 15
+    # Three labels for two slots: the smallest count is taken off every label
+    assert merged.top_unknown == {'Agra': 6, 'Leh': 2}
+    with pytest.raises(ValueError, match='different vocabularies'):
+        merged.merge(CategorySketch(4))
+
+
+def test_worker_snapshots_merge_to_a_single_workers(pipeline):
+    bundle, matrix = _bundle(pipeline), _matrix(600, seed=4)
+    single, workers = DriftMonitor(), [DriftMonitor(), DriftMonitor()]
+    single.observe_many(bundle, matrix, {}, {})
+    workers[0].observe_many(bundle, matrix[:250], {}, {})
+    workers[1].observe_many(bundle, matrix[250:], {}, {})
+
+    count, _, numeric, categorical = merge_snapshots([w.snapshot() for w in workers])
+    expected = single.snapshot()
+    assert count == expected['count'] == 600
+    assert {col: s.to_dict() for col, s in categorical.items()} == expected['categorical']
+    for column, sketch in numeric.items():
+        assert sketch.count == expected['numeric'][column]['count']
+        assert sketch.quantile(0.5) == pytest.approx(
+            QuantileSketch.from_dict(expected['numeric'][column]).quantile(0.5), rel=0.02)
+
+
+def test_buffered_rows_are_folded_before_every_read(pipeline):
+    bundle, matrix = _bundle(pipeline), _matrix(300, seed=5)
+    unknowns = {3: [('City', 'Agra')], 40: [('City', 'Agra'), ('Fuel_Type', 'LPG')]}
+    buffered, direct = DriftMonitor(fold_rows=10000), DriftMonitor(fold_rows=1)
+    for monitor in (buffered, direct):
+        for i, row in enumerate(matrix[:20]):
+            monitor.observe(bundle, row, unknowns.get(i, ()))
+        monitor.observe(bundle, matrix[20], errors=['Kms_Driven is not a number.'])  # skipped
+        monitor.observe_many(bundle, matrix[21:], {}, {i - 21: found for i, found in unknowns.items() if i > 20})
+
+    assert len(buffered._pending) == 21 and not direct._pending
+    got, expected = buffered.snapshot(), direct.snapshot()
+    assert not buffered._pending
+    assert got['count'] == expected['count'] == 299
+    assert got['categorical'] == expected['categorical']
+    assert got['categorical']['City']['top_unknown'] == {'Agra': 2}
+    for column, data in expected['numeric'].items():
+        assert got['numeric'][column]['count'] == data['count']
+        assert (got['numeric'][column]['min'], got['numeric'][column]['max']) == (data['min'], data['max'])
+
+
+def test_stop_folds_what_the_thread_left(pipeline):
+    monitor = DriftMonitor(fold_interval=60, fold_rows=10000)
+    monitor.start()
+    try:
+        monitor.observe_many(_bundle(pipeline), _matrix(50), {}, {})
+    finally:
+        monitor.stop()
+    assert not monitor._pending
+    assert monitor._current.count == 50
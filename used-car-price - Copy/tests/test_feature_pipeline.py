@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_pipeline import CATEGORICAL_COLS, NUMERIC_INPUTS, FeaturePipeline
+
+CURRENT_YEAR = 2025
+COLUMNS = ['Car_Age'] + [field for field, _ in NUMERIC_INPUTS if field != 'Year'] + CATEGORICAL_COLS
+VOCABULARIES = {
+    'Car_Name': ['City', 'Swift', 'Verna'],
+    'City': ['Delhi', 'Mumbai', 'Pune'],
+    'Condition': ['Excellent', 'Fair', 'Good'],
+    'Fuel_Type': ['CNG', 'Diesel', 'Petrol'],
+    'Seller_Type': ['Dealer', 'Individual'],
+    'Transmission': ['Automatic', 'Manual'],
+}
+VALID = {
+    'Year': 2018, 'Present_Price(Lakhs)': 7.5, 'Kms_Driven': 42000, 'Owner': 0,
+    'Mileage(km/l)': 18.2, 'Engine_Power(cc)': 1197, 'Maintenance_Cost(₹/yr)': 12000,
+    'Insurance_Age(yrs)': 2, 'Accidents': 0, 'Car_Name': 'Swift', 'City': 'Pune',
+    'Condition': 'Good', 'Fuel_Type': 'Petrol', 'Seller_Type': 'Dealer', 'Transmission': 'Manual',
+}
+EDGE_CASES = [
+    {},
+    {'Year': '2016', 'Kms_Driven': '15000', 'Mileage(km/l)': '21.5'},
+    {'Kms_Driven': '8.5'},
+    {'Kms_Driven': 'lots'},
+    {'Present_Price(Lakhs)': 'inf'},
+    {'Present_Price(Lakhs)': float('inf')},
+    {'Mileage(km/l)': float('nan')},
+    {'Kms_Driven': float('inf')},
+    {'Owner': None},
+    {'City': 'Atlantis'},
+    {'City': ''},
+    {'City': None},
+    {'Fuel_Type': float('nan')},
+    {'City': 'Atlantis', 'Car_Name': None, 'Accidents': 'x'},
+]
+ROWS = [dict(VALID, **changes) for changes in EDGE_CASES]
+
+
+def _assert_same(a, b):
+    assert np.array_equal(a, b, equal_nan=True)
+
+
+@pytest.mark.parametrize('policy', ['zero', 'missing', 'error'])
+def test_row_and_column_paths_agree(policy):
+    pipeline = FeaturePipeline(COLUMNS, VOCABULARIES, policy)
+    matrix, valid, errors, unknowns = pipeline.encode_rows(ROWS, current_year=CURRENT_YEAR)
+
+    for i, row in enumerate(ROWS):
+        vector, row_errors, row_unknowns = pipeline.encode_row(row, current_year=CURRENT_YEAR)
+        assert errors.get(i, []) == row_errors, row
+        assert unknowns.get(i, []) == row_unknowns, row
+        assert valid[i] == (not row_errors), row
+        if not row_errors:
+            _assert_same(matrix[i], vector)
+
+
+def test_pandas_columns_match_rows():
+    pipeline = FeaturePipeline(COLUMNS, VOCABULARIES)
+    frame = pd.DataFrame(ROWS)
+    data = {col: frame[col] for col in frame.columns}
+    data['City'] = frame['City'].astype('category')
+    matrix, valid, errors, unknowns = pipeline.encode_columns(data, len(frame), CURRENT_YEAR)
+
+    for i, row in enumerate(ROWS):
+        vector, row_errors, row_unknowns = pipeline.encode_row(row, current_year=CURRENT_YEAR)
+        assert valid[i] == (not row_errors), row
+        assert [(col, str(value)) for col, value in unknowns.get(i, [])] == \
+               [(col, str(value)) for col, value in row_unknowns], row
+        if not row_errors:
+            _assert_same(matrix[i], vector)
+
+
+def test_non_finite_and_missing_values_are_rejected():
+    pipeline = FeaturePipeline(COLUMNS, VOCABULARIES)
+    rows = [dict(VALID, **{'Present_Price(Lakhs)': float('inf')}),
+            dict(VALID, **{'Mileage(km/l)': float('nan')}),
+            dict(VALID, **{'Kms_Driven': float('inf')}),
+            dict(VALID, City=None)]
+    _, valid, errors, unknowns = pipeline.encode_rows(rows, current_year=CURRENT_YEAR)
+
+    assert not valid.any()
+    assert errors[0] == ["Invalid value for 'Present_Price(Lakhs)': inf"]
+    assert errors[1] == ["Invalid value for 'Mileage(km/l)': nan"]
+    assert errors[2] == ["Invalid value for 'Kms_Driven': inf"]
+    assert errors[3] == ["Missing value for 'City'."]
+    assert 3 not in unknowns
+
+
+def test_training_columns_keep_recorded_values():
+    pipeline = FeaturePipeline(COLUMNS, VOCABULARIES)
+    data = {'Car_Age': np.array([3, 4]), 'Mileage(km/l)': np.array([math.nan, 20.0])}
+    matrix, valid, _, _ = pipeline.encode_columns(data, 2, cast_inputs=False)
+
+    slot = COLUMNS.index('Mileage(km/l)')
+    assert math.isnan(matrix[0, slot])
+    assert matrix[1, slot] == 20.0
+    assert matrix[:, COLUMNS.index('Car_Age')].tolist() == [3.0, 4.0]
+
+
+def test_unknown_policies():
+    row = dict(VALID, City='Atlantis')
+    slot = COLUMNS.index('City')
+    for policy, expected in (('zero', 0.0), ('missing', math.nan)):
+        vector, errors, unknowns = FeaturePipeline(COLUMNS, VOCABULARIES, policy).encode_row(
+            row, current_year=CURRENT_YEAR)
+        assert errors == [] and unknowns == [('City', 'Atlantis')]
+        _assert_same(vector[slot], expected)
+
+    _, errors, _ = FeaturePipeline(COLUMNS, VOCABULARIES, 'error').encode_row(row, current_year=CURRENT_YEAR)
+    assert errors == ["Unknown category 'Atlantis' for column 'City'."]
@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+
+import car_price_prediction
+import dataset_store
+from generate_data import generate_dataset
+from model_bundle import load_bundle
+
+
+@pytest.fixture(scope='module')
+def workdir(tmp_path_factory):
+    """A small dataset and a model trained on it, saved under a name other than the default."""
+    tmp = tmp_path_factory.mktemp('incremental')
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        generate_dataset('enhanced_car_dataset.csv', n_rows=3000, seed=0)
+        car_price_prediction.DATASET_PATH, default = 'enhanced_car_dataset.csv', car_price_prediction.DATASET_PATH
+        try:
+            car_price_prediction.train_model()
+        finally:
+            car_price_prediction.DATASET_PATH = default
+        os.rename('car_model.pkl', 'other.pkl')
+        shutil.move('car_model', 'other')
+        yield tmp
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope='module')
+def listings(workdir):
+    generate_dataset(str(workdir / 'new_listings.csv'), n_rows=400, seed=1)
+    frame = dataset_store.read_dataset(str(workdir / 'new_listings.csv'))
+    frame['City'] = frame['City'].cat.add_categories(['Atlantis'])
+    frame.loc[:49, 'City'] = 'Atlantis'
+    frame.to_csv(workdir / 'new_listings.csv', index=False)
+    return str(workdir / 'new_listings.csv')
+
+
+def test_new_labels_are_appended_and_the_loaded_model_is_updated(workdir, listings):
+    before = load_bundle(str(workdir / 'other.pkl'))
+    rows_before = len(dataset_store.read_dataset(str(workdir / 'enhanced_car_dataset.csv')))
+
+    car_price_prediction.train_model_incremental(listings, 'enhanced_car_dataset.csv', 'other.pkl',
+                                                 extra_rounds=5, replay_rows=500, compare=False)
+
+    assert not os.path.exists(workdir / 'car_model.pkl') and not os.path.exists(workdir / 'car_model')
+    for path in ('other', 'other.pkl'):
+        after = load_bundle(str(workdir / path))
+        assert after.version != before.version
+        cities = after.pipeline.vocabularies['City']
+        assert cities[:len(before.pipeline.vocabularies['City'])] == before.pipeline.vocabularies['City']
+        assert cities[-1] == 'Atlantis'
+        assert after.metadata['base_version'] == before.version
+        assert [entry['file'] for entry in after.metadata['increments']] == ['new_listings.csv']
+    # append_rows() added the new listings to the dataset
+    assert len(dataset_store.read_dataset(str(workdir / 'enhanced_car_dataset.csv'))) == rows_before + 400
+
+
+def test_the_same_file_is_never_added_twice(workdir, listings, capsys):
+    version = load_bundle(str(workdir / 'other')).version
+    rows = len(dataset_store.read_dataset(str(workdir / 'enhanced_car_dataset.csv')))
+
+    car_price_prediction.train_model_incremental(listings, 'enhanced_car_dataset.csv', 'other',
+                                                 extra_rounds=5, replay_rows=500, compare=False)
+
+    assert 'was already added to this model' in capsys.readouterr().out
+    assert load_bundle(str(workdir / 'other')).version == version
+    assert len(dataset_store.read_dataset(str(workdir / 'enhanced_car_dataset.csv'))) == rows
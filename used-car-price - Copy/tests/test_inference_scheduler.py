@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+import pytest
+
+from inference_scheduler import InferenceScheduler, SchedulerClosed
+
+
+class _GatedModel:
+    """predict_fn that records each call and can be held until released."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+        self.fail = fail
+
+    def __call__(self, matrix, context):
+        self.calls.append((matrix.shape[0], context))
+        self.started.set()
+        self.release.wait(5)
+        if self.fail:
+            raise ValueError('model exploded')
+        return matrix[:, 0] * 2
+
+
+def _scheduler(model, **kwargs):
+    kwargs.setdefault('max_wait_ms', 50)
+    return InferenceScheduler(model, **kwargs)
+
+
+def _busy(scheduler, model):
+    """Holds the worker in a predict call, so the rows submitted next queue up behind it."""
+    model.release.clear()
+    blocker = scheduler.submit(np.array([0.0]), 'blocker')
+    assert model.started.wait(5)
+    return blocker
+
+
+def test_rows_queued_together_are_predicted_in_one_call():
+    model = _GatedModel()
+    scheduler = _scheduler(model, max_batch_size=8, max_wait_ms=1000)
+    try:
+        blocker = _busy(scheduler, model)
+        futures = [scheduler.submit(np.array([float(i)])) for i in range(8)]
+        model.release.set()
+        assert [f.result(5) for f in futures] == [i * 2.0 for i in range(8)]
+        assert blocker.result(5) == 0.0
+        assert model.calls == [(1, 'blocker'), (8, None)]
+        stats = scheduler.stats()
+        assert stats['batches'] == 2 and stats['rows'] == 9
+    finally:
+        scheduler.close()
+
+
+def test_a_lone_row_is_not_held_for_max_wait():
+    model = _GatedModel()
+    scheduler = _scheduler(model, max_wait_ms=10000)
+    try:
+        assert scheduler.predict(np.array([2.0]), timeout=2) == 4.0
+        assert scheduler.stats()['queue_wait_ms']['max'] < 1000
+    finally:
+        scheduler.close()
+
+
+def test_batches_are_capped_and_split_by_context():
+    model = _GatedModel()
+    scheduler = _scheduler(model, max_batch_size=4)
+    try:
+        blocker = _busy(scheduler, model)
+        # While the worker is busy, six rows for two contexts pile up
+        futures = [scheduler.submit(np.array([float(i)]), 'a' if i % 2 else 'b') for i in range(1, 7)]
+        model.release.set()
+        assert [f.result(5) for f in futures] == [i * 2.0 for i in range(1, 7)]
+        assert blocker.result(5) == 0.0
+        sizes = [size for size, _ in model.calls[1:]]
+        assert sum(sizes) == 6 and max(sizes) <= 4
+        assert all(context in ('a', 'b') for _, context in model.calls[1:])
+    finally:
+        scheduler.close()
+
+
+def test_predict_errors_reach_every_row_of_the_batch():
+    model = _GatedModel(fail=True)
+    scheduler = _scheduler(model, max_batch_size=4, max_wait_ms=1000)
+    try:
+        blocker = _busy(scheduler, model)
+        futures = [scheduler.submit(np.array([float(i)])) for i in range(4)]
+        model.release.set()
+        for future in [blocker] + futures:
+            with pytest.raises(ValueError, match='model exploded'):
+                future.result(5)
+        assert [size for size, _ in model.calls] == [1, 4]
+        assert scheduler.stats()['errors'] == 2
+        # The worker survives a failing batch
+        model.fail = False
+        assert scheduler.predict(np.array([3.0]), timeout=5) == 6.0
+    finally:
+        scheduler.close()
+
+
+def test_submit_after_close_raises():
+    scheduler = _scheduler(_GatedModel())
+    scheduler.close()
+    assert scheduler.closed
+    with pytest.raises(SchedulerClosed):
+        scheduler.submit(np.array([1.0]))
+
+
+def test_close_fails_rows_the_worker_cannot_reach():
+    model = _GatedModel()
+    model.release.clear()
+    scheduler = _scheduler(model, max_batch_size=1)
+    busy = scheduler.submit(np.array([1.0]))
+    assert model.started.wait(5)
+    queued = [scheduler.submit(np.array([2.0])) for _ in range(3)]
+
+    scheduler.close(timeout=0.1)
+    for future in queued:
+        with pytest.raises(SchedulerClosed):
+            future.result(1)
+    model.release.set()
+    assert busy.result(5) == 2.0
+
+
+def test_timed_out_rows_are_dropped_from_their_batch():
+    model = _GatedModel()
+    model.release.clear()
+    scheduler = _scheduler(model, max_batch_size=1)
+    try:
+        scheduler.submit(np.array([1.0]))
+        assert model.started.wait(5)
+        with pytest.raises(FutureTimeout):
+            scheduler.predict(np.array([2.0]), timeout=0.05)
+        model.release.set()
+        assert scheduler.predict(np.array([3.0]), timeout=5) == 6.0
+        assert [size for size, _ in model.calls] == [1, 1]
+    finally:
+        scheduler.close()
@@ -0,0 +1,116 @@
+import contextlib
+import sqlite3
+
+import pytest
+
+from mail_outbox import MailOutbox
+
+
+class FakeSmtp:
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.sent = []
+        self.opened = 0
+
+    @contextlib.contextmanager
+    def connect(self):
+        self.opened += 1
+        yield self
+
+    def send(self, message):
+        if message['subject'] in self.fail_on:
+            raise ConnectionError(f"refused {message['subject']}")
+        self.sent.append(message['subject'])
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'outbox.db')
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {row[0]: row[1:] for row in conn.execute(
+            'SELECT subject, status, attempts, next_attempt_at, claimed_until FROM outbox')}
+    finally:
+        conn.close()
+
+
+def _enqueue(outbox, *subjects):
+    for subject in subjects:
+        outbox.enqueue(subject, 'noreply@example.com', ['user@example.com'], 'body')
+
+
+def test_drain_sends_everything_over_one_connection(path):
+    smtp = FakeSmtp()
+    outbox = MailOutbox(path, smtp.connect, batch_size=2)
+    _enqueue(outbox, 'a', 'b', 'c', 'd', 'e')
+
+    assert outbox.drain() == 5
+    assert smtp.sent == ['a', 'b', 'c', 'd', 'e'] and smtp.opened == 1
+    assert {row[0] for row in _rows(path).values()} == {'sent'}
+    assert outbox.drain() == 0 and smtp.opened == 1
+
+
+def test_failure_backs_off_and_hands_the_rest_of_the_batch_back(path, monkeypatch):
+    monkeypatch.setattr('mail_outbox.time.time', lambda: 1000.0)
+    smtp = FakeSmtp(fail_on={'b'})
+    outbox = MailOutbox(path, smtp.connect, backoff_base=5.0)
+    _enqueue(outbox, 'a', 'b', 'c')
+
+    assert outbox.drain() == 1
+    rows = _rows(path)
+    assert rows['a'][0] == 'sent'
+    assert rows['b'] == ('pending', 1, 1005.0, None)
+    assert rows['c'] == ('pending', 0, 1000.0, None)  # untouched, released for the next drain
+    assert 'ConnectionError' in outbox.status()['last_error']
+
+    assert outbox.drain() == 1 and smtp.sent == ['a', 'c']  # 'b' is not due yet
+    monkeypatch.setattr('mail_outbox.time.time', lambda: 1005.0)
+    assert outbox.drain() == 0
+    assert _rows(path)['b'][1:3] == (2, 1015.0)  # exponential: 5 s, then 10 s
+
+
+def test_message_is_dead_after_max_attempts(path, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr('mail_outbox.time.time', lambda: clock[0])
+    outbox = MailOutbox(path, FakeSmtp(fail_on={'a'}).connect, max_attempts=3, backoff_base=1.0, backoff_max=2.0)
+    _enqueue(outbox, 'a')
+
+    for _ in range(5):
+        outbox.drain()
+        clock[0] += 10
+    assert _rows(path)['a'][:2] == ('dead', 3)
+    assert outbox.status()['dead'] == 1 and outbox.status()['pending'] == 0
+
+
+def test_claimed_batch_is_leased_to_one_worker(path, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('mail_outbox.time.time', lambda: clock[0])
+    first = MailOutbox(path, FakeSmtp().connect, lease_seconds=60)
+    second = MailOutbox(path, FakeSmtp().connect, lease_seconds=60)
+    _enqueue(first, 'a', 'b')
+
+    claimed = first._claim_batch()  # first worker claims, then stalls before sending
+    assert [row[1] for row in claimed] == ['a', 'b']
+    assert second._claim_batch() == []
+    assert second.drain() == 0
+
+    clock[0] += 61  # the lease ran out: the stalled worker's messages go to another one
+    assert second.drain() == 2
+    assert {row[0] for row in _rows(path).values()} == {'sent'}
+
+
+def test_connect_failure_counts_against_the_claimed_batch(path, monkeypatch):
+    monkeypatch.setattr('mail_outbox.time.time', lambda: 50.0)
+
+    def refuse():
+        raise OSError('no route to host')
+
+    outbox = MailOutbox(path, refuse, backoff_base=5.0)
+    _enqueue(outbox, 'a', 'b')
+    assert outbox.drain() == 0
+    assert {subject: row[:3] for subject, row in _rows(path).items()} == {
+        'a': ('pending', 1, 55.0), 'b': ('pending', 1, 55.0)}
+    assert outbox.status()['failed_attempts'] == 2
@@ -0,0 +1,42 @@
+import json
+import threading
+
+from market_analytics import MarketAnalytics
+
+ROWS = [('Car_Age', 'Fuel_Type', 'Selling_Price(Lakhs)', 'Present_Price(Lakhs)'),
+        (3, 'Petrol', 4.5, 6.0), (5, 'Diesel', 3.0, 5.5), (3, 'Diesel', 5.0, 7.0)]
+
+
+def _analytics(tmp_path):
+    dataset = tmp_path / 'cars.csv'
+    dataset.write_text('\n'.join(','.join(map(str, row)) for row in ROWS) + '\n', encoding='utf-8')
+    return MarketAnalytics(str(dataset), str(tmp_path / 'cache.json'))
+
+
+def test_stop_joins_the_refresh_thread(tmp_path, monkeypatch):
+    analytics = _analytics(tmp_path)
+    entered, release = threading.Event(), threading.Event()
+    refresh = analytics.refresh
+
+    def slow_refresh(rebuild=False):
+        entered.set()
+        release.wait(5)
+        return refresh(rebuild)
+
+    monkeypatch.setattr(analytics, 'refresh', slow_refresh)
+    assert analytics.refresh_async(min_interval=0) is True
+    assert entered.wait(5)
+    thread = analytics._thread
+    assert not thread.daemon
+
+    threading.Timer(0.05, release.set).start()
+    analytics.stop()
+    assert not thread.is_alive()
+    assert json.loads(analytics.snapshot().body)['rows'] == 3
+
+
+def test_no_refresh_starts_after_stop(tmp_path):
+    analytics = _analytics(tmp_path)
+    analytics.stop()
+    assert analytics.refresh_async(min_interval=0) is False
+    assert analytics._thread is None
@@ -0,0 +1,86 @@
+import json
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from feature_pipeline import FeaturePipeline
+from model_artifact import BoosterModel, NativeBooster, load_artifact, save_artifact
+from model_bundle import load_bundle, set_model_threads
+
+from conftest import ROOT
+
+COLUMNS = ['Car_Age', 'Kms_Driven', 'Fuel_Type']
+
+
+@pytest.fixture(scope='module')
+def artifact(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 15, 400), rng.integers(1000, 150000, 400), rng.integers(0, 3, 400)])
+    y = 12.0 - 0.6 * X[:, 0] - X[:, 1] / 40000 + X[:, 2]
+    model = xgb.XGBRegressor(n_estimators=40, max_depth=4, random_state=0).fit(X, y)
+    path = str(tmp_path_factory.mktemp('artifact') / 'car_model')
+    save_artifact(path, model, FeaturePipeline(COLUMNS, {'Fuel_Type': ['CNG', 'Diesel', 'Petrol']}))
+    return path
+
+
+def _probe(rng):
+    X = np.column_stack([rng.uniform(-1, 20, 2000), rng.uniform(0, 2e5, 2000), rng.integers(0, 3, 2000)])
+    X[::9, 1] = np.nan
+    return X
+
+
+def test_lean_model_matches_xgboost_bit_for_bit(artifact):
+    lean, manifest = load_artifact(artifact, lean=True)
+    full, _ = load_artifact(artifact)
+    assert isinstance(lean, NativeBooster) and isinstance(full, BoosterModel)
+
+    X = _probe(np.random.default_rng(1))
+    expected = full.predict(X)
+    assert lean.predict(X).dtype == expected.dtype
+    assert np.array_equal(lean.predict(X), expected, equal_nan=True)
+    assert np.array_equal(lean.predict(X[:1]), expected[:1])
+    assert lean.num_boosted_rounds() == manifest['num_trees'] == 40
+
+
+def test_lean_model_rejects_wrong_feature_count(artifact):
+    lean, _ = load_artifact(artifact, lean=True)
+    with pytest.raises(ValueError, match='Feature shape mismatch'):
+        lean.predict(np.zeros((2, 5)))
+
+
+def test_lean_bundle_thread_setting_and_full_booster(artifact):
+    bundle = load_bundle(artifact, lean_imports=True)
+    set_model_threads(bundle, 1)
+    booster = bundle.model.get_booster()
+    assert isinstance(booster, xgb.Booster)
+    X = _probe(np.random.default_rng(2))
+    assert np.array_equal(booster.inplace_predict(X), bundle.predict(X), equal_nan=True)
+
+
+def test_lean_load_never_imports_xgboost_sklearn_or_pandas(artifact):
+    code = (
+        'import json, sys\n'
+        'import numpy as np\n'
+        'from model_artifact import load_artifact\n'
+        f'model, _ = load_artifact({artifact!r}, lean=True)\n'
+        'model.set_param({"nthread": 1})\n'
+        'model.predict(np.zeros((1, 3)))\n'
+        'print(json.dumps([m for m in ("xgboost", "sklearn", "pandas") if m in sys.modules]))\n'
+    )
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+
+def test_corrupt_artifact_is_refused(artifact, tmp_path):
+    copy = str(tmp_path / 'car_model')
+    shutil.copytree(artifact, copy)
+    with open(f'{copy}/manifest.json', encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open(f"{copy}/{manifest['booster_file']}", 'ab') as f:
+        f.write(b'\0')
+    with pytest.raises(ValueError, match='Content hash mismatch'):
+        load_artifact(copy, lean=True)
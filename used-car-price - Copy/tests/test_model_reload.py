@@ -0,0 +1,116 @@
+import csv
+import os
+import pickle
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from feature_pipeline import FeaturePipeline
+from model_bundle import ModelManager
+
+COLUMNS = ['Car_Age', 'Kms_Driven', 'Fuel_Type']
+VOCABULARIES = {'Fuel_Type': ['CNG', 'Diesel', 'Petrol']}
+
+
+def _dataset(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.integers(0, 15, n), rng.integers(1000, 150000, n), rng.integers(0, 3, n)]).astype(float)
+    y = 12.0 - 0.6 * X[:, 0] - X[:, 1] / 40000 + X[:, 2]
+    return X, y
+
+
+def _write_model(path, noise=0.0, n_estimators=20, columns=COLUMNS):
+    X, y = _dataset()
+    target = y + np.random.default_rng(1).normal(0, noise, len(y)) if noise else y
+    model = xgb.XGBRegressor(n_estimators=n_estimators, max_depth=3, n_jobs=1, random_state=0)
+    model.fit(X[:, :len(columns)] if columns else X, target)
+    pipeline = FeaturePipeline(columns, VOCABULARIES)
+    with open(path, 'wb') as f:
+        pickle.dump({'model': model, 'pipeline': pipeline.to_dict(), 'columns': columns}, f)
+
+
+def _write_holdout(path):
+    X, y = _dataset(100, seed=5)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS + ['Selling_Price(Lakhs)'])
+        for features, price in zip(X, y):
+            writer.writerow([int(features[0]), int(features[1]), VOCABULARIES['Fuel_Type'][int(features[2])], price])
+
+
+@pytest.fixture
+def manager(tmp_path, capsys):
+    model_path = str(tmp_path / 'car_model.pkl')
+    holdout_path = str(tmp_path / 'holdout.csv')
+    _write_model(model_path)
+    _write_holdout(holdout_path)
+    manager = ModelManager(model_path, holdout_path=holdout_path, max_mae_increase=0.25)
+    manager.load_initial()
+    yield manager
+    manager.stop()
+
+
+def test_better_model_is_swapped_in(manager):
+    old = manager.current()
+    _write_model(manager.path, n_estimators=60)
+
+    new = manager.reload()
+    assert new is not None and manager.current() is new
+    assert new.version != old.version
+    status = manager.status()
+    assert status['reloads'] == 1 and status['rejected'] == 0 and status['last_error'] is None
+
+
+def test_unchanged_artifact_is_not_reloaded(manager):
+    old = manager.current()
+    assert manager.reload() is None
+    assert manager.current() is old
+    assert manager.status()['reloads'] == 0 and manager.status()['rejected'] == 0
+
+
+def test_unreadable_artifact_is_rejected(manager):
+    old = manager.current()
+    with open(manager.path, 'wb') as f:
+        f.write(b'not a pickle')
+
+    assert manager.reload() is None
+    assert manager.current() is old
+    assert manager.status()['rejected'] == 1
+    assert manager.status()['last_error'].startswith('UnpicklingError')
+
+
+def test_worse_holdout_mae_is_rejected(manager):
+    old = manager.current()
+    _write_model(manager.path, noise=6.0, n_estimators=60)
+
+    assert manager.reload() is None
+    assert manager.current() is old
+    assert 'Holdout MAE got worse' in manager.status()['last_error']
+
+
+def test_absolute_mae_limit(manager):
+    manager.max_holdout_mae = 1e-6
+    _write_model(manager.path, n_estimators=60)
+
+    assert manager.reload() is None
+    assert 'exceeds limit' in manager.status()['last_error']
+
+
+def test_artifact_without_columns_is_rejected(manager):
+    old = manager.current()
+    _write_model(manager.path, columns=[])
+
+    assert manager.reload() is None
+    assert manager.current() is old
+    assert manager.status()['rejected'] == 1
+    assert manager.status()['last_error'].startswith('ValueError')
+
+
+def test_old_pickle_format_is_rejected(manager):
+    with open(manager.path, 'wb') as f:
+        pickle.dump(['model', 'columns'], f)
+
+    assert manager.reload() is None
+    assert 'old model format' in manager.status()['last_error']
+    assert os.path.exists(manager.path)
@@ -0,0 +1,65 @@
+import os
+import re
+import shutil
+
+import pytest
+
+from page_delivery import StaticAssets
+
+
+def _touch(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # a new stat key even on coarse clocks
+
+
+def test_asset_version_follows_any_file(tmp_path):
+    (tmp_path / 'css').mkdir()
+    _touch(tmp_path / 'app.js', 'let a = 1;')
+    _touch(tmp_path / 'css' / 'site.css', 'body {}')
+    assets = StaticAssets(str(tmp_path), version_interval=0)
+
+    first = assets.version()
+    assert first == assets.version()
+    _touch(tmp_path / 'css' / 'site.css', 'body { color: red; }')
+    assert assets.version() != first
+    assert assets.fingerprint('css/site.css') is not None
+    assert StaticAssets(str(tmp_path), max_age=0).version() is None
+
+    throttled = StaticAssets(str(tmp_path), version_interval=3600)
+    seen = throttled.version()
+    _touch(tmp_path / 'app.js', 'let a = 2;')
+    assert throttled.version() == seen  # within the interval the last scan stands
+
+
+@pytest.fixture
+def static_copy(app_module, tmp_path, monkeypatch):
+    folder = tmp_path / 'static'
+    shutil.copytree(app_module.app.static_folder, folder)
+    monkeypatch.setattr(app_module.static_assets, 'folder', str(folder))
+    monkeypatch.setattr(app_module.static_assets, 'version_interval', 0)
+    app_module.page_cache.clear()
+    yield folder
+    app_module.page_cache.clear()
+
+
+def test_cached_page_picks_up_an_edited_stylesheet(app_module, static_copy):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'user@example.com'
+        sess['user_name'] = 'User'
+
+    def stylesheet_version():
+        response = client.get('/home')
+        assert response.status_code == 200
+        return re.search(r'home_styles\.css\?v=(\w+)', response.get_data(as_text=True)).group(1)
+
+    before = stylesheet_version()
+    assert stylesheet_version() == before  # a cache hit
+    _touch(static_copy / 'home_styles.css', (static_copy / 'home_styles.css').read_text('utf-8') + '\n/* v2 */')
+
+    after = stylesheet_version()
+    assert after != before
+    assert after == app_module.static_assets.fingerprint('home_styles.css')
+    assert client.get(f'/static/home_styles.css?v={after}').headers['Cache-Control'].count('immutable') == 1
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from password_hashing import HashingBusy, PasswordHasher
+
+
+@pytest.fixture
+def blocked():
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+def test_timeout_is_reported_as_busy_and_keeps_the_slot(blocked):
+    hasher = PasswordHasher(workers=1, max_pending=1, timeout=0.05)
+    with pytest.raises(HashingBusy, match='too long'):
+        hasher._run(blocked.wait, 5)
+    assert hasher.stats()['timed_out'] == 1
+
+    # The abandoned hash is still burning the worker, so it still holds the only slot
+    with pytest.raises(HashingBusy, match='Too many'):
+        hasher.check('pbkdf2:sha256:1$salt$00', 'pw')
+    assert hasher.stats()['rejected'] == 1
+
+    blocked.set()
+    hasher._executor.submit(lambda: None).result(5)  # the worker has finished and run the callback
+    assert hasher.check('pbkdf2:sha256:1$salt$00', 'pw') is False
+    hasher.shutdown()
+
+
+def test_queued_hash_that_times_out_is_cancelled_and_frees_its_slot(blocked):
+    hasher = PasswordHasher(workers=1, max_pending=1, timeout=0.05)
+    hasher._executor.submit(blocked.wait, 5)  # occupies the only worker
+    with pytest.raises(HashingBusy, match='too long'):
+        hasher.check('pbkdf2:sha256:1$salt$00', 'pw')  # never started, so cancelling it frees the slot
+    assert hasher._slots._value == 1
+    hasher.shutdown()
+
+
+def test_shut_down_hasher_sheds_instead_of_raising():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    hasher.shutdown()
+    with pytest.raises(HashingBusy, match='shuts down'):
+        hasher.hash('pw')
+    assert hasher._slots._value == 1
+
+
+def test_inline_hasher_round_trip():
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    hashed = hasher.hash('pw')
+    assert hasher.check(hashed, 'pw') and not hasher.check(hashed, 'other')
+    assert hasher.stats()['completed'] == 3
+
+
+def test_slow_hash_on_login_is_a_503_not_a_500(app_module, monkeypatch):
+    with app_module.app.app_context():
+        if app_module._find_user('slow@example.com') is None:
+            app_module.db.session.add(app_module.User(name='Slow', email='slow@example.com', password_hash='x'))
+            app_module.db.session.commit()
+
+    def timed_out(*args):
+        raise HashingBusy('Sign-in is taking too long right now. Please try again in a moment.')
+
+    monkeypatch.setattr(app_module.password_hasher, 'check', timed_out)
+    response = app_module.app.test_client().post('/login', data={'email': 'slow@example.com', 'password': 'pw'})
+    assert response.status_code == 503
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from generate_data import generate_chunk
+
+
+@pytest.fixture
+def client(app_module):
+    if app_module.model_manager.current() is None:
+        pytest.skip('No trained model: run car_price_prediction.py first.')
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'user@example.com'
+        sess['user_name'] = 'User'
+    return client
+
+
+def _rows(n_rows, seed=3):
+    df = generate_chunk(np.random.default_rng(seed), n_rows)
+    df['Maintenance_Cost(₹/yr)'] = df['Maintenance_Cost(₹/yr)'].round().astype(int)
+    return json.loads(df.drop(columns=['Car_Age', 'Brand', 'Selling_Price(Lakhs)'])
+                      .to_json(orient='records', force_ascii=False))
+
+
+def _csv(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def _prices(response):
+    assert response.status_code == 200
+    return [result.get('predicted_price') for result in response.get_json()['results']]
+
+
+def test_batch_prices_equal_single_predictions(app_module, client):
+    rows = _rows(40)
+    body = client.post('/api/predict_batch', json=rows).get_json()
+
+    bundle = app_module.model_manager.current()
+    assert body['success'] and body['count'] == body['scored'] == 40 and body['failed'] == 0
+    assert body['model_version'] == bundle.version
+    assert [r['predicted_price'] for r in body['results']] == \
+        [app_module._predict_price(row, bundle=bundle)[0] for row in rows]
+
+
+def test_rows_object_csv_body_and_upload_are_read_alike(client):
+    rows = _rows(10)
+    expected = _prices(client.post('/api/predict_batch', json=rows))
+
+    assert _prices(client.post('/api/predict_batch', json={'rows': rows})) == expected
+    assert _prices(client.post('/api/predict_batch', data=_csv(rows), content_type='text/csv')) == expected
+    upload = {'file': (io.BytesIO(_csv(rows).encode('utf-8-sig')), 'listings.csv')}
+    assert _prices(client.post('/api/predict_batch', data=upload, content_type='multipart/form-data')) == expected
+
+
+def test_bad_rows_fail_alone(client):
+    good, unknown, invalid = _rows(3)
+    unknown['City'] = 'Atlantis'
+    invalid['Kms_Driven'] = 'many'
+    body = client.post('/api/predict_batch', json=[good, 'not a row', unknown, invalid]).get_json()
+    results = body['results']
+
+    assert (body['scored'], body['failed']) == (2, 2)
+    assert results[0]['predicted_price'] is not None and 'error' not in results[0]
+    assert results[1] == {'row': 1, 'error': 'Row must be a JSON object.'}
+    assert results[2]['predicted_price'] is not None
+    assert results[2]['warnings'] == ["Unknown category 'Atlantis' for column 'City'."]
+    assert 'predicted_price' not in results[3] and 'Kms_Driven' in results[3]['error']
+
+
+def test_oversized_and_malformed_batches_are_refused(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_BATCH_ROWS', 3)
+    response = client.post('/api/predict_batch', json=_rows(4))
+    assert response.status_code == 413
+    assert 'Batch too large: 4 rows (max 3)' in response.get_json()['error']
+
+    assert client.post('/api/predict_batch', json={'rows': 'nope'}).status_code == 400
+    assert client.post('/api/predict_batch', data='not json', content_type='application/json').status_code == 400
+
+
+def test_unexpected_errors_are_counted(app_module, client, monkeypatch):
+    def explode(rows, bundle):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(app_module, '_predict_batch', explode)
+    before = app_module.ERRORS.state().get(('RuntimeError',), 0)
+    response = client.post('/api/predict_batch', json=_rows(1))
+    assert response.status_code == 500
+    assert app_module.ERRORS.state()[('RuntimeError',)] == before + 1
@@ -0,0 +1,72 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from prediction_cache import PredictionCache
+
+
+def _key(i):
+    return PredictionCache.make_key(np.array([float(i), 2.0, 3.0]))
+
+
+def test_hits_misses_and_key_normalisation():
+    cache = PredictionCache()
+    cache.put(PredictionCache.make_key(np.array([0.0, 1.0])), 4.2, 'v1')
+    assert cache.get(PredictionCache.make_key(np.array([-0.0, 1], dtype=np.float32)), 'v1') == 4.2
+    assert cache.get(_key(9), 'v1') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_versions_do_not_share_or_flush_entries():
+    cache = PredictionCache()
+    cache.put(_key(1), 1.0, 'old')
+    cache.put(_key(1), 2.0, 'new')
+    # A hot reload: requests on the old and the new bundle interleave
+    for _ in range(5):
+        assert cache.get(_key(1), 'old') == 1.0
+        assert cache.get(_key(1), 'new') == 2.0
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['hits'] == 10
+    assert stats['model_version'] == 'new'
+
+
+def test_old_version_entries_age_out_through_lru():
+    cache = PredictionCache(max_entries=4)
+    for i in range(4):
+        cache.put(_key(i), float(i), 'old')
+    for i in range(4):
+        cache.put(_key(i), float(i) + 10, 'new')
+    assert all(cache.get(_key(i), 'old') is None for i in range(4))
+    assert [cache.get(_key(i), 'new') for i in range(4)] == [10.0, 11.0, 12.0, 13.0]
+    assert cache.stats()['evictions'] == 4
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(ttl_seconds=0.05)
+    cache.put(_key(1), 1.0, 'v1')
+    assert cache.get(_key(1), 'v1') == 1.0
+    time.sleep(0.1)
+    assert cache.get(_key(1), 'v1') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_byte_cap_matches_memory_actually_held():
+    max_bytes = 256 * 1024
+    cache = PredictionCache(max_entries=10 ** 6, ttl_seconds=60, max_bytes=max_bytes)
+    keys = [_key(i) for i in range(20000)]
+    version = 'model-version-20250101'
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i, key in enumerate(keys):
+        cache.put(key, float(i) + 0.5, version)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    stats = cache.stats()
+    assert stats['bytes'] <= max_bytes
+    assert stats['evictions'] > 0
+    # Keys are pre-built, so what is held is the cache's own entries: the accounting must not undercount
+    assert held <= max_bytes * 1.1
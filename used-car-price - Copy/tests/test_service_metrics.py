@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from service_metrics import MetricsRegistry
+
+
+def test_disabled_timer_is_shared_and_never_reads_the_clock():
+    registry = MetricsRegistry(enabled=False)
+    histogram = registry.histogram('stage_seconds', 'Stage time', ['stage'])
+
+    with mock.patch('service_metrics.time.perf_counter', side_effect=AssertionError('clock read')):
+        with histogram.time('encode') as timer:
+            pass
+    assert histogram.time('encode') is timer is histogram.time('score')
+    assert 'stage_seconds_count' not in registry.render()
+
+
+def test_enabled_timer_observes_its_block():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('stage_seconds', 'Stage time', ['stage'])
+
+    with mock.patch('service_metrics.time.perf_counter', side_effect=[1.0, 1.002]):
+        with histogram.time('encode'):
+            pass
+    text = registry.render()
+    assert 'stage_seconds_count{stage="encode"} 1' in text
+    assert 'stage_seconds_bucket{stage="encode",le="0.0025"} 1' in text
+    assert 'stage_seconds_bucket{stage="encode",le="0.001"} 0' in text
+
+
+def _worker(directory, pid, requests, in_flight, seconds):
+    """A registry as one prefork worker (pid) would have published it."""
+    registry = MetricsRegistry(directory=directory)
+    registry.counter('requests_total', 'Requests', ['endpoint']).inc('predict', amount=requests)
+    registry.gauge('in_flight', 'In flight').set(in_flight)
+    registry.histogram('stage_seconds', 'Stage time', ['stage']).observe(seconds, 'encode')
+    with mock.patch('service_metrics.os.getpid', return_value=pid):
+        registry.publish()
+    return registry
+
+
+def test_render_sums_every_workers_published_values(tmp_path):
+    exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                            capture_output=True, text=True, check=True)
+    _worker(str(tmp_path), os.getppid(), 4, 1, 0.002)
+    _worker(str(tmp_path), int(exited.stdout), 5, 7, 0.02)
+    # The same pid reused by a later worker keeps both files
+    _worker(str(tmp_path), int(exited.stdout), 1, 0, 0.02)
+    here = MetricsRegistry(directory=str(tmp_path))
+    here.counter('requests_total', 'Requests', ['endpoint']).inc('predict', amount=3)
+    here.gauge('in_flight', 'In flight').set(2)
+    here.histogram('stage_seconds', 'Stage time', ['stage']).observe(0.0002, 'encode')
+
+    text = here.render()
+    # Exited workers' counts stay (no counter reset); their gauges don't
+    assert 'requests_total{endpoint="predict"} 13' in text
+    assert 'in_flight 3' in text
+    assert 'stage_seconds_count{stage="encode"} 4' in text
+    assert 'stage_seconds_bucket{stage="encode",le="0.0025"} 2' in text
+    assert len(os.listdir(tmp_path)) == 4
+
+    here.clear()
+    assert os.listdir(tmp_path) == []
+
+
+def test_without_a_directory_render_is_this_process_only(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter('requests_total', 'Requests').inc()
+    assert 'requests_total 1' in registry.render()
+    registry.start()
+    assert registry._thread is None
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+from model_artifact import is_artifact
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from check_startup_budget import FORBIDDEN_MODULES, MAX_RSS_MB, MAX_SECONDS, budget_failures, measure, summarize
+
+# The budgets are for the lean artifact; a legacy car_model.pkl needs pandas and sklearn to unpickle
+needs_artifact = pytest.mark.skipif(not is_artifact(os.path.join(ROOT, 'car_model')),
+                                    reason='No trained model artifact: run car_price_prediction.py first.')
+
+
+@needs_artifact
+def test_worker_cold_start_stays_within_budget():
+    samples = measure(runs=3)
+    startup, rss, imported, loaded = summarize(samples)
+
+    assert loaded
+    assert startup <= MAX_SECONDS
+    assert rss <= MAX_RSS_MB
+    assert not set(imported) & set(FORBIDDEN_MODULES)
+    assert budget_failures(samples) == []
+
+
+def test_every_budget_is_checked():
+    sample = {'startup_s': 0.5, 'peak_rss_mb': 90.0, 'model_loaded': True, 'imported': []}
+    assert budget_failures([sample], max_seconds=1.0, max_rss_mb=100) == []
+    slow = dict(sample, startup_s=2.0, peak_rss_mb=300.0, model_loaded=False, imported=['pandas'])
+    failures = budget_failures([slow], max_seconds=1.0, max_rss_mb=100)
+    assert len(failures) == 4 and 'pandas' in failures[-1]
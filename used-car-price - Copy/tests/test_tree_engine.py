@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from model_artifact import trimmed_booster
+from tree_engine import CompiledModel, CompiledTrees, compile_model
+
+
+def _dataset(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(0, 20, n),
+        rng.lognormal(10.5, 0.7, n),
+        rng.normal(18, 3, n),
+        rng.integers(0, 6, n),
+    ]).astype(np.float64)
+    y = np.exp(2.5 - 0.09 * X[:, 0] - X[:, 1] / 4e5 + 0.02 * X[:, 2] + 0.1 * X[:, 3]) + rng.normal(0, 0.3, n)
+    X[rng.random(X.shape) < 0.05] = np.nan  # teaches default directions
+    return X, y
+
+
+def _probe(X, seed=1):
+    """Training rows, rows sitting exactly on split thresholds, and NaN-heavy rows."""
+    rng = np.random.default_rng(seed)
+    probe = X[rng.choice(len(X), 2000)].copy()
+    probe[rng.random(probe.shape) < 0.2] = np.nan
+    return np.vstack([X, probe]).astype(np.float32)
+
+
+def _fit(**params):
+    X, y = _dataset()
+    params = {'n_estimators': 120, 'max_depth': 6, 'learning_rate': 0.1, 'random_state': 0, 'n_jobs': 1, **params}
+    return xgb.XGBRegressor(**params).fit(X, y), X, y
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'max_depth': 3, 'base_score': 7.25},
+    {'max_depth': 8, 'min_child_weight': 20},  # lopsided trees: padded leaves at many depths
+    {'objective': 'reg:absoluteerror'},
+    {'objective': 'reg:pseudohubererror'},
+])
+def test_compiled_trees_match_xgboost_bit_for_bit(params):
+    model, X, _ = _fit(**params)
+    compiled = compile_model(model)
+    probe = _probe(X)
+
+    expected = model.predict(probe)
+    got = compiled.predict(probe)
+    assert got.dtype == np.float32
+    assert np.array_equal(got, expected)
+    assert np.array_equal(compiled.predict(probe[:1]), expected[:1])
+    assert np.array_equal(compiled.predict(probe[5]), expected[5:6])
+
+
+def test_compiled_trees_stop_at_best_iteration():
+    X, y = _dataset()
+    model = xgb.XGBRegressor(n_estimators=400, max_depth=6, learning_rate=0.3, random_state=0, n_jobs=1,
+                             early_stopping_rounds=5)
+    model.fit(X[:1000], y[:1000], eval_set=[(X[1000:], y[1000:])], verbose=False)
+    assert model.best_iteration + 1 < model.get_booster().num_boosted_rounds()
+
+    compiled = compile_model(model)
+    assert compiled.num_trees == trimmed_booster(model).num_boosted_rounds() == model.best_iteration + 1
+    probe = _probe(X)
+    assert np.array_equal(compiled.predict(probe), model.predict(probe))
+
+
+def test_saved_trees_load_back_identical(tmp_path):
+    model, X, _ = _fit(n_estimators=30)
+    compiled = compile_model(model)
+    path = str(tmp_path / 'trees.npz')
+    compiled.save(path)
+
+    loaded = CompiledTrees.load(path)
+    probe = _probe(X)
+    assert (loaded.num_trees, loaded.max_depth, loaded.num_features) == (30, compiled.max_depth, 4)
+    assert np.array_equal(loaded.predict(probe), model.predict(probe))
+
+
+def test_verify_catches_a_tampered_leaf():
+    model, _, _ = _fit(n_estimators=10)
+    compiled = compile_model(model)
+    compiled._values[np.flatnonzero(compiled._values)[0]] += 1e-3
+    with pytest.raises(ValueError, match='disagree with XGBoost'):
+        compiled.verify(trimmed_booster(model), n_rows=4096)
+
+
+def test_unsupported_objective_is_refused():
+    X, y = _dataset(300)
+    model = xgb.XGBRegressor(n_estimators=5, objective='reg:squaredlogerror', n_jobs=1).fit(X, np.abs(y))
+    with pytest.raises(ValueError, match='Unsupported objective'):
+        compile_model(model)
+
+
+def test_compiled_model_routes_large_batches_to_xgboost():
+    model, X, _ = _fit(n_estimators=20)
+    calls = []
+    compiled = compile_model(model)
+    original = compiled.predict
+    compiled.predict = lambda matrix: calls.append(len(matrix)) or original(matrix)
+    wrapped = CompiledModel(model, compiled, max_rows=8)
+
+    probe = _probe(X)[:20]
+    assert np.array_equal(wrapped.predict(probe[:8]), model.predict(probe[:8]))
+    assert np.array_equal(wrapped.predict(probe), model.predict(probe))
+    assert calls == [8]
+    with pytest.raises(ValueError, match='Expected 4 features'):
+        compiled.predict(np.zeros((2, 3)))
@@ -0,0 +1,95 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from what_if import AXES, DEFAULT_AXES, MAX_AXIS_VALUES, expand_grid, grid_size, parse_axes, summarize
+
+COLUMNS = ['Car_Age', 'Kms_Driven', 'Owner', 'Accidents', 'City']
+
+
+def test_missing_axes_get_defaults_and_zero_is_always_included():
+    axes = parse_axes({'years_ahead': [3, 1, 1], 'extra_kms': [2500.5]})
+    assert axes['years_ahead'] == [0, 1, 3]
+    assert axes['extra_kms'] == [0, 2500.5]
+    assert axes['extra_owners'] == DEFAULT_AXES['extra_owners']
+    assert list(axes) == list(AXES)
+    assert parse_axes(None) == DEFAULT_AXES
+    assert grid_size(axes) == 3 * 2 * 2 * 2
+
+
+@pytest.mark.parametrize('spec, message', [
+    ({'colour': [1]}, 'Unknown grid axis: colour'),
+    ([1, 2], "'grid' must be an object"),
+    ({'extra_kms': [-1000]}, 'finite and >= 0'),
+    ({'extra_kms': [float('inf')]}, 'finite and >= 0'),
+    ({'extra_kms': ['lots']}, 'must be numbers'),
+    ({'extra_kms': ['5']}, 'must be numbers'),
+    ({'extra_kms': [None]}, 'must be numbers'),
+    ({'extra_owners': [True, 2]}, 'must be numbers'),
+    ({'extra_owners': []}, f'list of 1-{MAX_AXIS_VALUES} offsets'),
+    ({'extra_owners': 2}, f'list of 1-{MAX_AXIS_VALUES} offsets'),
+    ({'extra_kms': list(range(MAX_AXIS_VALUES + 1))}, f'list of 1-{MAX_AXIS_VALUES} offsets'),
+])
+def test_bad_specs_are_refused(spec, message):
+    with pytest.raises(ValueError, match=message):
+        parse_axes(spec)
+
+
+def test_axis_at_the_limit_is_accepted():
+    assert len(parse_axes({'extra_kms': list(range(MAX_AXIS_VALUES))})['extra_kms']) == MAX_AXIS_VALUES
+
+
+def test_grid_follows_itertools_product_order():
+    axes = parse_axes({'years_ahead': [1, 2], 'extra_kms': [5000], 'extra_owners': [1], 'extra_accidents': [0]})
+    base = np.array([4.0, 30000.0, 1.0, 0.0, 2.0])
+    matrix = expand_grid(base, COLUMNS, axes)
+
+    expected = [base + np.array([years, kms, owners, accidents, 0.0])
+                for years, kms, owners, accidents in itertools.product(*axes.values())]
+    assert np.array_equal(matrix, np.array(expected))
+
+
+def test_summary_curves_and_deltas_hold_the_other_axes_at_zero():
+    axes = parse_axes({'years_ahead': [1, 2], 'extra_kms': [10000], 'extra_owners': [0], 'extra_accidents': [0]})
+    # Price = 10 - years - kms / 10000: every grid point, in product order
+    prices = [10.0 - years - kms / 10000 for years, kms, _, _ in itertools.product(*axes.values())]
+    base_price, curves, deltas, points = summarize(prices, axes)
+
+    assert base_price == 10.0
+    assert curves['years_ahead'] == [{'offset': 0, 'price': 10.0}, {'offset': 1, 'price': 9.0},
+                                     {'offset': 2, 'price': 8.0}]
+    assert deltas['extra_kms'] == [{'offset': 0, 'delta': 0.0}, {'offset': 10000, 'delta': -1.0}]
+    assert deltas['extra_owners'] == [{'offset': 0, 'delta': 0.0}]
+    assert len(points) == grid_size(axes) == 6
+    assert points[-1] == {'years_ahead': 2, 'extra_kms': 10000, 'extra_owners': 0, 'extra_accidents': 0,
+                          'price': 7.0}
+
+
+def test_what_if_endpoint_prices_the_grid_like_single_predictions(app_module):
+    bundle = app_module.model_manager.current()
+    if bundle is None:
+        pytest.skip('No trained model: run car_price_prediction.py first.')
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'user@example.com'
+    car = {'Year': 2018, 'Present_Price(Lakhs)': 7.5, 'Kms_Driven': 40000, 'Owner': 0, 'Mileage(km/l)': 18.0,
+           'Engine_Power(cc)': 1200, 'Maintenance_Cost(₹/yr)': 9000, 'Insurance_Age(yrs)': 2, 'Accidents': 0,
+           'Car_Name': bundle.pipeline.vocabularies['Car_Name'][0], 'City': 'Atlantis', 'Condition': 'Good',
+           'Fuel_Type': 'Petrol', 'Seller_Type': 'Dealer', 'Transmission': 'Manual'}
+    grid = {'years_ahead': [2], 'extra_kms': [20000], 'extra_owners': [0], 'extra_accidents': [1]}
+
+    body = client.post('/api/what_if', json=dict(car, grid=grid)).get_json()
+    assert body['success'] and len(body['points']) == 8
+    assert body['base_price'] == app_module._predict_price(car, bundle=bundle)[0]
+    assert body['warnings'] == ["Unknown category 'Atlantis' for column 'City'."]
+    assert body['curves']['years_ahead'][1]['price'] == \
+        round(app_module._predict_price(dict(car, Year=car['Year'] - 2), bundle=bundle)[0], 2)
+    # A point off the curves is the car with both fields shifted
+    older = dict(car, Year=car['Year'] - 2, Kms_Driven=car['Kms_Driven'] + 20000)
+    point = next(p for p in body['points'] if p['years_ahead'] == 2 and p['extra_kms'] == 20000
+                 and p['extra_accidents'] == 0)
+    assert point['price'] == round(app_module._predict_price(older, bundle=bundle)[0], 2)
+
+    response = client.post('/api/what_if', json=dict(car, grid={'extra_owners': [True]}))
+    assert response.status_code == 400
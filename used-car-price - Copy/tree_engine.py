@@ -0,0 +1,207 @@
+"""
+Pure-NumPy evaluator for the trained XGBoost ensemble.
+
+For one row or a handful, XGBoost's predict() spends most of its time on
+per-call setup (input adapters, thread dispatch), not on walking 700 depth-5
+trees. CompiledTrees flattens every tree into contiguous arrays and walks all
+trees for the whole batch at once, one vectorized step per tree level.
+
+Layout: each tree is padded to a complete binary tree of depth max_depth and
+stored level by level, so a node's children are found by arithmetic
+(2 * position + went_right) instead of a pointer lookup. A leaf above the
+bottom level becomes a chain of "always go left" nodes (threshold +inf,
+missing goes left) ending in a bottom slot that holds its value.
+
+Splits compare in float32 and leaf values are summed in float32 in tree order
+after the base score, exactly as XGBoost does, so predictions match it bit
+for bit (not just within tolerance).
+
+    python tree_engine.py car_model car_model_trees.npz   # export (artifact dir or .pkl)
+"""
+import json
+import sys
+
+import numpy as np
+
+SUPPORTED_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror')
+
+
+class CompiledTrees:
+    """
+    A flattened tree ensemble with a predict(matrix) that needs only NumPy.
+    feature, threshold and default_left are (num_trees, 2**max_depth - 1) in
+    heap order; value is (num_trees, 2**max_depth), the bottom level.
+    """
+
+    def __init__(self, feature, threshold, default_left, value, base_score, num_features):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.base_score = np.float32(base_score)
+        self.num_features = int(num_features)
+        self.num_trees, width = self.value.shape
+        self.max_depth = width.bit_length() - 1
+
+        # Per level, contiguous (num_trees * 2**level) slices: level L holds heap slots 2**L - 1 .. 2**(L+1) - 2
+        self._levels = []
+        for level in range(self.max_depth):
+            cols = slice(2 ** level - 1, 2 ** (level + 1) - 1)
+            self._levels.append((np.ascontiguousarray(self.feature[:, cols]).ravel(),
+                                 np.ascontiguousarray(self.threshold[:, cols]).ravel(),
+                                 np.ascontiguousarray(self.default_left[:, cols]).ravel()))
+        self._values = self.value.ravel()
+
+    # --- Construction ---
+    @classmethod
+    def from_booster(cls, booster):
+        """Flattens an xgboost.Booster (already cut to the trees predict() should use)."""
+        learner = json.loads(bytes(booster.save_raw('json')))['learner']
+        objective = learner['objective']['name']
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective '{objective}' (identity-link regression only).")
+        gbm = learner['gradient_booster']
+        if gbm['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster '{gbm['name']}' (gbtree only).")
+        trees = gbm['model']['trees']
+        if any(any(tree.get('split_type', [])) for tree in trees):
+            raise ValueError('Categorical splits are not supported.')
+        # '[4.38E0]' in XGBoost >= 2 (one entry per target), '4.38E0' before that
+        base_score = float(learner['learner_model_param']['base_score'].strip('[]').split(',')[0])
+        num_features = int(learner['learner_model_param']['num_feature'])
+
+        depth = max(_depth(tree['left_children'], tree['right_children']) for tree in trees)
+        n_inner = 2 ** depth - 1
+        feature = np.zeros((len(trees), n_inner), dtype=np.intp)
+        threshold = np.full((len(trees), n_inner), np.inf, dtype=np.float32)
+        default_left = np.ones((len(trees), n_inner), dtype=bool)
+        value = np.zeros((len(trees), n_inner + 1), dtype=np.float32)
+
+        for t, tree in enumerate(trees):
+            left, right = tree['left_children'], tree['right_children']
+            split = np.asarray(tree['split_conditions'], dtype=np.float32)
+            stack = [(0, 0)]  # (original node id, heap slot)
+            while stack:
+                node, slot = stack.pop()
+                if left[node] == -1:
+                    while slot < n_inner:  # pad: keep going left to the bottom level
+                        slot = 2 * slot + 1
+                    value[t, slot - n_inner] = split[node]  # a leaf's split_condition is its value
+                    continue
+                feature[t, slot] = tree['split_indices'][node]
+                threshold[t, slot] = split[node]
+                default_left[t, slot] = tree['default_left'][node]
+                stack += [(left[node], 2 * slot + 1), (right[node], 2 * slot + 2)]
+
+        return cls(feature, threshold, default_left, value, base_score, num_features)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold, default_left=self.default_left,
+                 value=self.value, base_score=self.base_score, num_features=self.num_features)
+
+    # --- Inference ---
+    def predict(self, matrix):
+        X = np.asarray(matrix, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_cols = X.shape
+        if n_cols < self.num_features:
+            raise ValueError(f'Expected {self.num_features} features, got {n_cols}.')
+        if n_rows == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        has_missing = bool(np.isnan(flat).any())
+        tree_offsets = np.arange(self.num_trees, dtype=np.intp)
+        position = np.zeros((n_rows, self.num_trees), dtype=np.intp)  # slot within the current level
+        for level, (feature, threshold, default_left) in enumerate(self._levels):
+            slot = tree_offsets * (1 << level) + position
+            x = flat[row_offsets + feature[slot]]
+            go_right = ~(x < threshold[slot])  # NaN compares False, so it goes right here...
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~default_left[slot], go_right)  # ...unless default_left
+            position = 2 * position + go_right
+        leaves = self._values[tree_offsets * (1 << self.max_depth) + position]
+
+        # XGBoost adds the trees one by one, in float32, onto the base score: same order, same rounding
+        terms = np.empty((n_rows, self.num_trees + 1), dtype=np.float32)
+        terms[:, 0] = self.base_score
+        terms[:, 1:] = leaves
+        return np.cumsum(terms, axis=1, dtype=np.float32)[:, -1]
+
+    def verify(self, booster, n_rows=256, seed=0):
+        """
+        Compares against booster.inplace_predict on random rows spread around the
+        split thresholds (NaNs included); raises ValueError on any difference.
+        """
+        rng = np.random.default_rng(seed)
+        X = np.empty((n_rows, self.num_features), dtype=np.float32)
+        is_split = np.isfinite(self.threshold)
+        for col in range(self.num_features):
+            cuts = self.threshold[is_split & (self.feature == col)]
+            if len(cuts):
+                X[:, col] = rng.choice(cuts, n_rows) * rng.choice([0.999, 1.0, 1.001], n_rows)
+            else:
+                X[:, col] = rng.normal(size=n_rows)
+        X[rng.random(X.shape) < 0.02] = np.nan
+        diff = float(np.max(np.abs(self.predict(X) - booster.inplace_predict(X))))
+        if diff > 0:
+            raise ValueError(f'Compiled trees disagree with XGBoost by {diff:.6g}.')
+        return diff
+
+
+def _depth(left, right, node=0):
+    if left[node] == -1:
+        return 0
+    return 1 + max(_depth(left, right, left[node]), _depth(left, right, right[node]))
+
+
+class CompiledModel:
+    """
+    Drop-in for the bundle's model: predict() runs the compiled trees for
+    batches of up to max_rows (None: every batch) and the XGBoost model above
+    that, where its multithreaded C++ loop wins.
+    """
+
+    def __init__(self, model, compiled, max_rows=None):
+        self.model = model
+        self.compiled = compiled
+        self.max_rows = max_rows
+
+    def predict(self, matrix):
+        if self.max_rows is None or len(matrix) <= self.max_rows:
+            return self.compiled.predict(matrix)
+        return self.model.predict(matrix)
+
+    def get_booster(self):
+        return self.model.get_booster()
+
+    def set_param(self, params):
+        (self.model if hasattr(self.model, 'set_param') else self.model.get_booster()).set_param(params)
+
+
+def compile_model(model):
+    """Verified CompiledTrees for an XGBRegressor, BoosterModel or Booster, cut at best_iteration like predict()."""
+    from model_artifact import trimmed_booster
+
+    booster = trimmed_booster(model)
+    compiled = CompiledTrees.from_booster(booster)
+    compiled.verify(booster)
+    return compiled
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python tree_engine.py <car_model dir or .pkl> <output.npz>")
+        sys.exit(1)
+    from model_bundle import load_bundle
+
+    compiled = compile_model(load_bundle(sys.argv[1]).model)
+    compiled.save(sys.argv[2])
+    print(f"✅ Wrote '{sys.argv[2]}' ({compiled.num_trees} trees, depth {compiled.max_depth})")
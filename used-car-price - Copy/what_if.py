@@ -0,0 +1,99 @@
+"""
+"What-if" projections: one car expanded into a grid over age, mileage,
+owners and accidents, priced with a single batched predict call.
+
+The base row is encoded once; every grid point is the base vector with a
+few numeric columns shifted, so building a 200-point grid is a handful of
+NumPy broadcasts rather than 200 encodes.
+"""
+import itertools
+
+import numpy as np
+
+# Axis name -> model column it shifts
+AXES = {
+    'years_ahead': 'Car_Age',
+    'extra_kms': 'Kms_Driven',
+    'extra_owners': 'Owner',
+    'extra_accidents': 'Accidents',
+}
+
+DEFAULT_AXES = {
+    'years_ahead': [0, 1, 2, 3, 4, 5],
+    'extra_kms': [0, 10000, 20000, 30000, 40000, 50000],
+    'extra_owners': [0, 1],
+    'extra_accidents': [0, 1],
+}
+
+MAX_AXIS_VALUES = 50
+
+
+def parse_axes(spec):
+    """
+    Validates a {'axis': [offsets]} spec (missing axes get their defaults).
+    Offsets are non-negative JSON numbers (not strings or booleans) and every
+    axis includes 0, so the base car is always a grid point. Raises ValueError
+    on bad input.
+    """
+    spec = spec or {}
+    if not isinstance(spec, dict):
+        raise ValueError("'grid' must be an object of axis -> list of offsets.")
+    unknown = sorted(set(spec) - set(AXES))
+    if unknown:
+        raise ValueError(f"Unknown grid axis: {', '.join(unknown)} (expected {', '.join(AXES)}).")
+
+    axes = {}
+    for name in AXES:
+        values = spec.get(name, DEFAULT_AXES[name])
+        if not isinstance(values, list) or not values or len(values) > MAX_AXIS_VALUES:
+            raise ValueError(f"'{name}' must be a list of 1-{MAX_AXIS_VALUES} offsets.")
+        # bool is an int subclass: true/false must not pass as offsets 1/0
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            raise ValueError(f"'{name}' offsets must be numbers.")
+        offsets = sorted({float(v) for v in values} | {0.0})
+        if offsets[0] < 0 or not np.all(np.isfinite(offsets)):
+            raise ValueError(f"'{name}' offsets must be finite and >= 0.")
+        axes[name] = [int(v) if v.is_integer() else v for v in offsets]
+    return axes
+
+
+def grid_size(axes):
+    return int(np.prod([len(values) for values in axes.values()]))
+
+
+def expand_grid(vector, columns, axes):
+    """
+    Returns the (n_points, n_features) matrix for every combination of axis
+    offsets, in C order over AXES (the last axis varies fastest).
+    """
+    shape = tuple(len(values) for values in axes.values())
+    matrix = np.tile(np.asarray(vector, dtype=np.float64), (int(np.prod(shape)), 1))
+    # Offsets of each axis broadcast along its own dimension of the grid
+    for dim, (name, values) in enumerate(axes.items()):
+        along = [1] * len(shape)
+        along[dim] = len(values)
+        offsets = np.broadcast_to(np.asarray(values, dtype=np.float64).reshape(along), shape)
+        matrix[:, columns.index(AXES[name])] += offsets.ravel()
+    return matrix
+
+
+def summarize(prices, axes):
+    """
+    Turns grid prices into one curve per axis (others held at 0) and the price
+    delta of each step against the base car.
+    """
+    grid = np.asarray(prices, dtype=np.float64).reshape(tuple(len(v) for v in axes.values()))
+    zero_index = tuple(values.index(0) for values in axes.values())
+    base_price = float(grid[zero_index])
+
+    curves, deltas = {}, {}
+    for dim, (name, values) in enumerate(axes.items()):
+        index = list(zero_index)
+        index[dim] = slice(None)
+        curve = grid[tuple(index)]
+        curves[name] = [{'offset': v, 'price': round(float(p), 2)} for v, p in zip(values, curve)]
+        deltas[name] = [{'offset': v, 'delta': round(float(p) - base_price, 2)} for v, p in zip(values, curve)]
+
+    points = [dict(zip(axes, combo), price=round(float(p), 2))
+              for combo, p in zip(itertools.product(*axes.values()), grid.ravel())]
+    return base_price, curves, deltas, points
@@ -0,0 +1,34 @@
+"""
+Process and thread helpers shared by the services that run beside the request
+threads (audit log writer, drift monitor) and that look at files left by
+other prefork workers of the same instance.
+"""
+import os
+import sys
+import threading
+
+
+def pid_alive(pid):
+    """True if a process with this pid exists (a live worker, possibly owned by another user)."""
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def lower_thread_priority():
+    """
+    Runs the calling thread at the lowest CPU priority (Linux schedules threads
+    individually): a background thread then uses idle CPU rather than the
+    request threads', and only falls behind while they saturate it.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except OSError:
+            pass